@@ -4,6 +4,7 @@
 """
 
 from .answer_generator import AnswerGenerator
+from .answer_cache import AnswerCache
 
-__all__ = ['AnswerGenerator']
+__all__ = ['AnswerGenerator', 'AnswerCache']
 
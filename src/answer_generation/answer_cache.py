@@ -0,0 +1,154 @@
+"""
+答案缓存模块
+意图、槽位、图谱上下文与生成参数均相同时，直接复用已生成的答案，跳过14B模型推理；
+图谱重新加载（版本标记变化）后整体失效
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerCache:
+    """
+    进程内LRU答案缓存
+
+    缓存键: (意图, 规范化槽位, 上下文哈希, 生成参数) 的SHA-256；
+    缓存绑定图谱版本，读写时发现版本变化即清空
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: Optional[float] = 3600):
+        """
+        初始化答案缓存
+
+        Args:
+            max_entries: 最大缓存条数（超出时淘汰最久未使用的条目）
+            ttl: 条目有效期（秒），为空时不过期
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._graph_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def make_key(intent: str,
+                 slots: Dict[str, List[str]],
+                 context: str,
+                 generation_params: Dict[str, Any],
+                 query: str = "") -> str:
+        """
+        计算缓存键
+
+        Args:
+            intent: 意图编号
+            slots: 槽位字典 {槽位类型: [值列表]}（顺序与重复不影响缓存键）
+            context: 格式化后的图谱上下文
+            generation_params: 模型名称与生成参数
+            query: 用户查询（为空时不参与缓存键）
+
+        Returns:
+            缓存键
+        """
+        canonical_slots = {
+            slot_type: sorted({value.strip() for value in values})
+            for slot_type, values in slots.items()
+        }
+        payload = json.dumps({
+            "intent": intent,
+            "slots": canonical_slots,
+            "context": hashlib.sha256(context.encode('utf-8')).hexdigest(),
+            "params": generation_params,
+            "query": " ".join(query.split())
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, graph_version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        查找缓存答案
+
+        Args:
+            key: 缓存键
+            graph_version: 当前图谱版本
+
+        Returns:
+            缓存的答案结果字典（副本），未命中时返回None
+        """
+        with self._lock:
+            self._check_version(graph_version)
+
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return dict(entry[0])
+
+    def put(self, key: str, answer_result: Dict[str, Any], graph_version: Optional[str] = None):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            answer_result: generate_answer的返回字典
+            graph_version: 生成答案时的图谱版本
+        """
+        with self._lock:
+            self._check_version(graph_version)
+
+            self._entries[key] = (dict(answer_result), time.time())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def _check_version(self, graph_version: Optional[str]):
+        """图谱版本变化时清空缓存（调用方持有锁）"""
+        if graph_version == self._graph_version:
+            return
+
+        if self._entries:
+            logger.info(f"图谱版本变化 {self._graph_version} -> {graph_version}，清空答案缓存 ({len(self._entries)} 条)")
+            self._entries.clear()
+            self._invalidations += 1
+        self._graph_version = graph_version
+
+    def get_stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "graph_version": self._graph_version,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations
+            }
@@ -5,11 +5,15 @@
 """
 
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import TextIteratorStreamer
 import yaml
 
+from .generation_engine import ContinuousBatchingEngine
+from ..inference.backends import create_backend
+from ..inference.model_registry import get_model_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,40 +42,128 @@ class AnswerGenerator:
 
         self.system_prompt = self.prompt_config['answer_generation_system']
 
-        # 加载模型和分词器
+        # 加载模型和分词器（由config中的backend决定推理后端）
         self.device = self.model_config['device']
+        self.backend = create_backend(self.model_config)
         self.tokenizer = None
         self.model = None
 
+        # 投机解码（Assisted Generation）：同系列小模型起草，14B模型验证
+        self.speculative_config = self.model_config.get('speculative_decoding', {}) or {}
+        self.draft_model = None
+
+        # 连续批处理：所有生成请求提交到同一个迭代级调度引擎
+        self.batching_config = self.model_config.get('continuous_batching', {}) or {}
+        self.engine = None
+
         logger.info(f"初始化答案生成器，设备: {self.device}")
 
+    @property
+    def is_loaded(self) -> bool:
+        """模型是否已加载（就绪检查使用）"""
+        return self.backend.is_loaded
+
     def load_model(self):
-        if self.model is not None:
+        if self.backend.is_loaded:
             return
 
-        logger.info(f"正在加载模型: {self.model_config['model_name']}")
+        logger.info(f"正在加载模型: {self.model_config['model_name']} "
+                    f"(后端: {self.model_config.get('backend', 'transformers')})")
 
         try:
-            # 加载分词器
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                self.model_config['model_path'],
-                trust_remote_code=True
+            self.backend.load()
+            self.model = self.backend.model
+            self.tokenizer = self.backend.tokenizer
+            logger.info("模型加载成功")
+
+        except Exception as e:
+            logger.error(f"模型加载失败: {str(e)}")
+            raise
+
+        if not self.backend.supports_transformers_features:
+            if self.batching_config.get('enabled', False) or self.speculative_config.get('enabled', False):
+                logger.warning("当前推理后端不支持连续批处理/投机解码，已忽略相关配置")
+            return
+
+        if self.batching_config.get('enabled', False):
+            # 辅助生成要求batch_size=1，与连续批处理互斥
+            if self.speculative_config.get('enabled', False):
+                logger.warning("连续批处理已开启，忽略投机解码配置")
+            self.engine = ContinuousBatchingEngine(
+                self.model,
+                self.tokenizer,
+                max_batch_size=self.batching_config.get('max_batch_size', 8),
+                max_batch_tokens=self.batching_config.get('max_batch_tokens', 32768),
+                idle_wait=self.batching_config.get('idle_wait', 0.1),
+                model_name=self.model_config['model_name']
             )
+            self.engine.start()
+        elif self.speculative_config.get('enabled', False):
+            self.load_draft_model()
+
+    def warmup(self, sample_query: str = "平台上有哪些五星资产？"):
+        """
+        加载模型并执行一次短生成，完成CUDA初始化和kernel预热
+
+        Args:
+            sample_query: 预热使用的查询
+        """
+        self.load_model()
+        self._generate_text(
+            self._build_rag_prompt(sample_query, ""),
+            max_new_tokens=8,
+            temperature=0.0,
+            top_p=1.0
+        )
+        logger.info("答案生成模型预热完成")
+
+    def count_tokens(self, text: str) -> int:
+        """
+        使用答案模型的分词器计算文本token数（无需加载模型权重）
 
-            # 加载模型
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_config['model_path'],
-                device_map="auto",
-                torch_dtype=torch.float16,
-                trust_remote_code=True
+        Args:
+            text: 文本
+
+        Returns:
+            token数
+        """
+        return self.backend.count_tokens(text)
+
+    def load_draft_model(self):
+        """
+        加载投机解码使用的草稿模型
+
+        草稿模型必须与主模型同系列（共享分词器/词表），
+        加载失败时退化为普通解码，不影响主流程
+        """
+        if self.draft_model is not None:
+            return
+
+        draft_path = self.speculative_config.get('draft_model_path')
+        if not draft_path:
+            logger.warning("已开启投机解码但未配置draft_model_path，使用普通解码")
+            return
+
+        logger.info(f"正在加载草稿模型: {self.speculative_config.get('draft_model_name', draft_path)}")
+
+        try:
+            # 与主模型一致：CPU上float16矩阵乘很慢（部分算子不支持），使用float32
+            self.draft_model = get_model_registry().get_model(
+                draft_path,
+                dtype=torch.float32 if self.device == 'cpu' else torch.float16,
+                device=self.device
             )
 
-            self.model.eval()
-            logger.info("模型加载成功")
+            # 每轮草稿长度（transformers会根据接受率动态调整）
+            num_assistant_tokens = self.speculative_config.get('num_assistant_tokens')
+            if num_assistant_tokens:
+                self.draft_model.generation_config.num_assistant_tokens = num_assistant_tokens
+
+            logger.info("草稿模型加载成功，已启用投机解码")
 
         except Exception as e:
-            logger.error(f"模型加载失败: {str(e)}")
-            raise
+            logger.error(f"草稿模型加载失败，使用普通解码: {str(e)}")
+            self.draft_model = None
 
     def _build_rag_prompt(self, 
                          user_query: str, 
@@ -113,6 +205,28 @@ class AnswerGenerator:
 
         return messages
 
+    def _build_ood_messages(self, user_query: str) -> List[Dict]:
+        """
+        构建OOD（域外）问题的消息列表
+
+        Args:
+            user_query: 用户查询
+
+        Returns:
+            消息列表
+        """
+        # OOD问题使用通用对话模式
+        return [
+            {
+                "role": "system",
+                "content": "你是一个友好的AI助手。用户的问题不在你的专业领域范围内，请礼貌地告知用户，并引导用户提问关于资产、场景、热点的问题。"
+            },
+            {
+                "role": "user",
+                "content": user_query
+            }
+        ]
+
     def generate_answer(self, 
                        user_query: str, 
                        context: str, 
@@ -138,42 +252,18 @@ class AnswerGenerator:
         # 构建提示词
         messages = self._build_rag_prompt(user_query, context, intent)
 
-        # 应用聊天模板
-        text = self.tokenizer.apply_chat_template(
-            messages,
-            tokenize=False,
-            add_generation_prompt=True
-        )
-
-        # 编码输入
-        model_inputs = self.tokenizer([text], return_tensors="pt").to(self.device)
-
         # 生成参数
         gen_max_length = max_length if max_length else self.model_config['max_length']
         gen_temperature = temperature if temperature else self.model_config['temperature']
 
         # 生成输出（关闭CoT模式）
-        with torch.no_grad():
-            generated_ids = self.model.generate(
-                model_inputs.input_ids,
-                max_new_tokens=gen_max_length,
-                temperature=gen_temperature,
-                top_p=self.model_config['top_p'],
-                do_sample=True if gen_temperature > 0 else False,
-                pad_token_id=self.tokenizer.eos_token_id,
-                repetition_penalty=self.model_config.get('repetition_penalty', 1.1)
-            )
-
-        # 解码输出
-        generated_ids = [
-            output_ids[len(input_ids):]
-            for input_ids, output_ids in zip(model_inputs.input_ids, generated_ids)
-        ]
-
-        answer = self.tokenizer.batch_decode(
-            generated_ids,
-            skip_special_tokens=True
-        )[0]
+        answer, _ = self._generate_text(
+            messages,
+            max_new_tokens=gen_max_length,
+            temperature=gen_temperature,
+            top_p=self.model_config['top_p'],
+            repetition_penalty=self.model_config.get('repetition_penalty', 1.1)
+        )
 
         logger.info(f"生成答案: {answer[:100]}...")
 
@@ -196,53 +286,20 @@ class AnswerGenerator:
         Returns:
             包含答案的字典
         """
-        # OOD问题使用通用对话模式
-        messages = [
-            {
-                "role": "system",
-                "content": "你是一个友好的AI助手。用户的问题不在你的专业领域范围内，请礼貌地告知用户，并引导用户提问关于资产、场景、热点的问题。"
-            },
-            {
-                "role": "user",
-                "content": user_query
-            }
-        ]
+        messages = self._build_ood_messages(user_query)
 
         # 确保模型已加载
         self.load_model()
 
-        # 应用聊天模板
-        text = self.tokenizer.apply_chat_template(
+        # 生成（OOD回复较短，不使用投机解码）
+        answer, _ = self._generate_text(
             messages,
-            tokenize=False,
-            add_generation_prompt=True
+            max_new_tokens=256,
+            temperature=0.7,
+            top_p=0.9,
+            use_assistant=False
         )
 
-        # 编码输入
-        model_inputs = self.tokenizer([text], return_tensors="pt").to(self.device)
-
-        # 生成
-        with torch.no_grad():
-            generated_ids = self.model.generate(
-                model_inputs.input_ids,
-                max_new_tokens=256,
-                temperature=0.7,
-                top_p=0.9,
-                do_sample=True,
-                pad_token_id=self.tokenizer.eos_token_id
-            )
-
-        # 解码
-        generated_ids = [
-            output_ids[len(input_ids):]
-            for input_ids, output_ids in zip(model_inputs.input_ids, generated_ids)
-        ]
-
-        answer = self.tokenizer.batch_decode(
-            generated_ids,
-            skip_special_tokens=True
-        )[0]
-
         result = {
             "answer": answer.strip(),
             "context_used": "",
@@ -253,6 +310,167 @@ class AnswerGenerator:
 
         return result
 
+    def _submit_to_engine(self,
+                          messages: List[Dict],
+                          max_new_tokens: int,
+                          temperature: float,
+                          top_p: float,
+                          repetition_penalty: Optional[float] = None,
+                          streamer=None):
+        """
+        编码消息并提交到连续批处理引擎（非阻塞）
+
+        Returns:
+            GenerationRequest
+        """
+        text = self.tokenizer.apply_chat_template(
+            messages,
+            tokenize=False,
+            add_generation_prompt=True
+        )
+        input_ids = self.tokenizer(text)['input_ids']
+
+        return self.engine.submit(
+            input_ids,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            repetition_penalty=repetition_penalty,
+            streamer=streamer
+        )
+
+    def _generate_text(self,
+                       messages: List[Dict],
+                       max_new_tokens: int,
+                       temperature: float,
+                       top_p: float,
+                       repetition_penalty: Optional[float] = None,
+                       use_assistant: bool = True) -> Tuple[str, int]:
+        """
+        对单条消息列表执行生成
+
+        Returns:
+            (生成文本, 新生成的token数)
+        """
+        if self.engine is not None:
+            request = self._submit_to_engine(
+                messages, max_new_tokens, temperature, top_p, repetition_penalty
+            )
+            output_ids = request.wait(self.batching_config.get('request_timeout'))
+            answer = self.tokenizer.decode(output_ids, skip_special_tokens=True)
+            return answer, len(output_ids)
+
+        generate_kwargs = {}
+        # 投机解码：草稿模型一次提出多个token，主模型单次前向验证
+        if use_assistant and self.draft_model is not None:
+            generate_kwargs["assistant_model"] = self.draft_model
+
+        return self.backend.generate(
+            messages,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            repetition_penalty=repetition_penalty,
+            **generate_kwargs
+        )
+
+    def _stream_text(self,
+                     messages: List[Dict],
+                     max_new_tokens: int,
+                     temperature: float,
+                     top_p: float,
+                     repetition_penalty: Optional[float] = None,
+                     use_assistant: bool = True) -> Iterator[str]:
+        """
+        流式生成：在后台线程中运行generate，边生成边产出文本片段
+
+        Yields:
+            增量文本片段
+        """
+        if self.engine is not None:
+            # 引擎在每个解码步向streamer推送token
+            streamer = TextIteratorStreamer(
+                self.tokenizer,
+                skip_prompt=True,
+                skip_special_tokens=True,
+                timeout=self.model_config.get('stream_timeout', 60)
+            )
+            request = self._submit_to_engine(
+                messages, max_new_tokens, temperature, top_p, repetition_penalty,
+                streamer=streamer
+            )
+            try:
+                for chunk in streamer:
+                    if chunk:
+                        yield chunk
+            finally:
+                # 调用方提前结束迭代（如客户端断开）时释放引擎槽位；正常结束时无影响
+                request.cancel()
+
+            # 引擎解码失败时streamer同样会结束，这里重新抛出而不是返回截断的答案
+            if request.error is not None:
+                raise request.error
+            return
+
+        generate_kwargs = {}
+        if use_assistant and self.draft_model is not None:
+            generate_kwargs["assistant_model"] = self.draft_model
+
+        yield from self.backend.stream(
+            messages,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            repetition_penalty=repetition_penalty,
+            **generate_kwargs
+        )
+
+    def stream_answer(self,
+                      user_query: str,
+                      context: str,
+                      intent: str = "",
+                      max_length: Optional[int] = None,
+                      temperature: Optional[float] = None) -> Iterator[str]:
+        """
+        流式生成答案（参数同generate_answer）
+
+        Yields:
+            增量答案文本
+        """
+        # 确保模型已加载
+        self.load_model()
+
+        messages = self._build_rag_prompt(user_query, context, intent)
+
+        gen_max_length = max_length if max_length else self.model_config['max_length']
+        gen_temperature = temperature if temperature else self.model_config['temperature']
+
+        yield from self._stream_text(
+            messages,
+            max_new_tokens=gen_max_length,
+            temperature=gen_temperature,
+            top_p=self.model_config['top_p'],
+            repetition_penalty=self.model_config.get('repetition_penalty', 1.1)
+        )
+
+    def stream_ood_response(self, user_query: str) -> Iterator[str]:
+        """
+        流式生成OOD（域外）问题的回答
+
+        Yields:
+            增量答案文本
+        """
+        # 确保模型已加载
+        self.load_model()
+
+        yield from self._stream_text(
+            self._build_ood_messages(user_query),
+            max_new_tokens=256,
+            temperature=0.7,
+            top_p=0.9,
+            use_assistant=False
+        )
+
     def batch_generate(self, 
                       queries_with_context: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """
@@ -264,15 +482,72 @@ class AnswerGenerator:
         Returns:
             答案列表
         """
+        self.load_model()
+
+        if self.engine is not None:
+            return self._batch_generate_with_engine(queries_with_context)
+
+        # 静态批量生成：按prompt长度分桶，每桶一次generate（投机解码仅支持单条，不参与批量）
+        batch_config = self.model_config.get('batch_generation', {}) or {}
+        outputs = self.backend.generate_batch(
+            [
+                self._build_rag_prompt(item['query'], item['context'], item.get('intent', ''))
+                for item in queries_with_context
+            ],
+            max_new_tokens=self.model_config['max_length'],
+            temperature=self.model_config['temperature'],
+            top_p=self.model_config['top_p'],
+            repetition_penalty=self.model_config.get('repetition_penalty', 1.1),
+            max_batch_size=batch_config.get('max_batch_size', 8),
+            max_batch_tokens=batch_config.get('max_batch_tokens')
+        )
+
         results = []
+        for item, (answer, _) in zip(queries_with_context, outputs):
+            context = item['context']
+            results.append({
+                "answer": answer.strip(),
+                "context_used": context,
+                "has_context": bool(context and context != "知识库中暂无相关信息。"),
+                "query": item['query']
+            })
+
+        return results
+
+    def _batch_generate_with_engine(self,
+                                    queries_with_context: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        一次性提交全部请求到连续批处理引擎，由引擎按槽位并发解码
+
+        Args:
+            queries_with_context: 包含query和context的字典列表
+
+        Returns:
+            答案列表（与输入顺序一致）
+        """
+        requests = []
         for item in queries_with_context:
-            query = item['query']
+            messages = self._build_rag_prompt(item['query'], item['context'], item.get('intent', ''))
+            requests.append(self._submit_to_engine(
+                messages,
+                max_new_tokens=self.model_config['max_length'],
+                temperature=self.model_config['temperature'],
+                top_p=self.model_config['top_p'],
+                repetition_penalty=self.model_config.get('repetition_penalty', 1.1)
+            ))
+
+        results = []
+        for item, request in zip(queries_with_context, requests):
+            output_ids = request.wait(self.batching_config.get('request_timeout'))
+            answer = self.tokenizer.decode(output_ids, skip_special_tokens=True)
             context = item['context']
-            intent = item.get('intent', '')
-            
-            result = self.generate_answer(query, context, intent)
-            results.append(result)
-        
+            results.append({
+                "answer": answer.strip(),
+                "context_used": context,
+                "has_context": bool(context and context != "知识库中暂无相关信息。"),
+                "query": item['query']
+            })
+
         return results
 
 
@@ -0,0 +1,127 @@
+"""
+模板答案模块
+对结构化意图（星级/价值评分、负责人、订阅人数等）直接用图谱记录渲染答案，
+结果少且无歧义时跳过大模型生成
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateAnswerer:
+    """
+    确定性答案模板渲染器
+
+    模板配置（prompt_config.yaml -> answer_templates）：
+        "33":
+          - name: 模板名
+            fields: [记录中必须非空的字段]
+            slots: [必须唯一取值的槽位]（可选）
+            when_slots: {槽位: [允许的取值]}（可选，槽位出现时取值必须在列表中）
+            max_records: 最多记录数
+            template: 单条记录模板
+            header / row_template: 多条记录模板（二选一）
+            value_labels: {字段: {原值: 展示值}}（可选）
+    """
+
+    def __init__(self, template_config: Dict[str, Any]):
+        """
+        初始化模板渲染器
+
+        Args:
+            template_config: answer_templates配置
+        """
+        template_config = template_config or {}
+        self.enabled = template_config.get('enabled', False)
+        self.templates = {
+            str(intent): rules
+            for intent, rules in template_config.items()
+            if intent != 'enabled' and isinstance(rules, list)
+        }
+
+    def render(self,
+               intent: str,
+               records: List[Dict[str, Any]],
+               slots: Dict[str, List[str]]) -> Optional[Dict[str, str]]:
+        """
+        尝试用模板渲染答案
+
+        Args:
+            intent: 意图编码
+            records: 图谱检索结果
+            slots: 槽位字典 {槽位类型: [值列表]}
+
+        Returns:
+            {"answer": 答案, "template": 模板名}，无法确定性回答时返回None
+        """
+        if not self.enabled or not records:
+            return None
+
+        for rule in self.templates.get(str(intent), []):
+            answer = self._apply_rule(rule, records, slots)
+            if answer:
+                logger.info(f"命中答案模板: {rule.get('name', intent)}，跳过LLM生成")
+                return {"answer": answer, "template": rule.get('name', str(intent))}
+
+        return None
+
+    def _apply_rule(self,
+                    rule: Dict[str, Any],
+                    records: List[Dict[str, Any]],
+                    slots: Dict[str, List[str]]) -> Optional[str]:
+        """按单条模板规则渲染，不满足条件时返回None"""
+        if len(records) > rule.get('max_records', 1):
+            return None
+
+        # 限定槽位取值（如MetadataItem只允许"星级"等），避免答非所问
+        for slot_type, allowed_values in (rule.get('when_slots') or {}).items():
+            for value in slots.get(slot_type, []):
+                if value not in allowed_values:
+                    return None
+
+        # 模板引用的槽位必须唯一，多值（如对比）说明存在歧义
+        slot_values = {}
+        for slot_type in rule.get('slots', []):
+            values = slots.get(slot_type, [])
+            if len(set(values)) != 1:
+                return None
+            slot_values[slot_type] = values[0]
+
+        required_fields = rule.get('fields', [])
+        rows = []
+        for record in records:
+            if any(self._is_empty(record.get(f)) for f in required_fields):
+                return None
+            rows.append(self._label_values(record, rule.get('value_labels') or {}))
+
+        try:
+            if 'template' in rule:
+                if len(rows) != 1:
+                    return None
+                return rule['template'].format_map({**slot_values, **rows[0]}).strip()
+
+            lines = []
+            if rule.get('header'):
+                lines.append(rule['header'].format_map(slot_values))
+            for row in rows:
+                lines.append(rule['row_template'].format_map({**slot_values, **row}))
+            return "\n".join(lines).strip()
+
+        except (KeyError, ValueError) as e:
+            logger.warning(f"答案模板渲染失败 {rule.get('name')}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _label_values(record: Dict[str, Any], value_labels: Dict[str, Dict]) -> Dict[str, Any]:
+        """将枚举值转换为展示文本（如SUBSCRIBED -> 订阅）"""
+        row = dict(record)
+        for field_name, labels in value_labels.items():
+            if field_name in row:
+                row[field_name] = labels.get(row[field_name], row[field_name])
+        return row
+
+    @staticmethod
+    def _is_empty(value: Any) -> bool:
+        return value is None or (isinstance(value, str) and not value.strip())
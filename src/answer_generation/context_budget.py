@@ -0,0 +1,153 @@
+"""
+上下文预算模块
+用答案模型的分词器度量知识库上下文长度，在预算内保留价值最高的检索记录
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# 星级文本到数值的映射（图谱中星级以"五星"等中文存储）
+STAR_LEVEL_SCORES = {
+    "一星": 1, "二星": 2, "三星": 3, "四星": 4, "五星": 5,
+    "1星": 1, "2星": 2, "3星": 3, "4星": 4, "5星": 5
+}
+
+TRUNCATION_NOTE = "（注：受上下文长度限制，另有{dropped}条相关记录未展示）"
+
+
+class ContextBudget:
+    """
+    上下文token预算器
+
+    记录价值排序依据（按优先级）：
+    1. 与用户查询的字符重叠度
+    2. 价值评分 value_score
+    3. 星级 star_level
+    排序相同的记录保持图谱返回的原始顺序
+    """
+
+    def __init__(self,
+                 token_counter: Callable[[str], int],
+                 max_context_tokens: int = 1536):
+        """
+        初始化上下文预算器
+
+        Args:
+            token_counter: 文本token计数函数（使用答案模型的分词器）
+            max_context_tokens: 上下文token上限
+        """
+        self.token_counter = token_counter
+        self.max_context_tokens = max_context_tokens
+
+    def fit(self,
+            records: List[Dict[str, Any]],
+            user_query: str,
+            formatter: Callable[[List[Dict[str, Any]]], str]) -> Tuple[str, Dict[str, int]]:
+        """
+        在预算内格式化上下文
+
+        Args:
+            records: 图谱检索结果
+            user_query: 用户查询
+            formatter: 记录列表 -> 上下文文本 的格式化函数
+
+        Returns:
+            (上下文文本, 统计信息 {total, kept, dropped, context_tokens})
+        """
+        context = formatter(records)
+        context_tokens = self.token_counter(context)
+
+        if context_tokens <= self.max_context_tokens or len(records) <= 1:
+            return context, {
+                "total": len(records),
+                "kept": len(records),
+                "dropped": 0,
+                "context_tokens": context_tokens
+            }
+
+        # 按价值排序，贪心地按单条记录token成本装入预算
+        ranked = sorted(
+            range(len(records)),
+            key=lambda idx: self._record_priority(records[idx], user_query),
+            reverse=True
+        )
+        rank_position = {idx: pos for pos, idx in enumerate(ranked)}
+
+        # 预留截断说明的空间
+        budget = self.max_context_tokens - self.token_counter(TRUNCATION_NOTE.format(dropped=len(records)))
+
+        selected = []
+        used = 0
+        for idx in ranked:
+            cost = self.token_counter(formatter([records[idx]]))
+            if used + cost > budget and selected:
+                continue
+            selected.append(idx)
+            used += cost
+
+        # 保持原始顺序（图谱查询可能已按ORDER BY排好）
+        kept_indices = sorted(selected)
+        kept_records = [records[idx] for idx in kept_indices]
+        context = formatter(kept_records)
+
+        # 整体格式化后可能因序号/表头略超预算，按价值从低到高继续剔除
+        while len(kept_records) > 1 and self.token_counter(context) > budget:
+            lowest = max(kept_indices, key=rank_position.get)
+            kept_indices.remove(lowest)
+            kept_records = [records[idx] for idx in kept_indices]
+            context = formatter(kept_records)
+
+        dropped = len(records) - len(kept_records)
+        if dropped:
+            context = f"{context}\n\n{TRUNCATION_NOTE.format(dropped=dropped)}"
+
+        stats = {
+            "total": len(records),
+            "kept": len(kept_records),
+            "dropped": dropped,
+            "context_tokens": self.token_counter(context)
+        }
+        logger.info(f"上下文超出预算({context_tokens} > {self.max_context_tokens} tokens)，"
+                    f"保留 {stats['kept']}/{stats['total']} 条记录")
+
+        return context, stats
+
+    def _record_priority(self, record: Dict[str, Any], user_query: str) -> Tuple[float, float, float]:
+        """计算记录排序键（越大越优先）"""
+        return (
+            self._query_overlap(record, user_query),
+            self._to_number(record.get('value_score')),
+            float(self._star_level(record.get('star_level')))
+        )
+
+    @staticmethod
+    def _query_overlap(record: Dict[str, Any], user_query: str) -> float:
+        """记录文本与查询的字符二元组重叠比例"""
+        if not user_query:
+            return 0.0
+
+        query_bigrams = {user_query[i:i + 2] for i in range(len(user_query) - 1)}
+        if not query_bigrams:
+            return 0.0
+
+        record_text = " ".join(str(v) for v in record.values() if v)
+        hits = sum(1 for bigram in query_bigrams if bigram in record_text)
+        return hits / len(query_bigrams)
+
+    @staticmethod
+    def _to_number(value: Any) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _star_level(value: Any) -> int:
+        if value is None:
+            return 0
+        if isinstance(value, (int, float)):
+            return int(value)
+        return STAR_LEVEL_SCORES.get(str(value).strip(), 0)
@@ -0,0 +1,503 @@
+"""
+连续批处理生成引擎
+迭代级调度（iteration-level scheduling）：请求在解码步之间加入或离开运行中的批次，
+单个14B副本即可同时服务多个并发请求
+
+KV缓存按槽位管理：
+- 每个运行中的请求占用批次中的一行（槽位），槽位数上限为max_batch_size
+- 批次KV缓存采用左填充对齐，新请求单独prefill后左填充拼入批次
+- 请求结束后立即释放槽位，并裁剪所有行共有的左侧填充列
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Set
+
+import torch
+
+from ..monitoring.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GenerationRequest:
+    """提交到引擎的单个生成请求"""
+    input_ids: List[int]
+    max_new_tokens: int
+    temperature: float
+    top_p: float
+    repetition_penalty: Optional[float] = None
+    streamer: Any = None  # 兼容transformers Streamer接口（put/end）
+
+    output_ids: List[int] = field(default_factory=list)
+    error: Optional[Exception] = None
+    cancelled: bool = False
+    submitted_at: float = field(default_factory=time.perf_counter)
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self):
+        """取消请求：等待中的请求不再接纳，运行中的请求在下一个解码步前移出批次"""
+        self.cancelled = True
+
+    def wait(self, timeout: Optional[float] = None) -> List[int]:
+        """
+        阻塞等待生成完成
+
+        Args:
+            timeout: 超时时间（秒）
+
+        Returns:
+            新生成的token id列表
+        """
+        if not self._done.wait(timeout):
+            # 调用方已放弃结果，不再占用槽位继续解码
+            self.cancel()
+            raise TimeoutError("生成请求等待超时")
+        if self.error is not None:
+            raise self.error
+        return self.output_ids
+
+
+def _to_legacy_cache(past_key_values) -> tuple:
+    """将模型返回的Cache对象统一转换为 ((k, v), ...) 元组格式"""
+    if hasattr(past_key_values, 'to_legacy_cache'):
+        return past_key_values.to_legacy_cache()
+    return tuple(past_key_values)
+
+
+def _from_legacy_cache(legacy_cache: tuple):
+    """将元组格式KV转换为模型可接受的Cache对象"""
+    try:
+        from transformers import DynamicCache
+        return DynamicCache.from_legacy_cache(legacy_cache)
+    except (ImportError, AttributeError):
+        return legacy_cache
+
+
+class ContinuousBatchingEngine:
+    """
+    连续批处理生成引擎
+
+    后台线程独占模型，循环执行：
+    1. 接纳等待队列中的新请求（prefill后加入批次）
+    2. 对批次中所有请求执行一次解码步
+    3. 移除已完成的请求，释放槽位
+    """
+
+    def __init__(self,
+                 model,
+                 tokenizer,
+                 max_batch_size: int = 8,
+                 max_batch_tokens: int = 32768,
+                 idle_wait: float = 0.1,
+                 model_name: str = "answer_generation"):
+        """
+        初始化生成引擎
+
+        Args:
+            model: 已加载的CausalLM模型
+            tokenizer: 对应分词器
+            max_batch_size: 最大并发槽位数
+            max_batch_tokens: 批次中 (prompt + max_new_tokens) 总量上限，防止KV缓存显存溢出
+            idle_wait: 无请求时的等待间隔（秒）
+            model_name: 指标中的模型名称
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.idle_wait = idle_wait
+        self.model_name = model_name
+
+        self.device = next(model.parameters()).device
+        self.eos_token_ids = self._collect_eos_token_ids()
+
+        self._waiting: "queue.Queue[GenerationRequest]" = queue.Queue()
+        self._pending: Optional[GenerationRequest] = None  # 因容量不足暂缓接纳的请求
+
+        # 运行中批次状态（槽位 i 对应第 i 行）
+        self._active: List[GenerationRequest] = []
+        self._past_key_values: Optional[tuple] = None
+        self._attention_mask: Optional[torch.Tensor] = None
+        self._next_tokens: Optional[torch.Tensor] = None  # 每行下一步的输入token，尚未写入KV
+
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _collect_eos_token_ids(self) -> Set[int]:
+        """收集所有结束符id（Qwen系列generation_config中包含多个）"""
+        eos_ids = set()
+        if self.tokenizer.eos_token_id is not None:
+            eos_ids.add(self.tokenizer.eos_token_id)
+
+        config_eos = getattr(getattr(self.model, 'generation_config', None), 'eos_token_id', None)
+        if isinstance(config_eos, int):
+            eos_ids.add(config_eos)
+        elif config_eos:
+            eos_ids.update(config_eos)
+
+        return eos_ids
+
+    # ========== 生命周期 ==========
+
+    def start(self):
+        """启动调度线程"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="generation-engine", daemon=True)
+        self._thread.start()
+        logger.info(f"连续批处理引擎已启动 (max_batch_size={self.max_batch_size})")
+
+    def stop(self):
+        """停止调度线程，未完成的请求以错误结束"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+        # 调度线程仍在执行解码步时由其退出循环后自行结束剩余请求，避免两个线程同时修改批次状态
+        if self._thread is None or not self._thread.is_alive():
+            self._fail_all(RuntimeError("生成引擎已停止"))
+        logger.info("连续批处理引擎已停止")
+
+    # ========== 请求提交 ==========
+
+    def submit(self,
+               input_ids: List[int],
+               max_new_tokens: int,
+               temperature: float,
+               top_p: float,
+               repetition_penalty: Optional[float] = None,
+               streamer: Any = None) -> GenerationRequest:
+        """
+        提交生成请求（非阻塞）
+
+        Returns:
+            GenerationRequest，可调用wait()获取结果
+        """
+        request = GenerationRequest(
+            input_ids=list(input_ids),
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            repetition_penalty=repetition_penalty,
+            streamer=streamer
+        )
+
+        if not self._running:
+            self.start()
+
+        self._waiting.put(request)
+        return request
+
+    # ========== 调度循环 ==========
+
+    def _loop(self):
+        while self._running:
+            try:
+                self._admit_requests()
+
+                if not self._active:
+                    continue
+
+                self._decode_step()
+
+            except Exception as e:
+                logger.error(f"生成引擎解码失败: {str(e)}", exc_info=True)
+                self._fail_all(e)
+
+        # 停止后结束批次内与排队中的请求（stop()等待超时时由调度线程在此完成）
+        self._fail_all(RuntimeError("生成引擎已停止"))
+
+    def _batch_token_usage(self) -> int:
+        return sum(len(r.input_ids) + r.max_new_tokens for r in self._active)
+
+    def _admit_requests(self):
+        """在解码步之间接纳新请求，直到槽位或token预算用尽"""
+        while len(self._active) < self.max_batch_size:
+            if self._pending is not None:
+                request, self._pending = self._pending, None
+            else:
+                try:
+                    if self._active:
+                        # 批次运行中不等待，立即进入下一解码步
+                        request = self._waiting.get_nowait()
+                    else:
+                        # 批次为空时短暂阻塞等待，避免空转
+                        request = self._waiting.get(timeout=self.idle_wait)
+                except queue.Empty:
+                    return
+
+            if request.cancelled:
+                self._finish(request, error=RuntimeError("生成请求已取消"))
+                continue
+
+            request_tokens = len(request.input_ids) + request.max_new_tokens
+            if self._active and self._batch_token_usage() + request_tokens > self.max_batch_tokens:
+                # 预算不足，等待已有请求完成后再接纳
+                self._pending = request
+                return
+
+            try:
+                self._prefill(request)
+            except Exception as e:
+                logger.error(f"请求prefill失败: {str(e)}")
+                self._finish(request, error=e)
+
+    def _prefill(self, request: GenerationRequest):
+        """单独对新请求执行prefill，并将其KV左填充后拼入批次"""
+        input_ids = torch.tensor([request.input_ids], dtype=torch.long, device=self.device)
+
+        if request.streamer is not None:
+            # 与generate保持一致：先推送prompt（skip_prompt=True的streamer会忽略）
+            request.streamer.put(input_ids.cpu())
+
+        with torch.no_grad():
+            outputs = self.model(input_ids=input_ids, use_cache=True)
+
+        first_token = self._sample(outputs.logits[:, -1, :], [request])[0]
+        new_cache = _to_legacy_cache(outputs.past_key_values)
+        new_mask = torch.ones((1, input_ids.shape[1]), dtype=torch.long, device=self.device)
+
+        if self._emit_token(request, first_token):
+            self._finish(request)
+            return
+
+        token_tensor = torch.tensor([[first_token]], dtype=torch.long, device=self.device)
+
+        if not self._active:
+            self._past_key_values = new_cache
+            self._attention_mask = new_mask
+            self._next_tokens = token_tensor
+        else:
+            self._past_key_values, self._attention_mask = self._join_cache(
+                self._past_key_values, self._attention_mask, new_cache, new_mask
+            )
+            self._next_tokens = torch.cat([self._next_tokens, token_tensor], dim=0)
+
+        self._active.append(request)
+
+    def _join_cache(self, batch_cache, batch_mask, new_cache, new_mask):
+        """将新行的KV与批次KV左填充到相同长度后按batch维拼接"""
+        batch_len = batch_mask.shape[1]
+        new_len = new_mask.shape[1]
+
+        if new_len < batch_len:
+            new_cache = self._left_pad_cache(new_cache, batch_len - new_len)
+            new_mask = self._left_pad_mask(new_mask, batch_len - new_len)
+        elif new_len > batch_len:
+            batch_cache = self._left_pad_cache(batch_cache, new_len - batch_len)
+            batch_mask = self._left_pad_mask(batch_mask, new_len - batch_len)
+
+        joined_cache = tuple(
+            (torch.cat([bk, nk], dim=0), torch.cat([bv, nv], dim=0))
+            for (bk, bv), (nk, nv) in zip(batch_cache, new_cache)
+        )
+        joined_mask = torch.cat([batch_mask, new_mask], dim=0)
+        return joined_cache, joined_mask
+
+    @staticmethod
+    def _left_pad_cache(cache, pad_len: int):
+        """KV形状为 [batch, heads, seq, head_dim]，在seq维左侧补零"""
+        padded = []
+        for key, value in cache:
+            pad_shape = list(key.shape)
+            pad_shape[2] = pad_len
+            key_pad = key.new_zeros(pad_shape)
+            value_pad = value.new_zeros(pad_shape[:3] + [value.shape[3]])
+            padded.append((torch.cat([key_pad, key], dim=2), torch.cat([value_pad, value], dim=2)))
+        return tuple(padded)
+
+    @staticmethod
+    def _left_pad_mask(mask: torch.Tensor, pad_len: int) -> torch.Tensor:
+        pad = mask.new_zeros((mask.shape[0], pad_len))
+        return torch.cat([pad, mask], dim=1)
+
+    def _decode_step(self):
+        """对批次内所有请求执行一次解码（先移出已取消的请求）"""
+        if any(request.cancelled for request in self._active):
+            self._evict_cancelled()
+            if not self._active:
+                return
+
+        attention_mask = torch.cat(
+            [self._attention_mask, self._attention_mask.new_ones((len(self._active), 1))],
+            dim=1
+        )
+        position_ids = attention_mask.sum(dim=1, keepdim=True) - 1
+
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=self._next_tokens,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=_from_legacy_cache(self._past_key_values),
+                use_cache=True
+            )
+
+        self._past_key_values = _to_legacy_cache(outputs.past_key_values)
+        self._attention_mask = attention_mask
+
+        next_tokens = self._sample(outputs.logits[:, -1, :], self._active)
+
+        keep_rows = []
+        for row, (request, token) in enumerate(zip(self._active, next_tokens)):
+            if self._emit_token(request, token):
+                self._finish(request)
+            else:
+                keep_rows.append(row)
+
+        self._next_tokens = torch.tensor(
+            [[next_tokens[row]] for row in keep_rows], dtype=torch.long, device=self.device
+        )
+
+        if len(keep_rows) < len(self._active):
+            self._evict_rows(keep_rows)
+
+    def _evict_cancelled(self):
+        """结束已取消的请求并释放其槽位"""
+        keep_rows = []
+        for row, request in enumerate(self._active):
+            if request.cancelled:
+                self._finish(request, error=RuntimeError("生成请求已取消"))
+            else:
+                keep_rows.append(row)
+
+        if keep_rows:
+            self._next_tokens = self._next_tokens.index_select(
+                0, torch.tensor(keep_rows, dtype=torch.long, device=self.device)
+            )
+        self._evict_rows(keep_rows)
+
+    def _evict_rows(self, keep_rows: List[int]):
+        """释放已完成请求的槽位，并裁剪剩余行共同的左侧填充"""
+        self._active = [self._active[row] for row in keep_rows]
+
+        if not keep_rows:
+            self._past_key_values = None
+            self._attention_mask = None
+            self._next_tokens = None
+            return
+
+        index = torch.tensor(keep_rows, dtype=torch.long, device=self.device)
+        mask = self._attention_mask.index_select(0, index)
+
+        # 所有行都为填充的前缀列可以直接丢弃
+        real_lengths = mask.sum(dim=1)
+        trim = int(mask.shape[1] - real_lengths.max().item())
+
+        self._attention_mask = mask[:, trim:]
+        self._past_key_values = tuple(
+            (key.index_select(0, index)[:, :, trim:, :], value.index_select(0, index)[:, :, trim:, :])
+            for key, value in self._past_key_values
+        )
+
+    # ========== 采样与结束判定 ==========
+
+    def _sample(self, logits: torch.Tensor, requests: List[GenerationRequest]) -> List[int]:
+        """逐行按各请求的采样参数选取下一个token"""
+        tokens = []
+        logits = logits.float()
+
+        for row, request in enumerate(requests):
+            row_logits = logits[row]
+
+            if request.repetition_penalty and request.repetition_penalty != 1.0:
+                seen = torch.tensor(
+                    list(set(request.input_ids + request.output_ids)),
+                    dtype=torch.long, device=row_logits.device
+                )
+                scores = row_logits.index_select(0, seen)
+                scores = torch.where(
+                    scores < 0,
+                    scores * request.repetition_penalty,
+                    scores / request.repetition_penalty
+                )
+                row_logits = row_logits.index_copy(0, seen, scores)
+
+            if request.temperature <= 0:
+                tokens.append(int(torch.argmax(row_logits).item()))
+                continue
+
+            row_logits = row_logits / request.temperature
+
+            if request.top_p < 1.0:
+                sorted_logits, sorted_indices = torch.sort(row_logits, descending=True)
+                cumulative = torch.softmax(sorted_logits, dim=-1).cumsum(dim=-1)
+                # 保留累计概率首次超过top_p的token
+                remove = cumulative > request.top_p
+                remove[1:] = remove[:-1].clone()
+                remove[0] = False
+                row_logits = row_logits.index_fill(0, sorted_indices[remove], float('-inf'))
+
+            probs = torch.softmax(row_logits, dim=-1)
+            tokens.append(int(torch.multinomial(probs, num_samples=1).item()))
+
+        return tokens
+
+    def _emit_token(self, request: GenerationRequest, token: int) -> bool:
+        """
+        记录新token并判断请求是否结束
+
+        Returns:
+            是否已结束
+        """
+        if token in self.eos_token_ids:
+            return True
+
+        request.output_ids.append(token)
+        if request.streamer is not None:
+            request.streamer.put(torch.tensor([token]))
+
+        return len(request.output_ids) >= request.max_new_tokens
+
+    def _finish(self, request: GenerationRequest, error: Optional[Exception] = None):
+        request.error = error
+        if error is None:
+            get_metrics().observe_generation(
+                self.model_name,
+                len(request.input_ids),
+                len(request.output_ids),
+                time.perf_counter() - request.submitted_at
+            )
+        if request.streamer is not None:
+            request.streamer.end()
+        request._done.set()
+
+    def _fail_all(self, error: Exception):
+        """解码异常或引擎停止时结束批次内与暂缓的请求（停止时还包括排队中的请求），保证调用方不会永久阻塞"""
+        for request in self._active:
+            self._finish(request, error=error)
+        self._active = []
+        self._past_key_values = None
+        self._attention_mask = None
+        self._next_tokens = None
+
+        if self._pending is not None:
+            self._finish(self._pending, error=error)
+            self._pending = None
+
+        # 引擎停止后排队中的请求无人接纳，同样以错误结束（解码异常时引擎继续运行，排队请求照常处理）
+        if not self._running:
+            while True:
+                try:
+                    self._finish(self._waiting.get_nowait(), error=error)
+                except queue.Empty:
+                    break
+
+    def get_stats(self) -> dict:
+        """引擎运行状态"""
+        return {
+            "active_requests": len(self._active),
+            "waiting_requests": self._waiting.qsize() + (1 if self._pending else 0),
+            "max_batch_size": self.max_batch_size,
+            "kv_cache_length": self._attention_mask.shape[1] if self._attention_mask is not None else 0
+        }
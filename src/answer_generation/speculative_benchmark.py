@@ -0,0 +1,225 @@
+"""
+投机解码基准测试
+对比普通generate与草稿模型辅助生成（Assisted Generation）在RAG提示词上的表现
+
+指标：
+- tokens/sec: 新生成token数 / 生成耗时
+- time-to-last-token: 单条请求从开始生成到最后一个token的耗时
+
+用法：
+    python3 -m src.answer_generation.speculative_benchmark \
+        --prompts data/processed/rag_prompts.jsonl --repeats 3
+"""
+
+import json
+import logging
+import statistics
+import time
+from typing import Dict, List
+
+from .answer_generator import AnswerGenerator
+
+logger = logging.getLogger(__name__)
+
+
+# 默认RAG样例（与线上GraphQuery.format_context输出格式一致）
+DEFAULT_RAG_PROMPTS = [
+    {
+        "query": "M域有哪些五星标签资产？",
+        "intent": "31",
+        "context": """检索到以下资产：
+
+1. 资产名称: 宽带提质速率(月)
+   描述: 统计宽带用户月度提速情况
+   类型: 标签
+   星级: 五星
+
+2. 资产名称: 新星级长高用户清单(月)
+   描述: 月度新增星级长高用户明细
+   类型: 标签
+   星级: 五星
+"""
+    },
+    {
+        "query": "宽带提质速率(月)这个资产是干什么用的？",
+        "intent": "32",
+        "context": """资产元数据信息：
+  name: 宽带提质速率(月)
+  description: 统计宽带用户月度提速情况
+  business_purpose: 支撑宽带提质专项的月度考核
+  owner: 张三
+  type: 标签
+  status: 已上线"""
+    },
+    {
+        "query": "新员工入职场景需要哪些核心资产？",
+        "intent": "36",
+        "context": """检索到以下资产：
+
+1. 资产名称: HR系统
+   描述: 人力资源管理系统，负责员工信息管理
+   类型: 系统
+
+2. 资产名称: OA系统
+   描述: 办公自动化系统
+   类型: 系统
+
+3. 资产名称: 统一认证系统
+   描述: 企业统一身份认证平台
+   类型: 系统
+"""
+    }
+]
+
+
+def load_prompts(prompts_path: str = None) -> List[Dict[str, str]]:
+    """
+    加载RAG提示词样本
+
+    Args:
+        prompts_path: JSONL文件路径，每行包含query、context、intent（可选）
+
+    Returns:
+        样本列表
+    """
+    if not prompts_path:
+        return DEFAULT_RAG_PROMPTS
+
+    prompts = []
+    with open(prompts_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                prompts.append(json.loads(line))
+
+    logger.info(f"加载 {len(prompts)} 条RAG样本: {prompts_path}")
+    return prompts
+
+
+def run_mode(generator: AnswerGenerator,
+             prompts: List[Dict[str, str]],
+             use_assistant: bool,
+             repeats: int,
+             max_new_tokens: int,
+             temperature: float) -> Dict[str, float]:
+    """
+    在指定模式下运行全部样本
+
+    Returns:
+        汇总指标字典
+    """
+    latencies = []
+    total_tokens = 0
+    total_time = 0.0
+
+    for _ in range(repeats):
+        for item in prompts:
+            messages = generator._build_rag_prompt(
+                item['query'], item['context'], item.get('intent', '')
+            )
+
+            start = time.perf_counter()
+            _, num_tokens = generator._generate_text(
+                messages,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                top_p=generator.model_config['top_p'],
+                repetition_penalty=generator.model_config.get('repetition_penalty', 1.1),
+                use_assistant=use_assistant
+            )
+            elapsed = time.perf_counter() - start
+
+            latencies.append(elapsed)
+            total_tokens += num_tokens
+            total_time += elapsed
+
+    latencies.sort()
+    p95_idx = min(len(latencies) - 1, int(len(latencies) * 0.95))
+
+    return {
+        "requests": len(latencies),
+        "generated_tokens": total_tokens,
+        "tokens_per_sec": total_tokens / total_time if total_time > 0 else 0.0,
+        "ttlt_mean": statistics.mean(latencies),
+        "ttlt_p50": statistics.median(latencies),
+        "ttlt_p95": latencies[p95_idx]
+    }
+
+
+def run_benchmark(config_path: str = "config/config.yaml",
+                  prompts_path: str = None,
+                  repeats: int = 3,
+                  max_new_tokens: int = 512,
+                  temperature: float = 0.0) -> Dict[str, Dict[str, float]]:
+    """
+    运行投机解码基准测试
+
+    Args:
+        config_path: 配置文件路径
+        prompts_path: RAG样本路径（默认使用内置样本）
+        repeats: 每条样本重复次数
+        max_new_tokens: 最大生成token数
+        temperature: 温度（默认贪心解码，保证两种模式输出可比）
+
+    Returns:
+        {"baseline": {...}, "speculative": {...}}
+    """
+    generator = AnswerGenerator(config_path)
+    generator.load_model()
+    generator.load_draft_model()
+
+    prompts = load_prompts(prompts_path)
+
+    # 预热，避免首轮CUDA初始化干扰结果
+    run_mode(generator, prompts[:1], False, 1, 16, temperature)
+
+    results = {
+        "baseline": run_mode(generator, prompts, False, repeats, max_new_tokens, temperature)
+    }
+
+    if generator.draft_model is not None:
+        run_mode(generator, prompts[:1], True, 1, 16, temperature)
+        results["speculative"] = run_mode(
+            generator, prompts, True, repeats, max_new_tokens, temperature
+        )
+    else:
+        logger.warning("草稿模型不可用，仅输出普通解码结果")
+
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="投机解码基准测试")
+    parser.add_argument("--config", type=str, default="config/config.yaml", help="配置文件路径")
+    parser.add_argument("--prompts", type=str, default=None, help="RAG样本JSONL路径")
+    parser.add_argument("--repeats", type=int, default=3, help="每条样本重复次数")
+    parser.add_argument("--max_new_tokens", type=int, default=512, help="最大生成token数")
+    parser.add_argument("--temperature", type=float, default=0.0, help="温度参数")
+    parser.add_argument("--output", type=str, default=None, help="结果输出JSON路径")
+
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        config_path=args.config,
+        prompts_path=args.prompts,
+        repeats=args.repeats,
+        max_new_tokens=args.max_new_tokens,
+        temperature=args.temperature
+    )
+
+    print(f"\n{'模式':<12}{'请求数':>8}{'tokens/s':>12}{'TTLT均值':>12}{'TTLT p50':>12}{'TTLT p95':>12}")
+    for mode, stats in results.items():
+        print(f"{mode:<12}{stats['requests']:>8}{stats['tokens_per_sec']:>12.2f}"
+              f"{stats['ttlt_mean']:>11.2f}s{stats['ttlt_p50']:>11.2f}s{stats['ttlt_p95']:>11.2f}s")
+
+    if 'speculative' in results and results['baseline']['tokens_per_sec'] > 0:
+        speedup = results['speculative']['tokens_per_sec'] / results['baseline']['tokens_per_sec']
+        print(f"\n投机解码加速比: {speedup:.2f}x")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
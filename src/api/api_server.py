@@ -3,8 +3,9 @@ API服务器
 基于Flask提供RESTful API接口
 """
 
+import json
 import logging
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from typing import Dict, Any
 
@@ -28,6 +29,17 @@ def create_app(config_path: str = "config/config.yaml") -> Flask:
 
     # 初始化编排器
     orchestrator = Orchestrator(config_path)
+
+    # 后台预加载模型，避免部署后首个请求承担模型加载耗时
+    api_config = orchestrator.intent_classifier.config.get('api', {})
+    if api_config.get('preload_models', True):
+        orchestrator.start_preload(warmup=api_config.get('warmup', True))
+
+    # Prometheus指标独立端口（monitoring.metrics_port），同时提供 /metrics 路由
+    monitoring_config = orchestrator.intent_classifier.config.get('monitoring', {}) or {}
+    if monitoring_config.get('enabled', False) and monitoring_config.get('prometheus_enabled', False):
+        orchestrator.metrics.start_http_server(monitoring_config.get('metrics_port', 9090))
+
     logger.info("API服务初始化完成")
 
     @app.route('/health', methods=['GET'])
@@ -38,6 +50,37 @@ def create_app(config_path: str = "config/config.yaml") -> Flask:
             "service": "AI Knowledge Assistant"
         }), 200
 
+    @app.route('/ready', methods=['GET'])
+    def readiness_check():
+        """
+        就绪检查接口（负载均衡器只将流量路由到就绪实例）
+
+        响应:
+        {
+            "ready": true/false,
+            "components": {
+                "intent_model": {"status": "ready", "load_seconds": 95.3},
+                "answer_model": {"status": "loading"},
+                "neo4j": {"status": "ready"}
+            }
+        }
+        """
+        readiness = orchestrator.get_readiness()
+        return jsonify(readiness), 200 if readiness['ready'] else 503
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus指标接口（需安装prometheus_client并开启monitoring.prometheus_enabled）"""
+        rendered = orchestrator.metrics.render_prometheus()
+        if rendered is None:
+            return jsonify({
+                "success": False,
+                "error": "Prometheus指标未启用"
+            }), 404
+
+        content, content_type = rendered
+        return Response(content, mimetype=content_type.split(';')[0], headers={"Content-Type": content_type})
+
     @app.route('/api/v1/query', methods=['POST'])
     def query():
         """
@@ -96,6 +139,53 @@ def create_app(config_path: str = "config/config.yaml") -> Flask:
                 "error": f"服务器错误: {str(e)}"
             }), 500
 
+    @app.route('/api/v1/query/stream', methods=['POST'])
+    def query_stream():
+        """
+        流式查询接口（Server-Sent Events）
+
+        请求体:
+        {
+            "query": "用户查询文本"
+        }
+
+        响应（text/event-stream），事件依次为:
+            event: intent   意图与槽位
+            event: graph    图谱检索结果（平台帮助意图无此事件）
+            event: token    增量答案文本，可多次
+            event: done     完整响应（结构同 /api/v1/query 的 data）
+            event: error    处理失败
+        """
+        data = request.get_json(silent=True)
+
+        if not data or 'query' not in data:
+            return jsonify({
+                "success": False,
+                "error": "缺少必需参数: query"
+            }), 400
+
+        user_query = data['query'].strip()
+
+        if not user_query:
+            return jsonify({
+                "success": False,
+                "error": "查询内容不能为空"
+            }), 400
+
+        def event_stream():
+            for event in orchestrator.stream_query(user_query):
+                payload = json.dumps(event['data'], ensure_ascii=False, default=str)
+                yield f"event: {event['event']}\ndata: {payload}\n\n"
+
+        return Response(
+            stream_with_context(event_stream()),
+            mimetype='text/event-stream',
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"  # 关闭Nginx缓冲，保证token实时推送
+            }
+        )
+
     @app.route('/api/v1/stats', methods=['GET'])
     def get_stats():
         """
@@ -160,12 +250,9 @@ def create_app(config_path: str = "config/config.yaml") -> Flask:
                     "error": "queries必须是列表"
                 }), 400
 
-            # 批量处理
-            results = []
-            for query in queries:
-                if isinstance(query, str) and query.strip():
-                    result = orchestrator.process_query(query.strip())
-                    results.append(result)
+            # 批量处理（去重、批量意图识别、并发检索、批量生成；单条失败不影响整批）
+            valid_queries = [query.strip() for query in queries if isinstance(query, str) and query.strip()]
+            results = orchestrator.process_batch(valid_queries)
 
             return jsonify({
                 "success": True,
@@ -225,7 +312,10 @@ def run_server(host: str = "0.0.0.0",
     logger.info(f"启动API服务器: http://{host}:{port}")
     logger.info("接口列表:")
     logger.info("  GET  /health              - 健康检查")
+    logger.info("  GET  /ready               - 就绪检查")
+    logger.info("  GET  /metrics             - Prometheus指标")
     logger.info("  POST /api/v1/query        - 单个查询")
+    logger.info("  POST /api/v1/query/stream - 流式查询(SSE)")
     logger.info("  POST /api/v1/batch_query  - 批量查询")
     logger.info("  GET  /api/v1/stats        - 服务统计")
     
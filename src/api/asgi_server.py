@@ -0,0 +1,286 @@
+"""
+ASGI API服务器
+基于Starlette + AsyncOrchestrator，提供与Flask版本一致的接口契约，可用uvicorn多worker运行
+
+用法：
+    python3 -m src.api.asgi_server --workers 4
+    # 或
+    KNOWLEDGE_ASSISTANT_CONFIG=config/config.yaml \
+        uvicorn src.api.asgi_server:app_factory --factory --workers 4 --port 8000
+
+说明：
+- 每个uvicorn worker是独立进程，会各自加载模型；多worker部署建议开启model_server，
+  由独立模型服务进程持有权重（见 src/model_server）
+- api.max_concurrent_requests 限制每个worker同时处理的请求数，超出时立即返回503
+- api.timeout 为单个请求的截止时间，超时返回504
+- 多worker时Prometheus指标使用prometheus_client多进程模式：run_asgi_server在启动worker前设置
+  PROMETHEUS_MULTIPROC_DIR（直接用uvicorn启动时需自行设置并在启动前清空该目录），
+  /metrics与monitoring.metrics_port导出的是全部worker的汇总
+
+依赖: pip install starlette uvicorn
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from ..monitoring.metrics import MULTIPROC_DIR_ENV
+from ..orchestrator.async_orchestrator import AsyncOrchestrator
+
+logger = logging.getLogger(__name__)
+
+
+CONFIG_ENV_VAR = "KNOWLEDGE_ASSISTANT_CONFIG"
+
+
+def create_asgi_app(config_path: str = "config/config.yaml") -> Starlette:
+    """
+    创建ASGI应用
+
+    Args:
+        config_path: 配置文件路径
+
+    Returns:
+        Starlette应用实例
+    """
+    async_orchestrator = AsyncOrchestrator(config_path=config_path)
+    orchestrator = async_orchestrator.orchestrator
+
+    api_config = orchestrator.intent_classifier.config.get('api', {}) or {}
+    request_timeout = api_config.get('timeout', 120)
+    concurrency_limit = asyncio.Semaphore(api_config.get('max_concurrent_requests', 100))
+
+    monitoring_config = orchestrator.intent_classifier.config.get('monitoring', {}) or {}
+    prometheus_enabled = monitoring_config.get('enabled', False) and monitoring_config.get('prometheus_enabled', False)
+
+    async def on_startup():
+        await async_orchestrator.start()
+        if api_config.get('preload_models', True):
+            orchestrator.start_preload(warmup=api_config.get('warmup', True))
+        if prometheus_enabled:
+            # 多worker时只有一个worker能占用端口（其余记录警告），多进程模式下导出全部worker的汇总
+            orchestrator.metrics.start_http_server(monitoring_config.get('metrics_port', 9090))
+        logger.info("ASGI API服务初始化完成")
+
+    async def on_shutdown():
+        await async_orchestrator.stop()
+
+    async def _read_json(request: Request) -> Optional[dict]:
+        try:
+            return await request.json()
+        except Exception:
+            return None
+
+    def _busy_response() -> JSONResponse:
+        return JSONResponse({
+            "success": False,
+            "error": "服务繁忙，请稍后重试"
+        }, status_code=503)
+
+    async def health_check(request: Request) -> JSONResponse:
+        """健康检查接口"""
+        return JSONResponse({
+            "status": "healthy",
+            "service": "AI Knowledge Assistant"
+        })
+
+    async def readiness_check(request: Request) -> JSONResponse:
+        """就绪检查接口"""
+        readiness = await asyncio.get_running_loop().run_in_executor(None, orchestrator.get_readiness)
+        return JSONResponse(readiness, status_code=200 if readiness['ready'] else 503)
+
+    async def query(request: Request) -> JSONResponse:
+        """主查询接口（请求/响应结构同Flask版本 /api/v1/query）"""
+        data = await _read_json(request)
+
+        if not data or 'query' not in data:
+            return JSONResponse({
+                "success": False,
+                "error": "缺少必需参数: query"
+            }, status_code=400)
+
+        user_query = str(data['query']).strip()
+
+        if not user_query:
+            return JSONResponse({
+                "success": False,
+                "error": "查询内容不能为空"
+            }, status_code=400)
+
+        if concurrency_limit.locked():
+            return _busy_response()
+
+        async with concurrency_limit:
+            result = await async_orchestrator.process_query(user_query, timeout=request_timeout)
+
+        if 'timeout_stage' in result:
+            return JSONResponse({
+                "success": False,
+                "error": f"请求超时: {result['error']}",
+                "data": result
+            }, status_code=504)
+
+        return JSONResponse({
+            "success": True,
+            "data": result
+        })
+
+    async def batch_query(request: Request) -> JSONResponse:
+        """批量查询接口（请求/响应结构同Flask版本 /api/v1/batch_query）"""
+        data = await _read_json(request)
+
+        if not data or 'queries' not in data:
+            return JSONResponse({
+                "success": False,
+                "error": "缺少必需参数: queries"
+            }, status_code=400)
+
+        queries = data['queries']
+
+        if not isinstance(queries, list):
+            return JSONResponse({
+                "success": False,
+                "error": "queries必须是列表"
+            }, status_code=400)
+
+        if concurrency_limit.locked():
+            return _busy_response()
+
+        valid_queries = [q.strip() for q in queries if isinstance(q, str) and q.strip()]
+
+        # 整批走Orchestrator.process_batch（去重 + 批量推理），模型调用经过流水线各阶段，受api.timeout约束
+        async with concurrency_limit:
+            try:
+                results = await async_orchestrator.process_batch(valid_queries, timeout=request_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"批量查询超时 ({len(valid_queries)} 条, {request_timeout}s)")
+                return JSONResponse({
+                    "success": False,
+                    "error": f"请求超时: 批量查询超过 {request_timeout}s"
+                }, status_code=504)
+
+        return JSONResponse({
+            "success": True,
+            "data": {
+                "count": len(results),
+                "results": list(results)
+            }
+        })
+
+    async def get_stats(request: Request) -> JSONResponse:
+        """获取服务统计信息"""
+        try:
+            return JSONResponse({
+                "success": True,
+                "data": async_orchestrator.get_stats()
+            })
+        except Exception as e:
+            logger.error(f"获取统计信息失败: {str(e)}")
+            return JSONResponse({
+                "success": False,
+                "error": str(e)
+            }, status_code=500)
+
+    async def metrics(request: Request) -> Response:
+        """Prometheus指标接口"""
+        rendered = orchestrator.metrics.render_prometheus()
+        if rendered is None:
+            return JSONResponse({
+                "success": False,
+                "error": "Prometheus指标未启用"
+            }, status_code=404)
+
+        content, content_type = rendered
+        return Response(content, headers={"Content-Type": content_type})
+
+    routes = [
+        Route('/health', health_check, methods=['GET']),
+        Route('/ready', readiness_check, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/api/v1/query', query, methods=['POST']),
+        Route('/api/v1/batch_query', batch_query, methods=['POST']),
+        Route('/api/v1/stats', get_stats, methods=['GET'])
+    ]
+
+    return Starlette(routes=routes, on_startup=[on_startup], on_shutdown=[on_shutdown])
+
+
+def app_factory() -> Starlette:
+    """uvicorn --factory 入口（配置路径取环境变量KNOWLEDGE_ASSISTANT_CONFIG）"""
+    return create_asgi_app(os.environ.get(CONFIG_ENV_VAR, "config/config.yaml"))
+
+
+def run_asgi_server(host: str = "0.0.0.0",
+                    port: int = 8000,
+                    workers: int = 1,
+                    config_path: str = "config/config.yaml"):
+    """
+    使用uvicorn运行ASGI服务
+
+    Args:
+        host: 主机地址
+        port: 端口号
+        workers: worker进程数
+        config_path: 配置文件路径
+    """
+    import uvicorn
+
+    os.environ[CONFIG_ENV_VAR] = config_path
+
+    # 多worker时各worker的Prometheus指标写入共享目录，导出时汇总（必须在worker导入prometheus_client前设置）
+    if workers > 1 and not os.environ.get(MULTIPROC_DIR_ENV):
+        os.environ[MULTIPROC_DIR_ENV] = tempfile.mkdtemp(prefix="knowledge-assistant-metrics-")
+        logger.info(f"Prometheus多进程模式: {os.environ[MULTIPROC_DIR_ENV]}")
+
+    logger.info(f"启动ASGI API服务器: http://{host}:{port} (workers={workers})")
+    logger.info("接口列表:")
+    logger.info("  GET  /health              - 健康检查")
+    logger.info("  GET  /ready               - 就绪检查")
+    logger.info("  GET  /metrics             - Prometheus指标")
+    logger.info("  POST /api/v1/query        - 单个查询")
+    logger.info("  POST /api/v1/batch_query  - 批量查询")
+    logger.info("  GET  /api/v1/stats        - 服务统计")
+
+    # 多worker需要以导入路径方式指定应用
+    uvicorn.run(
+        "src.api.asgi_server:app_factory",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    import argparse
+    import yaml
+
+    parser = argparse.ArgumentParser(description="ASGI API服务器")
+    parser.add_argument("--config", type=str, default="config/config.yaml", help="配置文件路径")
+    parser.add_argument("--host", type=str, default=None, help="主机地址（默认取api.host）")
+    parser.add_argument("--port", type=int, default=None, help="端口号（默认取api.port）")
+    parser.add_argument("--workers", type=int, default=None, help="worker进程数（默认取api.workers）")
+
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        api_config = yaml.safe_load(f).get('api', {}) or {}
+
+    run_asgi_server(
+        host=args.host or api_config.get('host', '0.0.0.0'),
+        port=args.port or api_config.get('port', 8000),
+        workers=args.workers or api_config.get('workers', 1),
+        config_path=args.config
+    )
@@ -12,9 +12,10 @@ from typing import List, Dict, Any, Optional
 from pathlib import Path
 import pandas as pd
 import yaml
-from transformers import AutoTokenizer, AutoModelForCausalLM
 import torch
 
+from ..inference.model_registry import get_model_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -46,19 +47,15 @@ class DataAugmentation:
         """
         logger.info(f"加载LLM模型: {model_path}")
 
-        self.tokenizer = AutoTokenizer.from_pretrained(
-            model_path,
-            trust_remote_code=True
-        )
-
-        self.model = AutoModelForCausalLM.from_pretrained(
+        # 通过进程级注册表加载，与意图识别等组件共享同一份权重
+        registry = get_model_registry()
+        self.tokenizer = registry.get_tokenizer(model_path)
+        self.model = registry.get_model(
             model_path,
-            device_map="auto",
-            torch_dtype=torch.float16,
-            trust_remote_code=True
+            dtype=torch.float16,
+            device="cuda"
         )
 
-        self.model.eval()
         logger.info("LLM模型加载成功")
 
     def paraphrase_sample(self, 
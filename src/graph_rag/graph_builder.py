@@ -4,11 +4,15 @@
 
 import os
 import logging
+from datetime import datetime
 from typing import Dict, Any, Optional
 from neo4j import GraphDatabase
 import yaml
 
 from .loaders import LoaderFactory
+from .graph_query import GRAPH_META_LABEL
+from ..vector_search.embedder import Embedder
+from ..vector_search.vector_index import VectorIndex, fetch_node_texts
 
 logger = logging.getLogger(__name__)
 
@@ -108,6 +112,19 @@ class GraphBuilder:
                         )
                 except Exception as e:
                     logger.warning(f"创建索引失败: {str(e)}")
+
+            # 创建关系属性索引
+            for index_config in self.schema_config.get('relationship_indexes', []):
+                rel_type = index_config['rel_type']
+                fields = index_config['fields']
+                field_str = ', '.join([f"r.{f}" for f in fields])
+                try:
+                    session.run(
+                        f"CREATE INDEX rel_{rel_type.lower()}_{'_'.join(fields)}_index IF NOT EXISTS "
+                        f"FOR ()-[r:{rel_type}]-() ON ({field_str})"
+                    )
+                except Exception as e:
+                    logger.warning(f"创建关系索引失败 {rel_type}: {str(e)}")
         
         logger.info("约束和索引创建完成")
     
@@ -183,12 +200,70 @@ class GraphBuilder:
         for rel_type, file_path in rel_files.items():
             self.load_relationship(rel_type, file_path)
         
-        # 4. 显示统计
+        # 4. 写入图谱版本（查询侧据此失效答案缓存等派生数据）
+        version = self.mark_graph_version()
+
+        # 5. 构建向量索引（开启向量检索时）
+        if self.config.get('vector_search', {}).get('enabled', False):
+            self.build_vector_index(graph_version=version)
+
+        # 6. 显示统计
         stats = self.get_graph_stats()
         
         for key, value in stats.items():
             logger.info(f"  {key}: {value}")
     
+    def mark_graph_version(self) -> str:
+        """
+        写入新的图谱版本标记
+
+        Returns:
+            版本字符串
+        """
+        version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        with self.driver.session() as session:
+            session.run(
+                f"MERGE (m:{GRAPH_META_LABEL} {{key: 'graph'}}) "
+                f"SET m.version = $version, m.updated_at = datetime()",
+                version=version
+            )
+        logger.info(f"图谱版本已更新: {version}")
+        return version
+
+    def build_vector_index(self,
+                           graph_version: Optional[str] = None,
+                           full_rebuild: bool = False) -> VectorIndex:
+        """
+        对Asset/Concept/Scenario的名称与描述构建向量索引，写入vector_search.index_dir
+        （增量：只编码新增或文本变化的节点）
+
+        Args:
+            graph_version: 当前图谱版本（记录在索引manifest中）
+            full_rebuild: 是否丢弃已有向量全量重建
+
+        Returns:
+            构建完成的向量索引
+        """
+        vector_config = self.config.get('vector_search', {}) or {}
+        hybrid_config = vector_config.get('hybrid', {}) or {}
+
+        def run_query(cypher: str):
+            with self.driver.session() as session:
+                return [dict(record) for record in session.run(cypher)]
+
+        nodes = fetch_node_texts(run_query, hybrid_config.get('labels'))
+        logger.info(f"向量索引待编码节点: {len(nodes)}")
+
+        return VectorIndex.build(
+            vector_config.get('index_dir', './data/vector_index'),
+            nodes,
+            Embedder(vector_config),
+            index_type=vector_config.get('index_type', 'HNSW'),
+            graph_version=graph_version,
+            full_rebuild=full_rebuild,
+            ivf_config=vector_config.get('ivf')
+        )
+
     def get_graph_stats(self) -> Dict[str, int]:
         """获取图谱统计信息"""
         stats = {}
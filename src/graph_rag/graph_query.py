@@ -4,15 +4,63 @@
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from typing import List, Dict, Any, Iterable, Optional
 from neo4j import GraphDatabase
 import yaml
 
 from ..intent_recognition.intent_config import IntentType, IntentResult, Entity, SlotType
+from ..monitoring.metrics import get_metrics
+from .graph_snapshot import GraphSnapshot
+from .query_stats import QueryStats
 
 logger = logging.getLogger(__name__)
 
 
+# 图谱版本标记节点：GraphBuilder每次加载完成后写入新版本，查询侧据此失效派生缓存
+GRAPH_META_LABEL = "GraphMeta"
+GRAPH_VERSION_QUERY = f"MATCH (m:{GRAPH_META_LABEL} {{key: 'graph'}}) RETURN m.version AS version"
+
+# 结果被截断时追加到上下文的说明
+GRAPH_TRUNCATION_NOTE = "（图谱检索结果较多，仅列出前 {rows} 条）"
+
+
+class GraphResult(list):
+    """
+    图谱查询结果（记录列表）
+
+    truncated: 结果超过上限被截断时为原因（rows / bytes），否则为None
+    error: 查询执行失败时为错误信息（此时结果为空），否则为None
+    """
+
+    def __init__(self,
+                 records: Iterable[Dict[str, Any]] = (),
+                 truncated: Optional[str] = None,
+                 error: Optional[str] = None):
+        super().__init__(records)
+        self.truncated = truncated
+        self.error = error
+
+
+# 元数据项 -> 属性（槽位2: MetadataItem）
+ASSET_METADATA_MAPPING = {
+    '业务口径': 'business_purpose',
+    '技术口径': 'technical_spec',
+    '简介': 'description',
+    '用途': 'description',
+    '负责人': 'owner',
+    '版本': 'version',
+    '状态': 'status'
+}
+
+FIELD_METADATA_MAPPING = {
+    '业务口径': 'business_definition',
+    '技术口径': 'technical_definition',
+    '数据类型': 'data_type'
+}
+
+
 class GraphQuery:
     """
     图谱查询器数据资产助手的8大意图
@@ -34,6 +82,34 @@ class GraphQuery:
         # 连接Neo4j
         self.driver = None
         self.connect_neo4j()
+
+        # 图谱版本（按version_check_interval节流读取）
+        self.version_check_interval = self.graph_config.get('version_check_interval', 30)
+        self._graph_version: Optional[str] = None
+        self._graph_version_checked_at = 0.0
+
+        # 进程内图谱快照（图谱版本变化后在后台重建并整体替换）
+        snapshot_config = self.graph_config.get('snapshot', {}) or {}
+        self.snapshot_enabled = snapshot_config.get('enabled', False)
+        self.snapshot_retry_interval = snapshot_config.get('retry_interval', 60)
+        self.snapshot_ranking_top_k = snapshot_config.get('ranking_top_k', 50)
+        self._snapshot: Optional[GraphSnapshot] = None
+        self._snapshot_loading = False
+        self._snapshot_failed_at = 0.0
+        self._snapshot_lock = threading.Lock()
+
+        # 查询统计（按模板汇总耗时，抽样PROFILE）
+        instrumentation_config = self.graph_config.get('instrumentation', {}) or {}
+        self.query_stats = QueryStats(instrumentation_config) if instrumentation_config.get('enabled', False) else None
+
+        # 查询结果上限（逐条读取，超过行数或字节预算时提前结束）
+        limits_config = self.graph_config.get('result_limits', {}) or {}
+        self.fetch_size = limits_config.get('fetch_size', 100)
+        self.max_rows = limits_config.get('max_rows', 200)
+        self.max_rows_by_intent = {
+            str(intent): rows for intent, rows in (limits_config.get('max_rows_by_intent', {}) or {}).items()
+        }
+        self.max_result_bytes = limits_config.get('max_bytes')
         
         # 意图到查询生成方法
         self._intent_to_cypher_generator = {
@@ -47,6 +123,14 @@ class GraphQuery:
             IntentType.PLATFORM_HELP: lambda slots: ""  # 平台帮助不需要查询图谱
         }
 
+        # 可在快照上求值的意图（查询形态与对应的_generate_*_cypher一致）
+        self._intent_to_snapshot_handler = {
+            IntentType.ASSET_BASIC_SEARCH: self._snapshot_basic_search,
+            IntentType.ASSET_METADATA_QUERY: self._snapshot_metadata_query,
+            IntentType.ASSET_QUALITY_VALUE_QUERY: self._snapshot_quality_value,
+            IntentType.SCENARIO_RECOMMENDATION: self._snapshot_scenario_recommendation
+        }
+
 
     def connect_neo4j(self):
         """连接Neo4j数据库"""
@@ -62,6 +146,50 @@ class GraphQuery:
             logger.error(f"Neo4j连接失败: {str(e)}")
             raise
 
+    def check_connectivity(self) -> bool:
+        """
+        检查Neo4j连接是否可用
+
+        Returns:
+            是否可用
+        """
+        if not self.driver:
+            return False
+
+        try:
+            self.driver.verify_connectivity()
+            return True
+        except Exception as e:
+            logger.warning(f"Neo4j连接检查失败: {str(e)}")
+            return False
+
+    def get_graph_version(self) -> Optional[str]:
+        """
+        获取当前图谱版本（GraphBuilder写入的版本标记）
+
+        两次读取间隔小于version_check_interval时返回上次结果；读取失败时沿用上次版本
+
+        Returns:
+            版本字符串，图谱未写入版本标记时返回None
+        """
+        now = time.time()
+        if now - self._graph_version_checked_at < self.version_check_interval:
+            return self._graph_version
+        self._graph_version_checked_at = now
+
+        try:
+            with self.driver.session() as session:
+                record = session.run(GRAPH_VERSION_QUERY).single()
+            version = record['version'] if record else None
+        except Exception as e:
+            logger.warning(f"读取图谱版本失败: {str(e)}")
+            return self._graph_version
+
+        if version != self._graph_version:
+            logger.info(f"图谱版本: {self._graph_version} -> {version}")
+            self._graph_version = version
+        return version
+
     def close(self):
         """关闭数据库连接"""
         if self.driver:
@@ -132,11 +260,9 @@ class GraphQuery:
         if 'FilterCondition' in slots:
             filter_cond = slots['FilterCondition'][0]
             # TODO: 需要实现FilterCondition解析器
-            
-            
-            
-  
-        
+
+        where_clause = " AND ".join(conditions) if conditions else "1=1"
+
         # 槽位5: BusinessDomain
         if 'BusinessDomain' in slots:
             domain_name = slots['BusinessDomain'][0]
@@ -186,20 +312,8 @@ class GraphQuery:
             
             # TODO: 同义词映射（将"业务解释"映射为"business_purpose"）
             
-            
-            
-            metadata_mapping = {
-                '业务口径': 'business_purpose',
-                '技术口径': 'technical_spec',
-                '简介': 'description',
-                '用途': 'description',
-                '负责人': 'owner',
-                '版本': 'version',
-                '状态': 'status'
-            }
-            
-            if metadata_item in metadata_mapping:
-                field_name = metadata_mapping[metadata_item]
+            if metadata_item in ASSET_METADATA_MAPPING:
+                field_name = ASSET_METADATA_MAPPING[metadata_item]
                 cypher = f"""
                 MATCH (a:Asset {{name: "{asset_name}"}})
                 RETURN a.name AS name, a.{field_name} AS {metadata_item}
@@ -220,14 +334,8 @@ class GraphQuery:
             field_name = slots['FieldName'][0]
             metadata_item = slots.get('MetadataItem', ['所有'])[0]
             
-            metadata_mapping = {
-                '业务口径': 'business_definition',
-                '技术口径': 'technical_definition',
-                '数据类型': 'data_type'
-            }
-            
-            if metadata_item in metadata_mapping:
-                field_prop = metadata_mapping[metadata_item]
+            if metadata_item in FIELD_METADATA_MAPPING:
+                field_prop = FIELD_METADATA_MAPPING[metadata_item]
                 cypher = f"""
                 MATCH (a:Asset)-[:HAS_FIELD]->(f:Field {{name: "{field_name}"}})
                 RETURN a.name AS asset_name, f.name AS field_name,
@@ -250,7 +358,8 @@ class GraphQuery:
     def _generate_quality_value_cypher(self, slots: Dict[str, List[str]]) -> str:
         """
         生成质量价值查询Cypher
-        支持槽位：AssetName, MetadataItem（价值评分、星级等）
+        支持槽位：AssetName, MetadataItem（价值评分、星级等）；
+        未指定资产时返回价值排行，可按AssetType/BusinessDomain限定范围
         """
         if 'AssetName' in slots:
             asset_name = slots['AssetName'][0]
@@ -264,13 +373,22 @@ class GraphQuery:
             """
         else:
             # 如果没有指定资产，返回高价值资产排行
-            cypher = """
-            MATCH (a:Asset)
-            WHERE a.value_score IS NOT NULL
+            conditions = ['a.value_score IS NOT NULL']
+            if 'AssetType' in slots:
+                conditions.append(f'a.type = "{slots["AssetType"][0]}"')
+
+            if 'BusinessDomain' in slots:
+                match_clause = f'MATCH (a:Asset)-[:BELONGS_TO]->(d:BusinessDomain {{name: "{slots["BusinessDomain"][0]}"}})'
+            else:
+                match_clause = 'MATCH (a:Asset)'
+
+            cypher = f"""
+            {match_clause}
+            WHERE {" AND ".join(conditions)}
             RETURN a.name AS name,
                    a.star_level AS star_level,
                    a.value_score AS value_score
-            ORDER BY a.value_score DESC
+            ORDER BY value_score DESC
             LIMIT 20
             """
         
@@ -390,20 +508,12 @@ class GraphQuery:
         elif 'CoreDataItem' in slots:
             concept_name = slots['CoreDataItem'][0]
             
-            # 方式1：通过Concept节点
+            # 通过Concept节点精确匹配；描述文本的模糊匹配由HybridRetriever的向量检索补充
             cypher = f"""
             MATCH (c:Concept {{name: "{concept_name}"}})-[:IMPLEMENTED_BY]->(a:Asset)
             RETURN a.name AS name, a.description AS description,
                    a.type AS type, c.definition AS concept_definition
             """
-            
-            # 方式2（备用）：全文搜索description
-            # cypher = f"""
-            # MATCH (a:Asset)
-            # WHERE a.description CONTAINS "{concept_name}"
-            # RETURN a.name AS name, a.description AS description
-            # LIMIT 10
-            # """
         # 槽位6: AssetType
         elif 'AssetType' in slots:
             asset_type = slots['AssetType'][0]
@@ -412,7 +522,7 @@ class GraphQuery:
             MATCH (a:Asset {{type: "{asset_type}"}})
             RETURN a.name AS name, a.description AS description,
                    a.star_level AS star_level
-            ORDER BY a.value_score DESC
+            ORDER BY a.value_score IS NULL, a.value_score DESC
             LIMIT 20
             """
         else:
@@ -474,40 +584,341 @@ class GraphQuery:
         
         return cypher.strip()
 
-    def execute_query(self, cypher: str) -> List[Dict[str, Any]]:
+    # ========== 图谱快照查询 ==========
+
+    def _get_snapshot(self) -> Optional[GraphSnapshot]:
+        """
+        取与当前图谱版本一致的快照；版本变化或尚未加载时在后台加载，期间返回None（查询Neo4j）
+        """
+        if not self.snapshot_enabled:
+            return None
+
+        version = self.get_graph_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        self._schedule_snapshot_reload(version)
+        return None
+
+    def _schedule_snapshot_reload(self, version: Optional[str]):
+        """在后台线程加载快照，完成后整体替换（加载失败后按retry_interval重试）"""
+        with self._snapshot_lock:
+            if self._snapshot_loading:
+                return
+            if time.time() - self._snapshot_failed_at < self.snapshot_retry_interval:
+                return
+            self._snapshot_loading = True
+
+        def run_query(cypher: str):
+            with self.driver.session() as session:
+                for record in session.run(cypher):
+                    yield dict(record)
+
+        def _reload():
+            try:
+                self._snapshot = GraphSnapshot.load(run_query, version, self.snapshot_ranking_top_k)
+            except Exception as e:
+                logger.warning(f"图谱快照加载失败，继续查询Neo4j: {str(e)}")
+                self._snapshot_failed_at = time.time()
+            finally:
+                self._snapshot_loading = False
+
+        threading.Thread(target=_reload, name="graph-snapshot", daemon=True).start()
+
+    def query_snapshot(self, intent_result: IntentResult) -> Optional[List[Dict[str, Any]]]:
+        """
+        在图谱快照上求值
+
+        Args:
+            intent_result: 意图识别结果
+
+        Returns:
+            查询结果（结构与执行对应Cypher一致），快照不可用或查询形态不支持时返回None
+        """
+        handler = self._intent_to_snapshot_handler.get(intent_result.intent)
+        if handler is None:
+            return None
+
+        snapshot = self._get_snapshot()
+        if snapshot is None:
+            return None
+
+        return handler(snapshot, self._extract_slots(intent_result))
+
+    def can_answer_from_snapshot(self, intent_result: IntentResult) -> bool:
+        """
+        查询形态是否可在已加载的图谱快照上求值（只看意图与槽位，不求值、不检查图谱版本）
+
+        用于预取等热路径的快速判断，与各_snapshot_*处理函数返回None的条件一致
+
+        Args:
+            intent_result: 意图识别结果
+
+        Returns:
+            快照已加载且查询形态受支持时为True
+        """
+        if intent_result.intent not in self._intent_to_snapshot_handler or self._snapshot is None:
+            return False
+
+        slot_types = set(self._extract_slots(intent_result))
+        if intent_result.intent == IntentType.ASSET_METADATA_QUERY:
+            return bool(slot_types & {'AssetName', 'FieldName'})
+        if intent_result.intent == IntentType.SCENARIO_RECOMMENDATION:
+            return 'BusinessZone' in slot_types or ('AssetType' in slot_types and 'CoreDataItem' not in slot_types)
+        return True
+
+    def get_snapshot_stats(self) -> Dict[str, Any]:
+        """图谱快照状态"""
+        snapshot = self._snapshot
+        return {
+            "enabled": self.snapshot_enabled,
+            "loaded": snapshot is not None,
+            "loading": self._snapshot_loading,
+            **(snapshot.get_stats() if snapshot is not None else {})
+        }
+
+    @staticmethod
+    def _snapshot_asset_rows(snapshot: GraphSnapshot, slots: Dict[str, List[str]]) -> Optional[List[int]]:
+        """按AssetName/AssetType条件筛选资产行号（与基础检索的WHERE条件一致），无条件时返回None"""
+        if 'AssetName' in slots:
+            rows = snapshot.lookup('Asset', 'name', slots['AssetName'][0])
+        elif 'AssetType' in slots:
+            rows = snapshot.lookup('Asset', 'type', slots['AssetType'][0])
+        else:
+            return None
+
+        if 'AssetName' in slots and 'AssetType' in slots:
+            asset_type = slots['AssetType'][0]
+            rows = [row for row in rows if snapshot.get('Asset', row, 'type') == asset_type]
+        return rows
+
+    # Intent 31: 资产基础检索
+    def _snapshot_basic_search(self, snapshot: GraphSnapshot, slots: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        asset_rows = self._snapshot_asset_rows(snapshot, slots)
+        limit = 50
+        results = []
+
+        if 'BusinessDomain' in slots or 'FieldName' in slots:
+            if 'BusinessDomain' in slots:
+                label, rel_type, name = 'BusinessDomain', 'BELONGS_TO', slots['BusinessDomain'][0]
+                projection = [('name', 'name'), ('description', 'description'), ('type', 'type'),
+                              ('star_level', 'star_level'), ('value_score', 'value_score')]
+                extra_column = 'domain'
+            else:
+                label, rel_type, name = 'Field', 'HAS_FIELD', slots['FieldName'][0]
+                projection = [('name', 'name'), ('description', 'description'), ('type', 'type')]
+                extra_column = 'field_name'
+
+            allowed = set(asset_rows) if asset_rows is not None else None
+            for node in snapshot.lookup(label, 'name', name):
+                for asset in snapshot.neighbors(rel_type, node, reverse=True):
+                    if allowed is not None and int(asset) not in allowed:
+                        continue
+                    record = snapshot.record('Asset', int(asset), projection)
+                    record[extra_column] = name
+                    results.append(record)
+                    if len(results) >= limit:
+                        return results
+            return results
+
+        projection = [('name', 'name'), ('description', 'description'), ('type', 'type'),
+                      ('star_level', 'star_level'), ('value_score', 'value_score')]
+        if asset_rows is None:
+            asset_rows = range(min(limit, snapshot.size('Asset')))
+        return [snapshot.record('Asset', row, projection) for row in asset_rows[:limit]]
+
+    # Intent 32: 资产元数据查询
+    def _snapshot_metadata_query(self,
+                                 snapshot: GraphSnapshot,
+                                 slots: Dict[str, List[str]]) -> Optional[List[Dict[str, Any]]]:
+        metadata_item = slots.get('MetadataItem', ['所有'])[0]
+
+        if 'AssetName' in slots:
+            if metadata_item in ASSET_METADATA_MAPPING:
+                projection = [('name', 'name'), (metadata_item, ASSET_METADATA_MAPPING[metadata_item])]
+            else:
+                projection = [('name', 'name'), ('description', 'description'),
+                              ('business_purpose', 'business_purpose'), ('technical_spec', 'technical_spec'),
+                              ('owner', 'owner'), ('type', 'type'), ('version', 'version'), ('status', 'status')]
+            return [
+                snapshot.record('Asset', row, projection)
+                for row in snapshot.lookup('Asset', 'name', slots['AssetName'][0])
+            ]
+
+        if 'FieldName' in slots:
+            if metadata_item in FIELD_METADATA_MAPPING:
+                projection = [(metadata_item, FIELD_METADATA_MAPPING[metadata_item])]
+            else:
+                projection = [('data_type', 'data_type'), ('business_definition', 'business_definition'),
+                              ('technical_definition', 'technical_definition')]
+
+            results = []
+            for field in snapshot.lookup('Field', 'name', slots['FieldName'][0]):
+                field_record = snapshot.record('Field', field, projection)
+                for asset in snapshot.neighbors('HAS_FIELD', field, reverse=True):
+                    results.append({
+                        'asset_name': snapshot.get('Asset', int(asset), 'name'),
+                        'field_name': snapshot.get('Field', field, 'name'),
+                        **field_record
+                    })
+            return results
+
+        return None
+
+    # Intent 33: 资产质量与价值查询
+    def _snapshot_quality_value(self,
+                                snapshot: GraphSnapshot,
+                                slots: Dict[str, List[str]]) -> Optional[List[Dict[str, Any]]]:
+        if 'AssetName' not in slots:
+            # 价值排行：取物化排行
+            projection = [('name', 'name'), ('star_level', 'star_level'), ('value_score', 'value_score')]
+            rows = snapshot.top_assets(
+                asset_type=slots.get('AssetType', [None])[0],
+                domain=slots.get('BusinessDomain', [None])[0],
+                limit=20
+            )
+            return [snapshot.record('Asset', row, projection) for row in rows]
+
+        projection = [('name', 'name'), ('star_level', 'star_level'),
+                      ('value_score', 'value_score'), ('status', 'status')]
+        return [
+            snapshot.record('Asset', row, projection)
+            for row in snapshot.lookup('Asset', 'name', slots['AssetName'][0])
+        ]
+
+    # Intent 36: 场景与标签推荐
+    def _snapshot_scenario_recommendation(self,
+                                          snapshot: GraphSnapshot,
+                                          slots: Dict[str, List[str]]) -> Optional[List[Dict[str, Any]]]:
+        if 'BusinessZone' not in slots:
+            if 'CoreDataItem' in slots or 'AssetType' not in slots:
+                return None
+
+            # 按类型推荐：取物化排行（无评分的资产排在最后）
+            projection = [('name', 'name'), ('description', 'description'), ('star_level', 'star_level')]
+            rows = snapshot.top_assets(asset_type=slots['AssetType'][0], limit=20, scored_only=False)
+            return [snapshot.record('Asset', row, projection) for row in rows]
+
+        limit = 20
+        projection = [('name', 'name'), ('description', 'description'), ('type', 'type')]
+        results = []
+        seen = set()
+
+        for zone in snapshot.lookup('BusinessZone', 'name', slots['BusinessZone'][0]):
+            for scenario in snapshot.neighbors('CONTAINS_SCENARIO', zone):
+                scenario_name = snapshot.get('Scenario', int(scenario), 'name')
+                for asset in snapshot.neighbors('USES_ASSET', int(scenario)):
+                    record = snapshot.record('Asset', int(asset), projection)
+                    record['scenario_name'] = scenario_name
+
+                    # RETURN DISTINCT
+                    key = tuple(record.values())
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    results.append(record)
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def execute_query(self,
+                      cypher: str,
+                      params: Optional[Dict[str, Any]] = None,
+                      intent: Optional[str] = None,
+                      template: Optional[str] = None,
+                      capped: bool = True) -> GraphResult:
         """
-        执行Cypher查询
+        执行Cypher查询（按fetch_size分批拉取，逐条读取）
 
         Args:
             cypher: Cypher查询语句
+            params: 查询参数
+            intent: 意图编码（查询统计的标签，并决定行数上限）
+            template: 查询模板名称（为空时按Cypher去掉字面量后归类）
+            capped: 是否应用结果上限（词典加载等内部查询传False）
 
         Returns:
-            查询结果列表
+            查询结果列表（超过上限时截断，truncated注明原因；执行失败时为空，error注明原因）
         """
         if not cypher:
             logger.warning("Cypher查询为空")
-            return []
+            return GraphResult()
 
         logger.info(f"执行Cypher查询:\n{cypher}")
 
+        query_stats = self.query_stats
+        profile = query_stats is not None and query_stats.should_profile()
+        query_start = time.perf_counter()
+
         try:
-            with self.driver.session() as session:
-                result = session.run(cypher)
-                records = [dict(record) for record in result]
+            with self.driver.session(fetch_size=self.fetch_size) as session:
+                result = session.run(f"PROFILE {cypher}" if profile else cypher, params or {})
+                if capped:
+                    records = self._collect_records(result, intent)
+                else:
+                    records = GraphResult(dict(record) for record in result)
+                # 提前结束时consume丢弃服务端剩余结果
+                summary = result.consume() if query_stats is not None else None
 
             logger.info(f"查询返回 {len(records)} 条结果")
+            if query_stats is not None:
+                query_stats.record(cypher, time.perf_counter() - query_start, len(records), summary,
+                                   intent=intent, template=template)
             return records
 
         except Exception as e:
             logger.error(f"Cypher查询执行失败: {str(e)}")
-            return []
+            get_metrics().increment("neo4j_errors")
+            if query_stats is not None:
+                query_stats.record(cypher, time.perf_counter() - query_start,
+                                   intent=intent, template=template, error=True)
+            return GraphResult(error=str(e))
+
+    def _collect_records(self, records: Iterable, intent: Optional[str] = None) -> GraphResult:
+        """
+        逐条读取记录，达到意图的行数上限或字节预算时停止
+
+        Args:
+            records: 记录迭代器（neo4j Result或记录列表）
+            intent: 意图编码
+
+        Returns:
+            查询结果（截断时truncated为rows或bytes）
+        """
+        max_rows = self.max_rows_by_intent.get(intent, self.max_rows) if intent else self.max_rows
+        results = GraphResult()
+        size = 0
+
+        for record in records:
+            # 读到上限之后的一条才确认确有截断
+            if max_rows is not None and len(results) >= max_rows:
+                results.truncated = "rows"
+                break
 
-    def query(self, intent_result: IntentResult) -> List[Dict[str, Any]]:
+            record = dict(record)
+            size += sum(len(str(key)) + len(str(value)) for key, value in record.items())
+            if self.max_result_bytes is not None and size > self.max_result_bytes and results:
+                results.truncated = "bytes"
+                break
+            results.append(record)
+
+        if results.truncated:
+            logger.warning(f"查询结果超过上限（{results.truncated}），已截断为 {len(results)} 条")
+            get_metrics().increment("graph_results_truncated", reason=results.truncated)
+        return results
+
+    def get_query_stats(self) -> Optional[Dict[str, Any]]:
+        """按模板汇总的查询统计（未开启时返回None）"""
+        return self.query_stats.get_stats() if self.query_stats is not None else None
+
+    def query(self, intent_result: IntentResult, prefetch=None) -> List[Dict[str, Any]]:
         """
         根据意图结果查询图谱
 
         Args:
             intent_result: 意图识别结果
+            prefetch: 预取句柄（PrefetchHandle），Cypher一致时复用预取结果
 
         Returns:
             查询结果
@@ -517,10 +928,30 @@ class GraphQuery:
 
         if not cypher:
             logger.warning(f"无法为意图 {intent_result.intent} 生成Cypher查询")
+            if prefetch is not None:
+                prefetch.cancel()
             return []
 
+        # 简单查询形态直接在图谱快照上求值
+        results = self.query_snapshot(intent_result)
+        if results is not None:
+            results = self._collect_records(results, intent_result.intent.value)
+            logger.info(f"图谱快照返回 {len(results)} 条结果")
+            get_metrics().increment("cache_hits", cache="graph_snapshot")
+            if prefetch is not None:
+                prefetch.cancel()
+            return results
+
+        if prefetch is not None:
+            results = prefetch.take(cypher)
+            if results is not None:
+                logger.info(f"命中图谱预取结果: {len(results)} 条")
+                get_metrics().increment("cache_hits", cache="graph_prefetch")
+                return results
+            get_metrics().increment("cache_misses", cache="graph_prefetch")
+
         # 执行查询
-        results = self.execute_query(cypher)
+        results = self.execute_query(cypher, intent=intent_result.intent.value)
 
         return results
 
@@ -0,0 +1,287 @@
+"""
+图谱快照模块
+把高频简单查询涉及的子图（Asset/Field/BusinessDomain/BusinessZone/Scenario及其核心关系）
+加载为进程内只读快照：节点属性按列存放且相同字符串只保留一份，关系按正反两个方向存为CSR数组。
+加载时按value_score物化全局、各资产类型、各业务域的资产排行（top-K），排行类查询不再对全部资产排序。
+快照构建完成后不再修改，图谱更新时整体替换
+"""
+
+import heapq
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# 快照节点：标签 -> 加载的属性
+SNAPSHOT_NODES = {
+    "Asset": ["name", "description", "type", "star_level", "value_score", "status",
+              "business_purpose", "technical_spec", "owner", "version"],
+    "Field": ["name", "data_type", "business_definition", "technical_definition"],
+    "BusinessDomain": ["name"],
+    "BusinessZone": ["name"],
+    "Scenario": ["name"]
+}
+
+# 快照关系：关系类型 -> (起点标签, 终点标签)
+SNAPSHOT_EDGES = {
+    "HAS_FIELD": ("Asset", "Field"),
+    "BELONGS_TO": ("Asset", "BusinessDomain"),
+    "IN_ZONE": ("Asset", "BusinessZone"),
+    "CONTAINS_SCENARIO": ("BusinessZone", "Scenario"),
+    "USES_ASSET": ("Scenario", "Asset")
+}
+
+# 建立等值查找表的属性
+SNAPSHOT_LOOKUPS = [
+    ("Asset", "name"),
+    ("Asset", "type"),
+    ("Field", "name"),
+    ("BusinessDomain", "name"),
+    ("BusinessZone", "name"),
+    ("Scenario", "name")
+]
+
+# 排行范围
+RANKING_GLOBAL = "global"
+RANKING_TYPE = "type"
+RANKING_DOMAIN = "domain"
+
+
+class _CSR:
+    """压缩行邻接表：节点i的邻居为indices[indptr[i]:indptr[i+1]]"""
+
+    __slots__ = ("indptr", "indices")
+
+    def __init__(self, sources: np.ndarray, targets: np.ndarray, node_count: int):
+        order = np.argsort(sources, kind='stable')
+        self.indices = targets[order].astype(np.int32)
+        self.indptr = np.zeros(node_count + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum(np.bincount(sources, minlength=node_count))
+
+    def neighbors(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+
+class GraphSnapshot:
+    """
+    只读图谱快照
+
+    节点以标签内的行号标识；get/record按列取属性，lookup按属性值等值查找，
+    neighbors沿关系（reverse=True时逆向）取邻居行号，top_assets按value_score取排行
+    """
+
+    def __init__(self,
+                 version: Optional[str],
+                 columns: Dict[str, Dict[str, List[Any]]],
+                 edges: Dict[str, Tuple[_CSR, _CSR]],
+                 lookups: Dict[Tuple[str, str], Dict[Any, List[int]]],
+                 ranking_top_k: int = 50,
+                 load_seconds: float = 0.0):
+        self.version = version
+        self.columns = columns
+        self.edges = edges
+        self.lookups = lookups
+        self.ranking_top_k = ranking_top_k
+        self.rankings = self._build_rankings()
+        self.load_seconds = load_seconds
+        self.built_at = time.time()
+
+    @classmethod
+    def load(cls,
+             run_query: Callable[[str], Iterable[Dict[str, Any]]],
+             version: Optional[str] = None,
+             ranking_top_k: int = 50) -> "GraphSnapshot":
+        """
+        从Neo4j加载快照
+
+        Args:
+            run_query: 执行Cypher并逐条返回记录（dict）的函数
+            version: 快照对应的图谱版本
+            ranking_top_k: 每个排行物化的资产数
+
+        Returns:
+            图谱快照
+        """
+        load_start = time.time()
+        interned: Dict[str, str] = {}
+
+        def intern(value):
+            if isinstance(value, str):
+                return interned.setdefault(value, value)
+            return value
+
+        columns: Dict[str, Dict[str, List[Any]]] = {}
+        rows_by_id: Dict[str, Dict[str, int]] = {}
+
+        for label, properties in SNAPSHOT_NODES.items():
+            returns = ", ".join(f"n.{prop} AS {prop}" for prop in properties)
+            label_columns = {prop: [] for prop in properties}
+            label_rows: Dict[str, int] = {}
+
+            for record in run_query(f"MATCH (n:{label}) RETURN elementId(n) AS _id, {returns}"):
+                label_rows[record['_id']] = len(label_rows)
+                for prop in properties:
+                    label_columns[prop].append(intern(record[prop]))
+
+            columns[label] = label_columns
+            rows_by_id[label] = label_rows
+
+        edges: Dict[str, Tuple[_CSR, _CSR]] = {}
+        for rel_type, (source_label, target_label) in SNAPSHOT_EDGES.items():
+            source_rows, target_rows = rows_by_id[source_label], rows_by_id[target_label]
+            sources, targets = [], []
+
+            for record in run_query(
+                f"MATCH (s:{source_label})-[:{rel_type}]->(t:{target_label}) "
+                f"RETURN elementId(s) AS source, elementId(t) AS target"
+            ):
+                source, target = source_rows.get(record['source']), target_rows.get(record['target'])
+                if source is not None and target is not None:
+                    sources.append(source)
+                    targets.append(target)
+
+            sources = np.array(sources, dtype=np.int64)
+            targets = np.array(targets, dtype=np.int64)
+            edges[rel_type] = (
+                _CSR(sources, targets, len(source_rows)),
+                _CSR(targets, sources, len(target_rows))
+            )
+
+        lookups: Dict[Tuple[str, str], Dict[Any, List[int]]] = {}
+        for label, prop in SNAPSHOT_LOOKUPS:
+            lookup: Dict[Any, List[int]] = {}
+            for row, value in enumerate(columns[label][prop]):
+                if value is not None:
+                    lookup.setdefault(value, []).append(row)
+            lookups[(label, prop)] = lookup
+
+        snapshot = cls(version, columns, edges, lookups, ranking_top_k)
+        snapshot.load_seconds = time.time() - load_start
+        logger.info(f"图谱快照加载完成 (版本: {version}, 耗时: {snapshot.load_seconds:.1f}s): "
+                    f"{snapshot.node_counts()}")
+        return snapshot
+
+    def size(self, label: str) -> int:
+        """标签下的节点数"""
+        return len(self.columns[label]['name'])
+
+    def node_counts(self) -> Dict[str, int]:
+        return {label: self.size(label) for label in self.columns}
+
+    def get(self, label: str, row: int, prop: str) -> Any:
+        """取节点属性"""
+        return self.columns[label][prop][row]
+
+    def record(self, label: str, row: int, projection: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        按投影组装记录
+
+        Args:
+            label: 节点标签
+            row: 节点行号
+            projection: [(返回列名, 属性名)]，顺序与对应Cypher的RETURN一致
+
+        Returns:
+            记录字典
+        """
+        label_columns = self.columns[label]
+        return {alias: label_columns[prop][row] for alias, prop in projection}
+
+    def lookup(self, label: str, prop: str, value: Any) -> List[int]:
+        """按属性值等值查找节点行号"""
+        return self.lookups[(label, prop)].get(value, [])
+
+    def neighbors(self, rel_type: str, row: int, reverse: bool = False) -> np.ndarray:
+        """沿关系取邻居行号（reverse=True时由终点取起点）"""
+        return self.edges[rel_type][1 if reverse else 0].neighbors(row)
+
+    def _score(self, row: int) -> Optional[float]:
+        score = self.columns['Asset']['value_score'][row]
+        return score if isinstance(score, (int, float)) and not isinstance(score, bool) else None
+
+    def _rank(self, rows: Iterable[int], limit: int) -> List[int]:
+        """有评分的资产按value_score降序在前（同分保持行号顺序），无评分的资产补在其后"""
+        rows = list(rows)
+        scored = heapq.nlargest(limit, (row for row in rows if self._score(row) is not None), key=self._score)
+        if len(scored) < limit:
+            scored.extend([row for row in rows if self._score(row) is None][:limit - len(scored)])
+        return scored
+
+    def _build_rankings(self) -> Dict[Tuple[str, Optional[str]], List[int]]:
+        """物化全局、各资产类型、各业务域的top-K排行"""
+        rankings = {(RANKING_GLOBAL, None): self._rank(range(self.size('Asset')), self.ranking_top_k)}
+
+        for asset_type, rows in self.lookups[('Asset', 'type')].items():
+            rankings[(RANKING_TYPE, asset_type)] = self._rank(rows, self.ranking_top_k)
+
+        for domain_name in self.lookups[('BusinessDomain', 'name')]:
+            rankings[(RANKING_DOMAIN, domain_name)] = self._rank(
+                self._domain_assets(domain_name), self.ranking_top_k
+            )
+
+        return rankings
+
+    def _domain_assets(self, domain_name: str) -> List[int]:
+        """业务域下的资产行号（同名业务域合并去重）"""
+        rows = set()
+        for domain in self.lookup('BusinessDomain', 'name', domain_name):
+            rows.update(int(row) for row in self.neighbors('BELONGS_TO', domain, reverse=True))
+        return sorted(rows)
+
+    def top_assets(self,
+                   asset_type: Optional[str] = None,
+                   domain: Optional[str] = None,
+                   limit: int = 20,
+                   scored_only: bool = True) -> List[int]:
+        """
+        按value_score降序取资产排行
+
+        单一范围（全局/资产类型/业务域）且limit不超过ranking_top_k时直接取物化排行，
+        类型与业务域组合筛选时在该业务域的资产上现算
+
+        Args:
+            asset_type: 资产类型
+            domain: 业务域名称
+            limit: 返回条数
+            scored_only: 是否只返回有评分的资产
+
+        Returns:
+            资产行号列表
+        """
+        if asset_type is not None and domain is not None:
+            rows = [row for row in self._domain_assets(domain) if self.get('Asset', row, 'type') == asset_type]
+            ranked = self._rank(rows, limit)
+        elif limit > self.ranking_top_k:
+            if domain is not None:
+                rows = self._domain_assets(domain)
+            elif asset_type is not None:
+                rows = self.lookup('Asset', 'type', asset_type)
+            else:
+                rows = range(self.size('Asset'))
+            ranked = self._rank(rows, limit)
+        elif domain is not None:
+            ranked = self.rankings.get((RANKING_DOMAIN, domain), [])
+        elif asset_type is not None:
+            ranked = self.rankings.get((RANKING_TYPE, asset_type), [])
+        else:
+            ranked = self.rankings[(RANKING_GLOBAL, None)]
+
+        if scored_only:
+            ranked = [row for row in ranked if self._score(row) is not None]
+        return ranked[:limit]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """快照状态"""
+        return {
+            "version": self.version,
+            "built_at": self.built_at,
+            "load_seconds": round(self.load_seconds, 3),
+            "nodes": self.node_counts(),
+            "edges": {rel_type: int(len(forward.indices)) for rel_type, (forward, _) in self.edges.items()},
+            "rankings": len(self.rankings),
+            "ranking_top_k": self.ranking_top_k
+        }
@@ -0,0 +1,209 @@
+"""
+混合检索模块
+向量近邻检索与Cypher检索结果按倒数排名融合（RRF）：
+- Intent 36（场景与标签推荐）始终融合，概念/场景的描述文本不必与槽位完全一致
+- 其余意图在Cypher无结果时用向量检索兜底（如资产名称不完全匹配）
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..intent_recognition.intent_config import IntentResult, IntentType
+from .graph_query import GraphResult
+from ..vector_search.vector_index import MANIFEST_FILE, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+# 向量命中的节点 -> 资产记录（Concept/Scenario命中时展开为其关联资产）
+HIT_EXPANSION_QUERIES = {
+    "Asset": """
+        MATCH (a:Asset) WHERE a.asset_id IN $ids
+        RETURN a.asset_id AS node_id, a.name AS name, a.description AS description,
+               a.type AS type, a.star_level AS star_level
+    """,
+    "Concept": """
+        MATCH (c:Concept)-[:IMPLEMENTED_BY]->(a:Asset) WHERE c.concept_id IN $ids
+        RETURN c.concept_id AS node_id, a.name AS name, a.description AS description,
+               a.type AS type, c.definition AS concept_definition
+    """,
+    "Scenario": """
+        MATCH (s:Scenario)-[:USES_ASSET]->(a:Asset) WHERE s.scenario_id IN $ids
+        RETURN s.scenario_id AS node_id, a.name AS name, a.description AS description,
+               a.type AS type, s.name AS scenario_name
+    """
+}
+
+
+class HybridRetriever:
+    """向量 + 图谱混合检索器"""
+
+    def __init__(self, graph_query, embedder, vector_config: Dict[str, Any]):
+        """
+        初始化混合检索器
+
+        Args:
+            graph_query: GraphQuery实例
+            embedder: Embedder实例
+            vector_config: config.yaml中的vector_search配置
+        """
+        self.graph_query = graph_query
+        self.embedder = embedder
+
+        hybrid_config = vector_config.get('hybrid', {}) or {}
+        self.index_dir = vector_config.get('index_dir', './data/vector_index')
+        self.top_k = hybrid_config.get('top_k', 20)
+        self.rrf_k = hybrid_config.get('rrf_k', 60)
+        self.max_results = hybrid_config.get('max_results', 20)
+        self.labels = hybrid_config.get('labels', ["Asset", "Concept", "Scenario"])
+        self.fallback_intents = {str(i) for i in hybrid_config.get('fallback_intents', ["31", "36"])}
+        self.reload_interval = hybrid_config.get('reload_interval', 60)
+
+        self._index: Optional[VectorIndex] = None
+        self._index_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+
+    def retrieve(self, intent_result: IntentResult, user_query: str, prefetch=None) -> List[Dict[str, Any]]:
+        """
+        检索图谱（必要时融合向量检索结果）
+
+        Args:
+            intent_result: 意图识别结果
+            user_query: 用户查询
+            prefetch: 图谱预取句柄
+
+        Returns:
+            检索结果（结构同GraphQuery.query）
+        """
+        graph_results = self.graph_query.query(intent_result, prefetch=prefetch)
+
+        intent = intent_result.intent
+        fuse = intent == IntentType.SCENARIO_RECOMMENDATION
+        fallback = not graph_results and intent.value in self.fallback_intents
+        if not (fuse or fallback):
+            return graph_results
+
+        try:
+            vector_results = self._vector_search(self._search_text(intent_result, user_query))
+        except Exception as e:
+            logger.warning(f"向量检索失败，仅使用图谱结果: {str(e)}")
+            return graph_results
+
+        if not vector_results:
+            return graph_results
+
+        logger.info(f"混合检索: 图谱 {len(graph_results)} 条，向量 {len(vector_results)} 条"
+                    f"（{'融合' if fuse else '兜底'}）")
+        return GraphResult(self.fuse(graph_results, vector_results),
+                           getattr(graph_results, 'truncated', None),
+                           getattr(graph_results, 'error', None))
+
+    def fuse(self,
+             graph_results: List[Dict[str, Any]],
+             vector_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        倒数排名融合：score = Σ 1 / (rrf_k + rank)，同名资产合并（图谱记录的字段优先）
+
+        Args:
+            graph_results: Cypher检索结果（按返回顺序为排名）
+            vector_results: 向量检索结果（按相似度降序）
+
+        Returns:
+            融合后的记录列表（最多max_results条）
+        """
+        scores: Dict[str, float] = {}
+        merged: Dict[str, Dict[str, Any]] = {}
+        sources: Dict[str, set] = {}
+
+        for source, results in (("graph", graph_results), ("vector", vector_results)):
+            for rank, record in enumerate(results, 1):
+                key = record.get('name')
+                if key is None:
+                    continue
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank)
+                merged[key] = {**record, **merged.get(key, {})}
+                sources.setdefault(key, set()).add(source)
+
+        ordered = sorted(scores, key=lambda key: scores[key], reverse=True)[:self.max_results]
+        return [
+            {**merged[key], "retrieval": "+".join(sorted(sources[key]))}
+            for key in ordered
+        ]
+
+    def _search_text(self, intent_result: IntentResult, user_query: str) -> str:
+        """向量检索文本：有核心数据项槽位时用槽位值，否则用原始查询"""
+        core_items = [e.value for e in intent_result.entities if e.type.value == "CoreDataItem"]
+        return " ".join(core_items) if core_items else user_query
+
+    def _vector_search(self, text: str) -> List[Dict[str, Any]]:
+        """向量检索并把命中节点展开为资产记录（按命中排名去重）"""
+        index = self._get_index()
+        if index is None:
+            return []
+
+        hits = index.search(self.embedder.encode_query(text, for_retrieval=True), self.top_k, self.labels)
+        if not hits:
+            return []
+
+        ids_by_label: Dict[str, List[Any]] = {}
+        for node, _ in hits:
+            ids_by_label.setdefault(node['label'], []).append(node['node_id'])
+
+        records_by_hit: Dict[tuple, List[Dict[str, Any]]] = {}
+        for label, ids in ids_by_label.items():
+            for record in self.graph_query.execute_query(HIT_EXPANSION_QUERIES[label], {"ids": ids},
+                                                         template=f"hybrid_expand_{label}"):
+                node_id = record.pop('node_id')
+                records_by_hit.setdefault((label, node_id), []).append(record)
+
+        results = []
+        seen = set()
+        for node, score in hits:
+            for record in records_by_hit.get((node['label'], node['node_id']), []):
+                if record.get('name') in seen:
+                    continue
+                seen.add(record.get('name'))
+                results.append({**record, "similarity": round(score, 4)})
+
+        return results
+
+    def _get_index(self) -> Optional[VectorIndex]:
+        """加载向量索引，索引目录更新（manifest变化）后重新加载"""
+        now = time.time()
+        if self._index is not None and now - self._checked_at < self.reload_interval:
+            return self._index
+
+        with self._reload_lock:
+            if self._index is not None and now - self._checked_at < self.reload_interval:
+                return self._index
+            self._checked_at = now
+
+            manifest_path = os.path.join(self.index_dir, MANIFEST_FILE)
+            if not os.path.exists(manifest_path):
+                if self._index is None:
+                    logger.warning(f"向量索引不存在: {self.index_dir}（请先运行GraphBuilder构建）")
+                return self._index
+
+            mtime = os.path.getmtime(manifest_path)
+            if mtime != self._index_mtime:
+                try:
+                    self._index = VectorIndex.load(self.index_dir)
+                    self._index_mtime = mtime
+                except Exception as e:
+                    logger.error(f"向量索引加载失败: {str(e)}")
+
+            return self._index
+
+    def get_stats(self) -> Dict[str, Any]:
+        """检索器状态"""
+        index = self._index
+        return {
+            "index_dir": self.index_dir,
+            "loaded": index is not None,
+            "size": index.size if index is not None else 0,
+            "manifest": index.manifest if index is not None else None
+        }
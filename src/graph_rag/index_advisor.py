@@ -0,0 +1,292 @@
+"""
+图谱索引顾问
+枚举各_generate_*_cypher可能生成的查询形态，在本地数据库上执行EXPLAIN，
+报告标签扫描、笛卡尔积以及查询条件涉及但没有范围索引的节点/关系属性，可选创建建议的索引
+
+用法：
+    python3 -m src.graph_rag.index_advisor                    # 只输出报告
+    python3 -m src.graph_rag.index_advisor --create           # 创建建议的范围索引/关系属性索引
+    python3 -m src.graph_rag.index_advisor --output report.json
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Set, Tuple
+
+from ..intent_recognition.intent_config import Entity, IntentResult, get_intent_by_name, get_slot_by_name
+
+logger = logging.getLogger(__name__)
+
+
+# 查询形态：(名称, 意图编号, [(槽位, 示例值)])，覆盖各_generate_*_cypher的全部分支
+QUERY_SHAPES: List[Tuple[str, str, List[Tuple[str, str]]]] = [
+    ("31 无条件", "31", []),
+    ("31 资产名", "31", [("AssetName", "__sample__")]),
+    ("31 资产类型", "31", [("AssetType", "__sample__")]),
+    ("31 资产名+类型", "31", [("AssetName", "__sample__"), ("AssetType", "__sample__")]),
+    ("31 业务域", "31", [("BusinessDomain", "__sample__")]),
+    ("31 业务域+类型", "31", [("BusinessDomain", "__sample__"), ("AssetType", "__sample__")]),
+    ("31 字段名", "31", [("FieldName", "__sample__")]),
+    ("32 资产全部元数据", "32", [("AssetName", "__sample__")]),
+    ("32 资产单项元数据", "32", [("AssetName", "__sample__"), ("MetadataItem", "负责人")]),
+    ("32 字段全部元数据", "32", [("FieldName", "__sample__")]),
+    ("32 字段单项元数据", "32", [("FieldName", "__sample__"), ("MetadataItem", "数据类型")]),
+    ("33 资产价值", "33", [("AssetName", "__sample__")]),
+    ("33 全局价值排行", "33", []),
+    ("33 类型价值排行", "33", [("AssetType", "__sample__")]),
+    ("33 业务域价值排行", "33", [("BusinessDomain", "__sample__")]),
+    ("34 直接血缘", "34", [("AssetName", "__sample__")]),
+    ("35 核心动作", "35", [("UserStatus", "我收藏的")]),
+    ("35 扩展动作", "35", [("UserStatus", "下载")]),
+    ("35 资产使用人数", "35", [("AssetName", "__sample__")]),
+    ("36 业务专区", "36", [("BusinessZone", "__sample__")]),
+    ("36 业务概念", "36", [("CoreDataItem", "__sample__")]),
+    ("36 资产类型", "36", [("AssetType", "__sample__")]),
+    ("37 两资产对比", "37", [("AssetName", "__sample__"), ("AssetName", "__sample_2__")]),
+    ("37 复合筛选", "37", [("AssetType", "__sample__"), ("BusinessDomain", "__sample__"),
+                          ("FilterCondition", "五星")]),
+]
+
+# 计划中需要报告的算子
+LABEL_SCAN_OPERATORS = {"NodeByLabelScan", "AllNodesScan", "DirectedRelationshipTypeScan",
+                        "UndirectedRelationshipTypeScan", "DirectedAllRelationshipsScan",
+                        "UndirectedAllRelationshipsScan"}
+CARTESIAN_OPERATORS = {"CartesianProduct"}
+
+NODE_PATTERN = re.compile(r"\((\w+):(\w+)\s*(?:\{([^}]*)\})?\)")
+REL_PATTERN = re.compile(r"\[(\w+)?:([\w|]+)\s*(?:\{([^}]*)\})?\]")
+PREDICATE_PATTERN = re.compile(r"\b(\w+)\.(\w+)\s*(?:=|<>|<|>|IS NOT NULL|IN\b|STARTS WITH)")
+ORDER_BY_PATTERN = re.compile(r"ORDER BY\s+(\w+)\.(\w+)")
+INLINE_PROPERTY_PATTERN = re.compile(r"(\w+)\s*:")
+
+
+def _operator_name(plan: Dict[str, Any]) -> str:
+    """算子名（去掉Neo4j 5的@neo4j后缀）"""
+    return plan.get('operatorType', '').split('@')[0]
+
+
+def _operator_args(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """算子参数（Bolt返回的计划中键名为args）"""
+    return plan.get('args') or plan.get('arguments') or {}
+
+
+def _walk(plan: Dict[str, Any]):
+    yield plan
+    for child in plan.get('children', []) or []:
+        yield from _walk(child)
+
+
+def extract_property_predicates(cypher: str) -> Set[Tuple[str, str, str]]:
+    """
+    提取查询中用于过滤或排序的属性
+
+    Args:
+        cypher: Cypher查询
+
+    Returns:
+        {(实体类型 node/relationship, 标签或关系类型, 属性)}
+    """
+    bindings: Dict[str, Tuple[str, str]] = {}
+    predicates: Set[Tuple[str, str, str]] = set()
+
+    for variable, label, properties in NODE_PATTERN.findall(cypher):
+        bindings[variable] = ("node", label)
+        for prop in INLINE_PROPERTY_PATTERN.findall(properties or ""):
+            predicates.add(("node", label, prop))
+
+    for variable, rel_types, properties in REL_PATTERN.findall(cypher):
+        # 多类型关系（A|B）无法用单个关系属性索引覆盖
+        if '|' in rel_types:
+            continue
+        if variable:
+            bindings[variable] = ("relationship", rel_types)
+        for prop in INLINE_PROPERTY_PATTERN.findall(properties or ""):
+            predicates.add(("relationship", rel_types, prop))
+
+    for pattern in (PREDICATE_PATTERN, ORDER_BY_PATTERN):
+        for variable, prop in pattern.findall(cypher):
+            if variable in bindings:
+                entity_type, label = bindings[variable]
+                predicates.add((entity_type, label, prop))
+
+    return predicates
+
+
+class IndexAdvisor:
+    """基于查询形态与执行计划的索引顾问"""
+
+    def __init__(self, graph_query):
+        """
+        初始化索引顾问
+
+        Args:
+            graph_query: GraphQuery实例（用于生成Cypher与访问数据库）
+        """
+        self.graph_query = graph_query
+
+    def load_range_indexes(self) -> List[Dict[str, Any]]:
+        """读取数据库中已上线的范围索引"""
+        with self.graph_query.driver.session() as session:
+            records = session.run(
+                "SHOW INDEXES YIELD name, type, entityType, labelsOrTypes, properties, state "
+                "WHERE type = 'RANGE' RETURN name, entityType, labelsOrTypes, properties, state"
+            )
+            return [dict(record) for record in records]
+
+    @staticmethod
+    def _is_covered(predicate: Tuple[str, str, str],
+                    shape_predicates: Set[Tuple[str, str, str]],
+                    indexes: List[Dict[str, Any]]) -> bool:
+        """单属性索引，或属性全部出现在本查询条件中的复合索引可以覆盖该条件"""
+        entity_type, label, prop = predicate
+        for index in indexes:
+            if index['entityType'].lower() != entity_type or label not in (index['labelsOrTypes'] or []):
+                continue
+            properties = index['properties'] or []
+            if properties == [prop]:
+                return True
+            if prop in properties and all((entity_type, label, p) in shape_predicates for p in properties):
+                return True
+        return False
+
+    def explain(self, cypher: str) -> Dict[str, Any]:
+        """执行EXPLAIN并返回计划（不实际执行查询）"""
+        with self.graph_query.driver.session() as session:
+            return session.run(f"EXPLAIN {cypher}").consume().plan
+
+    def analyze(self) -> Dict[str, Any]:
+        """
+        分析全部查询形态
+
+        Returns:
+            报告 {"shapes": [...], "recommendations": [...], "existing_indexes": [...]}
+        """
+        indexes = self.load_range_indexes()
+        shapes = []
+        missing: Dict[Tuple[str, str, str], List[str]] = {}
+
+        for name, intent, slot_values in QUERY_SHAPES:
+            intent_result = IntentResult(
+                intent=get_intent_by_name(intent),
+                entities=[Entity(type=get_slot_by_name(slot), value=value) for slot, value in slot_values]
+            )
+            cypher = self.graph_query.generate_cypher(intent_result)
+            if not cypher:
+                continue
+
+            shape = {"shape": name, "intent": intent, "cypher": cypher}
+            try:
+                plan = self.explain(cypher)
+            except Exception as e:
+                logger.warning(f"EXPLAIN失败 [{name}]: {str(e)}")
+                shape["error"] = str(e)
+                shapes.append(shape)
+                continue
+
+            operators = list(_walk(plan))
+            shape["operators"] = sorted({_operator_name(op) for op in operators})
+            shape["label_scans"] = [
+                f"{_operator_name(op)}({_operator_args(op).get('Details', '')})"
+                for op in operators if _operator_name(op) in LABEL_SCAN_OPERATORS
+            ]
+            shape["cartesian_product"] = any(_operator_name(op) in CARTESIAN_OPERATORS for op in operators)
+
+            predicates = extract_property_predicates(cypher)
+            shape["missing_indexes"] = []
+            for predicate in sorted(predicates):
+                if not self._is_covered(predicate, predicates, indexes):
+                    shape["missing_indexes"].append(".".join(predicate[1:]))
+                    missing.setdefault(predicate, []).append(name)
+
+            shapes.append(shape)
+
+        recommendations = [
+            {"entity_type": entity_type, "label": label, "property": prop,
+             "statement": self.index_statement(entity_type, label, prop), "shapes": shape_names}
+            for (entity_type, label, prop), shape_names in sorted(missing.items())
+        ]
+
+        return {"shapes": shapes, "recommendations": recommendations, "existing_indexes": indexes}
+
+    @staticmethod
+    def index_statement(entity_type: str, label: str, prop: str) -> str:
+        """建议索引的创建语句"""
+        if entity_type == "relationship":
+            return (f"CREATE RANGE INDEX rel_{label.lower()}_{prop}_index IF NOT EXISTS "
+                    f"FOR ()-[r:{label}]-() ON (r.{prop})")
+        return (f"CREATE RANGE INDEX {label.lower()}_{prop}_index IF NOT EXISTS "
+                f"FOR (n:{label}) ON (n.{prop})")
+
+    def create_indexes(self, recommendations: List[Dict[str, Any]]) -> int:
+        """
+        创建建议的索引
+
+        Args:
+            recommendations: analyze返回的recommendations
+
+        Returns:
+            成功执行的语句数
+        """
+        created = 0
+        with self.graph_query.driver.session() as session:
+            for recommendation in recommendations:
+                try:
+                    session.run(recommendation['statement']).consume()
+                    created += 1
+                    logger.info(f"已创建索引: {recommendation['statement']}")
+                except Exception as e:
+                    logger.warning(f"创建索引失败 {recommendation['statement']}: {str(e)}")
+        return created
+
+
+def print_report(report: Dict[str, Any], verbose: bool = False):
+    """输出报告"""
+    print(f"\n{'查询形态':<20}{'标签扫描':<40}{'笛卡尔积':<10}缺失索引")
+    for shape in report['shapes']:
+        if 'error' in shape:
+            print(f"{shape['shape']:<20}EXPLAIN失败: {shape['error']}")
+            continue
+        print(f"{shape['shape']:<20}{', '.join(shape['label_scans']) or '-':<40}"
+              f"{'是' if shape['cartesian_product'] else '-':<10}{', '.join(shape['missing_indexes']) or '-'}")
+        if verbose:
+            print(f"    算子: {', '.join(shape['operators'])}")
+
+    print("\n建议创建的索引:")
+    if not report['recommendations']:
+        print("  无")
+    for recommendation in report['recommendations']:
+        print(f"  {recommendation['statement']}")
+        print(f"    涉及查询形态: {', '.join(recommendation['shapes'])}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    import argparse
+
+    from .graph_query import GraphQuery
+
+    parser = argparse.ArgumentParser(description="图谱索引顾问：EXPLAIN各意图的查询形态并报告缺失索引")
+    parser.add_argument("--config", type=str, default="config/config.yaml", help="配置文件路径")
+    parser.add_argument("--create", action="store_true", help="创建建议的范围索引/关系属性索引")
+    parser.add_argument("--verbose", action="store_true", help="输出每个查询形态的全部算子")
+    parser.add_argument("--output", type=str, default=None, help="报告输出JSON路径")
+
+    args = parser.parse_args()
+
+    graph_query = GraphQuery(args.config)
+    advisor = IndexAdvisor(graph_query)
+
+    report = advisor.analyze()
+    print_report(report, args.verbose)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+
+    if args.create and report['recommendations']:
+        created = advisor.create_indexes(report['recommendations'])
+        print(f"\n已执行 {created}/{len(report['recommendations'])} 条索引创建语句（索引在后台填充，可用SHOW INDEXES查看状态）")
+
+    graph_query.close()
@@ -0,0 +1,273 @@
+"""
+图谱预取模块
+意图模型推理期间，用实体词典在原始查询中匹配已知的资产/字段/域/专区名称，
+为最可能的意图提前执行Cypher；预测意图生成的Cypher与预取一致时直接复用结果，
+将图谱检索延迟隐藏在意图识别之后
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from ..intent_recognition.intent_config import Entity, IntentResult, get_intent_by_name, get_slot_by_name
+
+logger = logging.getLogger(__name__)
+
+
+# 词典来源：槽位类型 -> 查询已知名称的Cypher
+VOCABULARY_QUERIES = {
+    "AssetName": "MATCH (a:Asset) WHERE a.name IS NOT NULL RETURN a.name AS name",
+    "FieldName": "MATCH (f:Field) WHERE f.name IS NOT NULL RETURN DISTINCT f.name AS name",
+    "AssetType": "MATCH (a:Asset) WHERE a.type IS NOT NULL RETURN DISTINCT a.type AS name",
+    "BusinessDomain": "MATCH (d:BusinessDomain) WHERE d.name IS NOT NULL RETURN d.name AS name",
+    "BusinessZone": "MATCH (z:BusinessZone) WHERE z.name IS NOT NULL RETURN z.name AS name"
+}
+
+# 元数据项（与_generate_metadata_query_cypher中的映射一致）
+DEFAULT_METADATA_ITEMS = ["业务口径", "技术口径", "简介", "用途", "负责人", "版本", "状态", "数据类型"]
+
+# 各意图预取时使用的槽位（与对应_generate_*_cypher支持的槽位一致）
+PREFETCH_SLOTS = {
+    "31": ["AssetName", "AssetType", "BusinessDomain", "FieldName"],
+    "32": ["AssetName", "FieldName", "MetadataItem"],
+    "33": ["AssetName"],
+    "35": ["AssetName"],
+    "36": ["BusinessZone"]
+}
+
+# 仅有这些槽位时不预取（单独的MetadataItem无法定位资产）
+NON_ANCHOR_SLOTS = {"MetadataItem"}
+
+
+class EntityLookup:
+    """
+    实体词典：在查询文本中做最长优先的非重叠匹配
+
+    名称按首个二元组建立索引，匹配代价与查询长度成正比，与词典规模无关
+    """
+
+    def __init__(self, metadata_items: Optional[List[str]] = None):
+        """
+        初始化实体词典
+
+        Args:
+            metadata_items: 元数据项词表
+        """
+        self.metadata_items = metadata_items or DEFAULT_METADATA_ITEMS
+        self._index: Dict[str, List[tuple]] = {}
+        self._size = 0
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def load(self, graph_query):
+        """
+        从Neo4j加载已知名称并重建索引（构建完成后整体替换，匹配线程无需加锁）
+
+        Args:
+            graph_query: GraphQuery实例
+        """
+        entries = [(item, "MetadataItem") for item in self.metadata_items]
+        for slot_type, cypher in VOCABULARY_QUERIES.items():
+            for record in graph_query.execute_query(cypher, capped=False):
+                name = record.get('name')
+                if isinstance(name, str) and len(name.strip()) >= 2:
+                    entries.append((name.strip(), slot_type))
+
+        index: Dict[str, List[tuple]] = {}
+        for name, slot_type in set(entries):
+            index.setdefault(name[:2], []).append((name, slot_type))
+        for candidates in index.values():
+            candidates.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+        self._index = index
+        self._size = len(entries)
+        self.loaded_at = time.time()
+        logger.info(f"实体词典加载完成，共 {self._size} 个名称")
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """
+        匹配查询中出现的已知名称
+
+        Args:
+            text: 用户查询
+
+        Returns:
+            槽位字典 {槽位类型: [值列表]}（按在查询中出现的顺序）
+        """
+        slots: Dict[str, List[str]] = {}
+        index = self._index
+        i = 0
+
+        while i < len(text) - 1:
+            matched_length = 0
+            for name, slot_type in index.get(text[i:i + 2], []):
+                if matched_length and len(name) < matched_length:
+                    break
+                if text.startswith(name, i):
+                    matched_length = len(name)
+                    values = slots.setdefault(slot_type, [])
+                    if name not in values:
+                        values.append(name)
+
+            i += matched_length or 1
+
+        return slots
+
+
+class PrefetchHandle:
+    """单次查询的预取结果：Cypher -> Future"""
+
+    def __init__(self, futures: Optional[Dict[str, Future]] = None, wait_timeout: float = 5):
+        self.futures = futures or {}
+        self.wait_timeout = wait_timeout
+
+    def take(self, cypher: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        取出与Cypher一致的预取结果，并取消其余未开始的预取
+
+        Args:
+            cypher: 预测意图生成的Cypher
+
+        Returns:
+            查询结果，未命中或预取失败时返回None
+        """
+        future = self.futures.pop(cypher, None)
+        self.cancel()
+
+        if future is None:
+            return None
+
+        try:
+            return future.result(timeout=self.wait_timeout)
+        except Exception as e:
+            logger.warning(f"预取结果不可用，改为直接查询: {str(e)}")
+            return None
+
+    def cancel(self):
+        """取消尚未开始执行的预取"""
+        for future in self.futures.values():
+            future.cancel()
+        self.futures = {}
+
+
+class GraphPrefetcher:
+    """
+    图谱预取器
+
+    按candidate_intents顺序为匹配到的槽位组装候选意图，
+    生成的Cypher去重后提交到线程池执行
+    """
+
+    def __init__(self, graph_query, prefetch_config: Dict[str, Any]):
+        """
+        初始化预取器
+
+        Args:
+            graph_query: GraphQuery实例
+            prefetch_config: graph.prefetch配置
+        """
+        self.graph_query = graph_query
+        self.candidate_intents = [str(i) for i in prefetch_config.get('candidate_intents', ["32", "33", "31"])]
+        self.max_candidates = prefetch_config.get('max_candidates', 3)
+        self.refresh_interval = prefetch_config.get('refresh_interval', 600)
+        self.retry_interval = prefetch_config.get('retry_interval', 30)
+        self.wait_timeout = prefetch_config.get('wait_timeout', 5)
+
+        self.lookup = EntityLookup(prefetch_config.get('metadata_items'))
+        self.executor = ThreadPoolExecutor(
+            max_workers=prefetch_config.get('max_workers', 4),
+            thread_name_prefix="graph-prefetch"
+        )
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._last_refresh = 0.0
+
+    def start(self, user_query: str) -> PrefetchHandle:
+        """
+        为查询启动预取（不阻塞）
+
+        Args:
+            user_query: 用户查询
+
+        Returns:
+            预取句柄
+        """
+        self._maybe_refresh()
+
+        if self.lookup.loaded_at is None:
+            return PrefetchHandle()
+
+        slots = self.lookup.match(user_query)
+        if not set(slots) - NON_ANCHOR_SLOTS:
+            return PrefetchHandle()
+
+        futures = {}
+        for intent_result in self._candidates(slots):
+            # 图谱快照可直接求值的查询不需要预取（只判断查询形态，不在快照上求值）
+            if self.graph_query.can_answer_from_snapshot(intent_result):
+                continue
+
+            try:
+                cypher = self.graph_query.generate_cypher(intent_result)
+            except Exception as e:
+                logger.debug(f"候选意图 {intent_result.intent.value} 生成Cypher失败: {str(e)}")
+                continue
+
+            if cypher and cypher not in futures:
+                futures[cypher] = self.executor.submit(
+                    self.graph_query.execute_query, cypher, intent=intent_result.intent.value
+                )
+            if len(futures) >= self.max_candidates:
+                break
+
+        if futures:
+            logger.info(f"启动图谱预取: 槽位 {slots}，候选查询 {len(futures)} 条")
+        return PrefetchHandle(futures, self.wait_timeout)
+
+    def _candidates(self, slots: Dict[str, List[str]]) -> List[IntentResult]:
+        """按候选意图组装IntentResult"""
+        candidates = []
+        for intent in self.candidate_intents:
+            slot_types = [s for s in PREFETCH_SLOTS.get(intent, []) if s in slots]
+            if not set(slot_types) - NON_ANCHOR_SLOTS:
+                continue
+
+            entities = [
+                Entity(type=get_slot_by_name(slot_type), value=value)
+                for slot_type in slot_types
+                for value in slots[slot_type]
+            ]
+            candidates.append(IntentResult(intent=get_intent_by_name(intent), entities=entities))
+
+        return candidates
+
+    def _maybe_refresh(self):
+        """词典过期时在后台刷新（首次加载完成前不预取，加载失败后按retry_interval重试）"""
+        interval = self.refresh_interval if self.lookup.loaded_at is not None else self.retry_interval
+        if time.time() - self._last_refresh < interval:
+            return
+
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._last_refresh = time.time()
+
+        def _refresh():
+            try:
+                self.lookup.load(self.graph_query)
+            except Exception as e:
+                logger.warning(f"实体词典加载失败: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        self.executor.submit(_refresh)
+
+    def shutdown(self):
+        """关闭线程池"""
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,181 @@
+"""
+图谱查询统计模块
+按查询模板（字符串字面量替换为占位符后的Cypher）汇总执行耗时、返回行数与结果摘要中的服务端耗时；
+抽样查询以PROFILE执行，额外记录db hits与规划器信息
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from ..monitoring.metrics import percentile_summary
+
+# 字符串字面量（槽位值）
+STRING_LITERAL_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+
+# 超出模板数上限后的统计归入该模板
+OVERFLOW_TEMPLATE = "__other__"
+
+# PROFILE根算子参数中的规划器信息
+PLANNER_ARGS = ("planner", "planner-impl", "runtime", "runtime-impl", "version")
+
+
+def query_template(cypher: str) -> Tuple[str, str]:
+    """
+    查询模板：字符串字面量替换为?并压缩空白
+
+    Args:
+        cypher: Cypher查询
+
+    Returns:
+        (模板id, 模板文本)
+    """
+    template = " ".join(STRING_LITERAL_PATTERN.sub("?", cypher).split())
+    return hashlib.sha1(template.encode('utf-8')).hexdigest()[:12], template
+
+
+def _profile_db_hits(profile: Dict[str, Any]) -> int:
+    """PROFILE计划树各算子的db hits之和"""
+    return (profile.get('dbHits', 0) or 0) + sum(
+        _profile_db_hits(child) for child in profile.get('children', []) or []
+    )
+
+
+class QueryStats:
+    """
+    按模板汇总的图谱查询统计
+
+    每个模板保留最近window_size个样本；所有查询都记录客户端耗时与结果摘要中的
+    result_available_after / result_consumed_after，按profile_sample_rate抽样的查询以PROFILE执行
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        初始化查询统计
+
+        Args:
+            config: graph.instrumentation配置
+        """
+        self.profile_sample_rate = config.get('profile_sample_rate', 0.05)
+        self.window_size = config.get('window_size', 512)
+        self.max_templates = config.get('max_templates', 200)
+
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def should_profile(self) -> bool:
+        """本次查询是否以PROFILE执行"""
+        return random.random() < self.profile_sample_rate
+
+    def record(self,
+               cypher: str,
+               seconds: float,
+               rows: int = 0,
+               summary=None,
+               intent: Optional[str] = None,
+               template: Optional[str] = None,
+               error: bool = False):
+        """
+        记录一次查询
+
+        Args:
+            cypher: 执行的Cypher（不含PROFILE前缀）
+            seconds: 客户端总耗时（秒）
+            rows: 返回行数
+            summary: neo4j ResultSummary（查询失败时为None）
+            intent: 意图编码
+            template: 模板名称（为空时由Cypher推导）
+            error: 是否执行失败
+        """
+        template_id, template_text = query_template(cypher)
+        if template:
+            template_id = template
+
+        profile = getattr(summary, 'profile', None) if summary is not None else None
+
+        with self._lock:
+            if template_id not in self._templates and len(self._templates) >= self.max_templates:
+                template_id, template_text = OVERFLOW_TEMPLATE, ""
+
+            stats = self._templates.get(template_id)
+            if stats is None:
+                stats = self._templates[template_id] = {
+                    "template": template_text,
+                    "intents": set(),
+                    "count": 0,
+                    "errors": 0,
+                    "profiled": 0,
+                    "latency_ms": deque(maxlen=self.window_size),
+                    "available_after_ms": deque(maxlen=self.window_size),
+                    "consumed_after_ms": deque(maxlen=self.window_size),
+                    "rows": deque(maxlen=self.window_size),
+                    "db_hits": deque(maxlen=self.window_size),
+                    "planner": None,
+                    "last_seen": None
+                }
+
+            stats["count"] += 1
+            stats["last_seen"] = time.time()
+            if intent:
+                stats["intents"].add(intent)
+            if error:
+                stats["errors"] += 1
+                return
+
+            stats["latency_ms"].append(seconds * 1000)
+            stats["rows"].append(rows)
+            if summary is not None:
+                if summary.result_available_after is not None:
+                    stats["available_after_ms"].append(summary.result_available_after)
+                if summary.result_consumed_after is not None:
+                    stats["consumed_after_ms"].append(summary.result_consumed_after)
+
+            if profile:
+                stats["profiled"] += 1
+                stats["db_hits"].append(_profile_db_hits(profile))
+                args = profile.get('args') or profile.get('arguments') or {}
+                stats["planner"] = {key: args[key] for key in PLANNER_ARGS if key in args}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        按模板汇总（按累计耗时降序）
+
+        Returns:
+            {"profile_sample_rate", "templates": [{template_id, template, intents, count, errors,
+             latency_ms, result_available_after_ms, result_consumed_after_ms, rows, profiled, db_hits, planner}]}
+        """
+        with self._lock:
+            snapshot = {
+                template_id: {
+                    **stats,
+                    "intents": sorted(stats["intents"]),
+                    **{key: list(stats[key]) for key in
+                       ("latency_ms", "available_after_ms", "consumed_after_ms", "rows", "db_hits")}
+                }
+                for template_id, stats in self._templates.items()
+            }
+
+        templates = []
+        for template_id, stats in snapshot.items():
+            templates.append({
+                "template_id": template_id,
+                "template": stats["template"],
+                "intents": stats["intents"],
+                "count": stats["count"],
+                "errors": stats["errors"],
+                "latency_ms": percentile_summary(stats["latency_ms"]),
+                "result_available_after_ms": percentile_summary(stats["available_after_ms"]),
+                "result_consumed_after_ms": percentile_summary(stats["consumed_after_ms"]),
+                "rows": percentile_summary(stats["rows"]),
+                "profiled": stats["profiled"],
+                "db_hits": percentile_summary(stats["db_hits"]),
+                "planner": stats["planner"],
+                "last_seen": stats["last_seen"]
+            })
+
+        templates.sort(key=lambda t: t["latency_ms"]["mean"] * t["latency_ms"]["count"], reverse=True)
+        return {"profile_sample_rate": self.profile_sample_rate, "templates": templates}
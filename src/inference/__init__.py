@@ -0,0 +1,16 @@
+"""
+推理后端模块
+统一意图识别与答案生成模型的加载和生成接口
+"""
+
+from .backends import InferenceBackend, TransformersBackend, LlamaCppBackend, create_backend
+from .model_registry import ModelRegistry, get_model_registry
+
+__all__ = [
+    'InferenceBackend',
+    'TransformersBackend',
+    'LlamaCppBackend',
+    'create_backend',
+    'ModelRegistry',
+    'get_model_registry'
+]
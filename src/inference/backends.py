@@ -0,0 +1,552 @@
+"""
+推理后端模块
+为意图识别和答案生成模型提供统一的加载/生成接口，按config.yaml中每个模型的backend配置选择：
+
+- transformers: HuggingFace模型，GPU默认float16；CPU默认float32，可选int8动态权重量化
+- llama_cpp: GGUF量化模型（如Q4_K_M/Q8_0），用于无GPU的预发布/灾备节点
+"""
+
+import logging
+import time
+from abc import ABC, abstractmethod
+from threading import Event, Thread
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .model_registry import get_model_registry
+from ..monitoring.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBackend(ABC):
+    """推理后端抽象基类"""
+
+    # 是否暴露transformers的model/tokenizer（投机解码、连续批处理依赖）
+    supports_transformers_features = False
+
+    def __init__(self, model_config: Dict[str, Any]):
+        """
+        初始化推理后端
+
+        Args:
+            model_config: config.yaml中models下的单个模型配置
+        """
+        self.model_config = model_config
+        self.device = model_config.get('device', 'cuda')
+        self.model = None
+        self.tokenizer = None
+
+    @property
+    def model_name(self) -> str:
+        """指标中的模型名称"""
+        return self.model_config.get('model_name', self.model_config.get('model_path', 'unknown'))
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    @abstractmethod
+    def load(self):
+        """加载模型权重"""
+        pass
+
+    @abstractmethod
+    def count_tokens(self, text: str) -> int:
+        """计算文本token数"""
+        pass
+
+    @abstractmethod
+    def generate(self,
+                 messages: List[Dict],
+                 max_new_tokens: int,
+                 temperature: float,
+                 top_p: float,
+                 repetition_penalty: Optional[float] = None,
+                 **generate_kwargs) -> Tuple[str, int]:
+        """
+        对单条消息列表执行生成
+
+        Returns:
+            (生成文本, 新生成的token数)
+        """
+        pass
+
+    @abstractmethod
+    def stream(self,
+               messages: List[Dict],
+               max_new_tokens: int,
+               temperature: float,
+               top_p: float,
+               repetition_penalty: Optional[float] = None,
+               **generate_kwargs) -> Iterator[str]:
+        """流式生成，逐段产出文本"""
+        pass
+
+    def generate_batch(self,
+                       messages_list: List[List[Dict]],
+                       max_new_tokens: int,
+                       temperature: float,
+                       top_p: float,
+                       repetition_penalty: Optional[float] = None,
+                       max_batch_size: int = 8,
+                       max_batch_tokens: Optional[int] = None,
+                       **generate_kwargs) -> List[Tuple[str, int]]:
+        """
+        批量生成（默认逐条生成，支持批量前向的后端可覆盖）
+
+        Returns:
+            与输入顺序一致的 (生成文本, 新生成的token数) 列表
+        """
+        return [
+            self.generate(messages, max_new_tokens, temperature, top_p, repetition_penalty, **generate_kwargs)
+            for messages in messages_list
+        ]
+
+
+class TransformersBackend(InferenceBackend):
+    """
+    HuggingFace transformers后端
+
+    量化选项（quantization）：
+    - GPU: int8 / int4（bitsandbytes）
+    - CPU: int8（torch动态量化，仅量化Linear权重）
+    """
+
+    supports_transformers_features = True
+
+    def load_tokenizer(self):
+        """单独加载分词器（上下文token计数无需加载模型权重）"""
+        if self.tokenizer is not None:
+            return
+
+        self.tokenizer = get_model_registry().get_tokenizer(
+            self.model_config.get('tokenizer_path', self.model_config['model_path'])
+        )
+
+    def load(self):
+        if self.model is not None:
+            return
+
+        import torch
+        from transformers import AutoModelForCausalLM
+
+        self.load_tokenizer()
+
+        on_cpu = self.device == 'cpu'
+        quantization = self.model_config.get('quantization')
+
+        dtype = torch.float32 if on_cpu else torch.float16
+        load_kwargs = {}
+        loader = None
+
+        if quantization and not on_cpu:
+            from transformers import BitsAndBytesConfig
+            if quantization == 'int8':
+                load_kwargs["quantization_config"] = BitsAndBytesConfig(load_in_8bit=True)
+            elif quantization == 'int4':
+                load_kwargs["quantization_config"] = BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_compute_dtype=torch.float16
+                )
+        elif quantization and on_cpu:
+            if quantization != 'int8':
+                raise ValueError(f"CPU上transformers后端仅支持int8量化，{quantization}请使用llama_cpp后端")
+
+            def loader(model_path, **kwargs):
+                # 动态量化：Linear权重int8存储，激活在推理时动态量化
+                model = AutoModelForCausalLM.from_pretrained(model_path, **kwargs)
+                return torch.ao.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+
+        # 通过进程级注册表加载，相同(路径, dtype, 设备, 量化)的模型只加载一次
+        self.model = get_model_registry().get_model(
+            self.model_config['model_path'],
+            dtype=dtype,
+            device=self.device,
+            quantization=quantization,
+            mmap_safetensors=self.model_config.get('mmap_safetensors', True),
+            loader=loader,
+            **load_kwargs
+        )
+
+    def count_tokens(self, text: str) -> int:
+        self.load_tokenizer()
+        return len(self.tokenizer(text, add_special_tokens=False)['input_ids'])
+
+    def _prepare(self,
+                 messages: List[Dict],
+                 max_new_tokens: int,
+                 temperature: float,
+                 top_p: float,
+                 repetition_penalty: Optional[float],
+                 generate_kwargs: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        """编码输入并组装generate参数"""
+        # 编码输入
+        model_inputs = self.tokenizer(
+            [self._apply_chat_template(messages)], return_tensors="pt"
+        ).to(self.model.device)
+
+        return model_inputs, self._generation_kwargs(
+            max_new_tokens, temperature, top_p, repetition_penalty, generate_kwargs
+        )
+
+    def _apply_chat_template(self, messages: List[Dict]) -> str:
+        """应用聊天模板"""
+        return self.tokenizer.apply_chat_template(
+            messages,
+            tokenize=False,
+            add_generation_prompt=True
+        )
+
+    def _generation_kwargs(self,
+                           max_new_tokens: int,
+                           temperature: float,
+                           top_p: float,
+                           repetition_penalty: Optional[float],
+                           generate_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """组装generate参数"""
+        gen_kwargs = {
+            "max_new_tokens": max_new_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "do_sample": True if temperature > 0 else False,
+            "pad_token_id": self.tokenizer.eos_token_id
+        }
+        if repetition_penalty is not None:
+            gen_kwargs["repetition_penalty"] = repetition_penalty
+        gen_kwargs.update(generate_kwargs)
+
+        return gen_kwargs
+
+    def generate(self,
+                 messages: List[Dict],
+                 max_new_tokens: int,
+                 temperature: float,
+                 top_p: float,
+                 repetition_penalty: Optional[float] = None,
+                 **generate_kwargs) -> Tuple[str, int]:
+        import torch
+
+        model_inputs, gen_kwargs = self._prepare(
+            messages, max_new_tokens, temperature, top_p, repetition_penalty, generate_kwargs
+        )
+
+        start = time.perf_counter()
+        with torch.no_grad():
+            generated_ids = self.model.generate(
+                model_inputs.input_ids,
+                attention_mask=model_inputs.attention_mask,
+                **gen_kwargs
+            )
+        elapsed = time.perf_counter() - start
+
+        # 解码输出
+        generated_ids = [
+            output_ids[len(input_ids):]
+            for input_ids, output_ids in zip(model_inputs.input_ids, generated_ids)
+        ]
+
+        output_text = self.tokenizer.batch_decode(
+            generated_ids,
+            skip_special_tokens=True
+        )[0]
+
+        get_metrics().observe_generation(
+            self.model_name, model_inputs.input_ids.shape[1], len(generated_ids[0]), elapsed
+        )
+
+        return output_text, len(generated_ids[0])
+
+    def generate_batch(self,
+                       messages_list: List[List[Dict]],
+                       max_new_tokens: int,
+                       temperature: float,
+                       top_p: float,
+                       repetition_penalty: Optional[float] = None,
+                       max_batch_size: int = 8,
+                       max_batch_tokens: Optional[int] = None,
+                       **generate_kwargs) -> List[Tuple[str, int]]:
+        """
+        静态批量生成
+
+        按prompt长度排序后分桶，长度相近的prompt左填充到同一批次执行一次generate，
+        减少填充浪费；单批受max_batch_size条数和max_batch_tokens（填充后prompt总token数）约束
+        """
+        import torch
+
+        if not messages_list:
+            return []
+
+        prompt_ids = self.tokenizer(
+            [self._apply_chat_template(messages) for messages in messages_list]
+        )['input_ids']
+        gen_kwargs = self._generation_kwargs(
+            max_new_tokens, temperature, top_p, repetition_penalty, generate_kwargs
+        )
+        # 与generate使用同一填充token，便于统计各行实际生成长度
+        pad_token_id = gen_kwargs['pad_token_id']
+
+        results: List[Optional[Tuple[str, int]]] = [None] * len(messages_list)
+
+        for bucket in self._length_buckets(prompt_ids, max_batch_size, max_batch_tokens):
+            max_len = max(len(prompt_ids[idx]) for idx in bucket)
+
+            # 左填充：生成的新token在所有行中对齐在末尾
+            input_ids = torch.full((len(bucket), max_len), pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(bucket), max_len), dtype=torch.long)
+            for row, idx in enumerate(bucket):
+                ids = prompt_ids[idx]
+                input_ids[row, max_len - len(ids):] = torch.tensor(ids, dtype=torch.long)
+                attention_mask[row, max_len - len(ids):] = 1
+
+            start = time.perf_counter()
+            with torch.no_grad():
+                output_ids = self.model.generate(
+                    input_ids.to(self.model.device),
+                    attention_mask=attention_mask.to(self.model.device),
+                    **gen_kwargs
+                )
+            elapsed = time.perf_counter() - start
+
+            # 拆分回各条请求（提前结束的行在末尾以pad填充）
+            new_tokens = output_ids[:, max_len:]
+            texts = self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+            bucket_tokens = 0
+            for row, idx in enumerate(bucket):
+                num_tokens = int((new_tokens[row] != pad_token_id).sum().item())
+                results[idx] = (texts[row], num_tokens)
+                bucket_tokens += num_tokens
+
+            get_metrics().observe_generation(
+                self.model_name, sum(len(prompt_ids[idx]) for idx in bucket), bucket_tokens, elapsed
+            )
+
+            logger.debug(f"批量生成: {len(bucket)}条, 填充后prompt长度 {max_len}")
+
+        return results
+
+    @staticmethod
+    def _length_buckets(prompt_ids: List[List[int]],
+                        max_batch_size: int,
+                        max_batch_tokens: Optional[int]) -> List[List[int]]:
+        """按prompt长度升序分桶，返回每批的原始下标列表"""
+        order = sorted(range(len(prompt_ids)), key=lambda idx: len(prompt_ids[idx]))
+
+        buckets = []
+        current = []
+        for idx in order:
+            # 升序排列，当前条即为批内最长prompt
+            padded_tokens = (len(current) + 1) * len(prompt_ids[idx])
+            if current and (len(current) >= max_batch_size
+                            or (max_batch_tokens and padded_tokens > max_batch_tokens)):
+                buckets.append(current)
+                current = []
+            current.append(idx)
+
+        if current:
+            buckets.append(current)
+        return buckets
+
+    def stream(self,
+               messages: List[Dict],
+               max_new_tokens: int,
+               temperature: float,
+               top_p: float,
+               repetition_penalty: Optional[float] = None,
+               **generate_kwargs) -> Iterator[str]:
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+        model_inputs, gen_kwargs = self._prepare(
+            messages, max_new_tokens, temperature, top_p, repetition_penalty, generate_kwargs
+        )
+
+        streamer = TextIteratorStreamer(
+            self.tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True,
+            timeout=self.model_config.get('stream_timeout', 60)
+        )
+
+        # 调用方提前结束迭代（如客户端断开）时置位，generate在下一个解码步停止
+        cancelled = Event()
+
+        class _CancelCriteria(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return torch.full((input_ids.shape[0],), cancelled.is_set(),
+                                  dtype=torch.bool, device=input_ids.device)
+
+        stopping_criteria = StoppingCriteriaList(gen_kwargs.pop('stopping_criteria', None) or [])
+        stopping_criteria.append(_CancelCriteria())
+
+        errors = []
+
+        def _run():
+            try:
+                with torch.no_grad():
+                    self.model.generate(
+                        model_inputs.input_ids,
+                        attention_mask=model_inputs.attention_mask,
+                        streamer=streamer,
+                        stopping_criteria=stopping_criteria,
+                        **gen_kwargs
+                    )
+            except Exception as e:
+                # 结束streamer，调用方立即退出迭代并重新抛出，而不是等到stream_timeout
+                logger.error(f"流式生成失败: {str(e)}")
+                errors.append(e)
+                streamer.end()
+
+        start = time.perf_counter()
+        thread = Thread(target=_run, daemon=True)
+        thread.start()
+
+        chunks = []
+        try:
+            for chunk in streamer:
+                if chunk:
+                    chunks.append(chunk)
+                    yield chunk
+        finally:
+            cancelled.set()
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        get_metrics().observe_generation(
+            self.model_name,
+            model_inputs.input_ids.shape[1],
+            self.count_tokens("".join(chunks)),
+            time.perf_counter() - start
+        )
+
+
+class LlamaCppBackend(InferenceBackend):
+    """
+    llama.cpp后端（GGUF权重量化，CPU推理）
+
+    依赖: pip install llama-cpp-python
+    """
+
+    def __init__(self, model_config: Dict[str, Any]):
+        super().__init__(model_config)
+        self.llama_config = model_config.get('llama_cpp', {}) or {}
+        self._vocab = None  # 仅加载词表的实例，用于token计数
+
+    def _create_llama(self, vocab_only: bool = False):
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise ImportError("llama_cpp后端需要安装llama-cpp-python: pip install llama-cpp-python")
+
+        return Llama(
+            model_path=self.llama_config['model_path'],
+            n_ctx=self.llama_config.get('n_ctx', 8192),
+            n_threads=self.llama_config.get('n_threads'),
+            vocab_only=vocab_only,
+            verbose=False
+        )
+
+    def load(self):
+        if self.model is not None:
+            return
+        self.model = self._create_llama()
+
+    def count_tokens(self, text: str) -> int:
+        llama = self.model
+        if llama is None:
+            if self._vocab is None:
+                self._vocab = self._create_llama(vocab_only=True)
+            llama = self._vocab
+        return len(llama.tokenize(text.encode('utf-8'), add_bos=False))
+
+    def _completion_kwargs(self,
+                           max_new_tokens: int,
+                           temperature: float,
+                           top_p: float,
+                           repetition_penalty: Optional[float]) -> Dict[str, Any]:
+        kwargs = {
+            "max_tokens": max_new_tokens,
+            "temperature": temperature,
+            "top_p": top_p
+        }
+        if repetition_penalty is not None:
+            kwargs["repeat_penalty"] = repetition_penalty
+        return kwargs
+
+    def generate(self,
+                 messages: List[Dict],
+                 max_new_tokens: int,
+                 temperature: float,
+                 top_p: float,
+                 repetition_penalty: Optional[float] = None,
+                 **generate_kwargs) -> Tuple[str, int]:
+        if generate_kwargs:
+            logger.debug(f"llama_cpp后端忽略参数: {list(generate_kwargs)}")
+
+        start = time.perf_counter()
+        response = self.model.create_chat_completion(
+            messages=messages,
+            **self._completion_kwargs(max_new_tokens, temperature, top_p, repetition_penalty)
+        )
+
+        output_text = response['choices'][0]['message']['content'] or ""
+        usage = response.get('usage', {})
+        num_tokens = usage.get('completion_tokens', 0)
+
+        get_metrics().observe_generation(
+            self.model_name, usage.get('prompt_tokens', 0), num_tokens, time.perf_counter() - start
+        )
+        return output_text, num_tokens
+
+    def stream(self,
+               messages: List[Dict],
+               max_new_tokens: int,
+               temperature: float,
+               top_p: float,
+               repetition_penalty: Optional[float] = None,
+               **generate_kwargs) -> Iterator[str]:
+        start = time.perf_counter()
+        chunks = self.model.create_chat_completion(
+            messages=messages,
+            stream=True,
+            **self._completion_kwargs(max_new_tokens, temperature, top_p, repetition_penalty)
+        )
+
+        # llama.cpp流式输出每个片段对应一个token
+        num_tokens = 0
+        for chunk in chunks:
+            text = chunk['choices'][0].get('delta', {}).get('content')
+            if text:
+                num_tokens += 1
+                yield text
+
+        get_metrics().observe_generation(self.model_name, 0, num_tokens, time.perf_counter() - start)
+
+
+# 后端名称到实现类的映射
+BACKENDS = {
+    'transformers': TransformersBackend,
+    'llama_cpp': LlamaCppBackend
+}
+
+
+def create_backend(model_config: Dict[str, Any]) -> InferenceBackend:
+    """
+    根据模型配置创建推理后端
+
+    Args:
+        model_config: 单个模型配置（backend字段缺省为transformers）
+
+    Returns:
+        推理后端实例
+    """
+    backend_name = model_config.get('backend', 'transformers')
+    backend_class = BACKENDS.get(backend_name)
+
+    if not backend_class:
+        raise ValueError(f"未知推理后端: {backend_name}，可选: {list(BACKENDS)}")
+
+    return backend_class(model_config)
@@ -0,0 +1,189 @@
+"""
+推理后端CPU延迟基准测试
+在同一批样本上对比各后端（transformers fp32 / transformers int8 / llama_cpp GGUF）的延迟与吞吐
+
+用法：
+    python3 -m src.inference.benchmark --model answer_generation \
+        --variants transformers transformers:int8 llama_cpp --repeats 3
+"""
+
+import copy
+import gc
+import json
+import logging
+import statistics
+import time
+from typing import Dict, List
+
+import yaml
+
+from .backends import create_backend
+from .model_registry import get_model_registry
+from ..answer_generation.speculative_benchmark import DEFAULT_RAG_PROMPTS
+
+logger = logging.getLogger(__name__)
+
+
+# 意图识别样本查询
+DEFAULT_INTENT_QUERIES = [
+    "平台上有哪些五星资产？",
+    "宽带提质速率(月)这个资产是干什么用的？",
+    "HR系统的负责人是谁？",
+    "公众智慧运营专区有哪些资产？",
+    "如何订阅资产？"
+]
+
+
+def build_samples(model_key: str, prompt_config: Dict) -> List[List[Dict]]:
+    """
+    构建与线上一致的消息列表样本
+
+    Args:
+        model_key: intent_recognition 或 answer_generation
+        prompt_config: prompt配置
+
+    Returns:
+        消息列表的列表
+    """
+    if model_key == 'intent_recognition':
+        system_prompt = prompt_config['intent_recognition_system']
+        return [
+            [{"role": "system", "content": system_prompt}, {"role": "user", "content": query}]
+            for query in DEFAULT_INTENT_QUERIES
+        ]
+
+    system_prompt = prompt_config['answer_generation_system']
+    return [
+        [
+            {"role": "system", "content": f"{system_prompt}\n\n【知识库上下文】\n{item['context']}"},
+            {"role": "user", "content": item['query']}
+        ]
+        for item in DEFAULT_RAG_PROMPTS
+    ]
+
+
+def benchmark_variant(model_config: Dict,
+                      samples: List[List[Dict]],
+                      repeats: int,
+                      max_new_tokens: int) -> Dict[str, float]:
+    """
+    测试单个后端变体
+
+    Returns:
+        指标字典
+    """
+    backend = create_backend(model_config)
+
+    try:
+        load_start = time.perf_counter()
+        backend.load()
+        load_time = time.perf_counter() - load_start
+
+        # 预热
+        backend.generate(samples[0], max_new_tokens=8, temperature=0.0, top_p=1.0)
+
+        latencies = []
+        total_tokens = 0
+        for _ in range(repeats):
+            for messages in samples:
+                start = time.perf_counter()
+                _, num_tokens = backend.generate(
+                    messages, max_new_tokens=max_new_tokens, temperature=0.0, top_p=1.0
+                )
+                latencies.append(time.perf_counter() - start)
+                total_tokens += num_tokens
+    finally:
+        # 释放本变体的权重再加载下一个变体（注册表按进程缓存模型，14B fp32与int8量化前的副本无法同时驻留内存）
+        get_model_registry().release(model_config['model_path'])
+        backend.model = None
+        del backend
+        gc.collect()
+
+    latencies.sort()
+    total_time = sum(latencies)
+    p95_idx = min(len(latencies) - 1, int(len(latencies) * 0.95))
+
+    return {
+        "load_seconds": load_time,
+        "requests": len(latencies),
+        "latency_mean": statistics.mean(latencies),
+        "latency_p50": statistics.median(latencies),
+        "latency_p95": latencies[p95_idx],
+        "tokens_per_sec": total_tokens / total_time if total_time > 0 else 0.0
+    }
+
+
+def run_benchmark(config_path: str,
+                  model_key: str,
+                  variants: List[str],
+                  repeats: int = 3,
+                  max_new_tokens: int = 128) -> Dict[str, Dict[str, float]]:
+    """
+    运行CPU基准测试
+
+    Args:
+        config_path: 配置文件路径
+        model_key: 测试的模型（intent_recognition / answer_generation）
+        variants: 后端变体列表，格式 backend[:quantization]
+        repeats: 重复次数
+        max_new_tokens: 最大生成token数
+
+    Returns:
+        {变体: 指标}
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    with open('config/prompt_config.yaml', 'r', encoding='utf-8') as f:
+        prompt_config = yaml.safe_load(f)
+
+    samples = build_samples(model_key, prompt_config)
+    results = {}
+
+    for variant in variants:
+        backend_name, _, quantization = variant.partition(':')
+
+        model_config = copy.deepcopy(config['models'][model_key])
+        model_config['backend'] = backend_name
+        model_config['device'] = 'cpu'
+        model_config['quantization'] = quantization or None
+
+        logger.info(f"测试后端: {variant}")
+        try:
+            results[variant] = benchmark_variant(model_config, samples, repeats, max_new_tokens)
+        except Exception as e:
+            logger.error(f"后端 {variant} 测试失败: {str(e)}")
+            results[variant] = {"error": str(e)}
+
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="推理后端CPU延迟基准测试")
+    parser.add_argument("--config", type=str, default="config/config.yaml", help="配置文件路径")
+    parser.add_argument("--model", type=str, default="answer_generation",
+                        choices=["intent_recognition", "answer_generation"], help="测试的模型")
+    parser.add_argument("--variants", nargs="+", default=["transformers", "transformers:int8", "llama_cpp"],
+                        help="后端变体，格式 backend[:quantization]")
+    parser.add_argument("--repeats", type=int, default=3, help="重复次数")
+    parser.add_argument("--max_new_tokens", type=int, default=128, help="最大生成token数")
+    parser.add_argument("--output", type=str, default=None, help="结果输出JSON路径")
+
+    args = parser.parse_args()
+
+    results = run_benchmark(args.config, args.model, args.variants, args.repeats, args.max_new_tokens)
+
+    print(f"\n{'后端':<22}{'加载(s)':>10}{'均值(s)':>10}{'p50(s)':>10}{'p95(s)':>10}{'tokens/s':>12}")
+    for variant, stats in results.items():
+        if 'error' in stats:
+            print(f"{variant:<22}失败: {stats['error']}")
+            continue
+        print(f"{variant:<22}{stats['load_seconds']:>10.1f}{stats['latency_mean']:>10.2f}"
+              f"{stats['latency_p50']:>10.2f}{stats['latency_p95']:>10.2f}{stats['tokens_per_sec']:>12.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
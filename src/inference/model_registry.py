@@ -0,0 +1,153 @@
+"""
+模型注册表
+进程内按 (model_path, dtype, device, quantization) 只加载一次权重，
+IntentClassifier、AnswerGenerator、DataAugmentation及多个Orchestrator实例共享同一份模型
+
+多进程部署说明：
+- 开启mmap_safetensors且模型目录含safetensors权重时以内存映射方式读取，只降低加载过程中的内存峰值；
+  加载完成后权重已拷贝到模型参数中，不再由页缓存提供
+- 每个进程各自持有一份权重（fork后的写时复制共享没有保证），
+  多worker部署时由独立的模型服务进程持有权重（见 src/model_server），GPU显存同样无法跨进程共享
+"""
+
+import glob
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _may_have_safetensors(model_path: str) -> bool:
+    """本地模型目录是否含safetensors权重（非本地目录，如Hub模型id，无法判断时返回True）"""
+    if not os.path.isdir(model_path):
+        return True
+    return bool(glob.glob(os.path.join(model_path, "*.safetensors")))
+
+
+class ModelRegistry:
+    """进程级模型注册表（线程安全）"""
+
+    def __init__(self):
+        self._models: Dict[Tuple, Any] = {}
+        self._tokenizers: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+
+    def _get_key_lock(self, key: Tuple) -> threading.Lock:
+        """每个key一把锁：同一模型不会被并发重复加载，不同模型可并行加载"""
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def get_tokenizer(self, tokenizer_path: str):
+        """
+        获取（或加载）分词器
+
+        Args:
+            tokenizer_path: 分词器路径
+
+        Returns:
+            分词器实例
+        """
+        key = ('tokenizer', tokenizer_path)
+        with self._get_key_lock(key):
+            if tokenizer_path not in self._tokenizers:
+                from transformers import AutoTokenizer
+
+                logger.info(f"加载分词器: {tokenizer_path}")
+                self._tokenizers[tokenizer_path] = AutoTokenizer.from_pretrained(
+                    tokenizer_path,
+                    trust_remote_code=True
+                )
+            return self._tokenizers[tokenizer_path]
+
+    def get_model(self,
+                  model_path: str,
+                  dtype: Any,
+                  device: str,
+                  quantization: Optional[str] = None,
+                  mmap_safetensors: bool = True,
+                  loader: Optional[Callable[..., Any]] = None,
+                  **load_kwargs):
+        """
+        获取（或加载）CausalLM模型
+
+        Args:
+            model_path: 模型路径
+            dtype: torch数据类型
+            device: 设备（cuda / cpu）
+            quantization: 量化方式（作为缓存key的一部分）
+            mmap_safetensors: 是否以内存映射方式加载safetensors（模型只有.bin权重时自动忽略）
+            loader: 自定义加载函数 loader(model_path, **kwargs)，默认AutoModelForCausalLM.from_pretrained
+            **load_kwargs: 透传给加载函数的参数
+
+        Returns:
+            模型实例
+        """
+        key = (model_path, str(dtype), device, quantization)
+
+        with self._get_key_lock(key):
+            if key in self._models:
+                logger.info(f"复用已加载模型: {model_path} ({dtype}, {device}, {quantization or '无量化'})")
+                return self._models[key]
+
+            if loader is None:
+                from transformers import AutoModelForCausalLM
+                loader = AutoModelForCausalLM.from_pretrained
+
+            kwargs = {
+                "torch_dtype": dtype,
+                "device_map": "cpu" if device == 'cpu' else "auto",
+                "trust_remote_code": True
+            }
+            use_safetensors = mmap_safetensors and _may_have_safetensors(model_path)
+            if use_safetensors:
+                # safetensors按需映射权重页，避免先完整读入内存再拷贝
+                kwargs["use_safetensors"] = True
+                kwargs["low_cpu_mem_usage"] = True
+            kwargs.update(load_kwargs)
+
+            logger.info(f"加载模型权重: {model_path} ({dtype}, {device}, {quantization or '无量化'})")
+            try:
+                model = loader(model_path, **kwargs)
+            except OSError as e:
+                # 非本地目录无法预先判断权重格式，只有.bin权重时回退为默认加载方式
+                if not use_safetensors or 'use_safetensors' in load_kwargs:
+                    raise
+                logger.warning(f"未找到safetensors权重，按默认格式加载: {str(e)}")
+                kwargs.pop("use_safetensors")
+                model = loader(model_path, **kwargs)
+            model.eval()
+
+            self._models[key] = model
+            return model
+
+    def release(self, model_path: str):
+        """释放指定路径的所有模型实例"""
+        with self._lock:
+            for key in [k for k in self._models if k[0] == model_path]:
+                del self._models[key]
+        logger.info(f"已释放模型: {model_path}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """注册表状态"""
+        with self._lock:
+            return {
+                "models": [
+                    {"model_path": k[0], "dtype": k[1], "device": k[2], "quantization": k[3]}
+                    for k in self._models
+                ],
+                "tokenizers": list(self._tokenizers)
+            }
+
+
+# 进程级单例
+_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    """获取进程级模型注册表"""
+    return _registry
@@ -6,14 +6,14 @@
 import json
 import logging
 from typing import Dict, List, Optional
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
 import yaml
 
 from .intent_config import (
     IntentType, EntityType, Entity, IntentResult,
     validate_intent_result, get_intent_by_name, get_entity_by_name
 )
+from ..inference.backends import create_backend
+from ..monitoring.metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -43,41 +43,52 @@ class IntentClassifier:
 
         self.system_prompt = self.prompt_config['intent_recognition_system']
 
-        # 加载模型和分词器
+        # 加载模型和分词器（由config中的backend决定推理后端）
         self.device = self.model_config['device']
+        self.backend = create_backend(self.model_config)
         self.tokenizer = None
         self.model = None
 
         logger.info(f"初始化意图识别分类器，设备: {self.device}")
 
+    @property
+    def is_loaded(self) -> bool:
+        """模型是否已加载（就绪检查使用）"""
+        return self.backend.is_loaded
+
     def load_model(self):
-        if self.model is not None:
+        if self.backend.is_loaded:
             return
 
-        logger.info(f"正在加载模型: {self.model_config['model_name']}")
+        logger.info(f"正在加载模型: {self.model_config['model_name']} "
+                    f"(后端: {self.model_config.get('backend', 'transformers')})")
 
         try:
-            # 加载分词器
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                self.model_config['model_path'],
-                trust_remote_code=True
-            )
-
-            # 加载模型
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_config['model_path'],
-                device_map="auto",
-                torch_dtype=torch.float16,
-                trust_remote_code=True
-            )
-
-            self.model.eval()
+            self.backend.load()
+            self.model = self.backend.model
+            self.tokenizer = self.backend.tokenizer
             logger.info("模型加载成功")
 
         except Exception as e:
             logger.error(f"模型加载失败: {str(e)}")
             raise
 
+    def warmup(self, sample_query: str = "平台上有哪些五星资产？"):
+        """
+        加载模型并执行一次短生成，完成CUDA初始化和kernel预热
+
+        Args:
+            sample_query: 预热使用的查询
+        """
+        self.load_model()
+        self.backend.generate(
+            self._build_messages(sample_query),
+            max_new_tokens=8,
+            temperature=0.0,
+            top_p=1.0
+        )
+        logger.info("意图识别模型预热完成")
+
     def _build_messages(self, user_query: str) -> List[Dict]:
         """
         构建输入消息
@@ -129,6 +140,7 @@ class IntentClassifier:
                 if start_idx != -1 and end_idx != -1:
                     json_str = output_text[start_idx:end_idx + 1]
                     result = json.loads(json_str)
+                    get_metrics().increment("intent_parse_fallbacks", reason="extracted_json")
                     
                     # 格式转换
                     if "slots" in result and "entities" not in result:
@@ -140,6 +152,7 @@ class IntentClassifier:
 
             # 如果仍然失败，返回平台帮助
             logger.warning(f"无法解析输出，返回平台帮助: {output_text}")
+            get_metrics().increment("intent_parse_fallbacks", reason="unparseable")
             return {"intent": "38", "entities": []}
     
     def _convert_slots_to_entities(self, result: Dict) -> Dict:
@@ -197,46 +210,59 @@ class IntentClassifier:
         # 构建输入
         messages = self._build_messages(user_query)
 
-        # 应用聊天模板
-        text = self.tokenizer.apply_chat_template(
+        # 生成输出（关闭CoT模式）
+        output_text, _ = self.backend.generate(
             messages,
-            tokenize=False,
-            add_generation_prompt=True
+            max_new_tokens=self.model_config['max_length'],
+            temperature=self.model_config['temperature'],
+            top_p=self.model_config['top_p']
         )
 
-        # 编码输入
-        model_inputs = self.tokenizer([text], return_tensors="pt").to(self.device)
+        logger.info(f"模型原始输出: {output_text}")
 
-        # 生成输出（关闭CoT模式）
-        with torch.no_grad():
-            generated_ids = self.model.generate(
-                model_inputs.input_ids,
-                max_new_tokens=self.model_config['max_length'],
-                temperature=self.model_config['temperature'],
-                top_p=self.model_config['top_p'],
-                do_sample=True if self.model_config['temperature'] > 0 else False,
-                pad_token_id=self.tokenizer.eos_token_id
-            )
-
-        # 解码输出
-        generated_ids = [
-            output_ids[len(input_ids):]
-            for input_ids, output_ids in zip(model_inputs.input_ids, generated_ids)
-        ]
+        return self._to_intent_result(output_text)
 
-        output_text = self.tokenizer.batch_decode(
-            generated_ids,
-            skip_special_tokens=True
-        )[0]
+    def batch_predict(self, user_queries: List[str]) -> List[IntentResult]:
+        """
+        批量预测意图（按prompt长度分桶后批量生成）
 
-        logger.info(f"模型原始输出: {output_text}")
+        Args:
+            user_queries: 用户查询列表
 
+        Returns:
+            与输入顺序一致的IntentResult列表
+        """
+        self.load_model()
+
+        batch_config = self.model_config.get('batch_generation', {}) or {}
+        outputs = self.backend.generate_batch(
+            [self._build_messages(query) for query in user_queries],
+            max_new_tokens=self.model_config['max_length'],
+            temperature=self.model_config['temperature'],
+            top_p=self.model_config['top_p'],
+            max_batch_size=batch_config.get('max_batch_size', 8),
+            max_batch_tokens=batch_config.get('max_batch_tokens')
+        )
+
+        return [self._to_intent_result(output_text) for output_text, _ in outputs]
+
+    def _to_intent_result(self, output_text: str) -> IntentResult:
+        """
+        将模型输出解析为IntentResult
+
+        Args:
+            output_text: 模型原始输出
+
+        Returns:
+            IntentResult对象
+        """
         # 解析输出
         result_dict = self._parse_output(output_text)
 
         # 验证格式
         if not validate_intent_result(result_dict):
             logger.warning(f"输出格式验证失败，返回OOD: {result_dict}")
+            get_metrics().increment("intent_parse_fallbacks", reason="invalid_format")
             result_dict = {"intent": "OOD", "entities": []}
 
         # 构建IntentResult对象
@@ -0,0 +1,9 @@
+"""
+模型服务模块
+独立进程托管意图识别与答案生成模型，多个轻量API worker通过HTTP共享同一份模型
+"""
+
+from .client import RemoteIntentClassifier, RemoteAnswerGenerator
+from .batcher import MicroBatcher
+
+__all__ = ['RemoteIntentClassifier', 'RemoteAnswerGenerator', 'MicroBatcher']
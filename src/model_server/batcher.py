@@ -0,0 +1,138 @@
+"""
+请求微批处理模块
+将并发到达的单条请求在短时间窗口内合并为一个批次，交给模型一次处理
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    微批处理器
+
+    单个后台线程串行执行批处理函数，保证同一模型不会被多个请求线程并发调用；
+    模型还有其他调用方（如流式请求）时传入共用的lock，批处理期间持有该锁
+    """
+
+    def __init__(self,
+                 handler: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8,
+                 max_wait: float = 0.01,
+                 name: str = "batcher",
+                 lock: Optional[threading.Lock] = None):
+        """
+        初始化微批处理器
+
+        Args:
+            handler: 批处理函数，输入请求列表，返回等长的结果列表
+            max_batch_size: 单批最大请求数
+            max_wait: 收到首个请求后等待凑批的最长时间（秒）
+            name: 名称（用于线程名和日志）
+            lock: 与其他模型调用方共用的锁（为空时不加锁）
+        """
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self.lock = lock
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._batch_count = 0
+        self._request_count = 0
+
+    def start(self):
+        """启动后台批处理线程"""
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"{self.name}-loop", daemon=True)
+        self._thread.start()
+        logger.info(f"微批处理器 {self.name} 已启动 (max_batch_size={self.max_batch_size}, max_wait={self.max_wait}s)")
+
+    def stop(self):
+        """停止后台批处理线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, item: Any) -> Future:
+        """
+        提交单条请求
+
+        Args:
+            item: 请求数据
+
+        Returns:
+            结果Future
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+
+            # 在等待窗口内凑批
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[tuple]):
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+
+        try:
+            if self.lock is not None:
+                with self.lock:
+                    results = self.handler(items)
+            else:
+                results = self.handler(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"批处理结果数({len(results)})与请求数({len(items)})不一致")
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+        except Exception as e:
+            logger.error(f"微批处理器 {self.name} 批处理失败: {str(e)}", exc_info=True)
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+
+        self._batch_count += 1
+        self._request_count += len(items)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """批处理统计"""
+        return {
+            "batches": self._batch_count,
+            "requests": self._request_count,
+            "avg_batch_size": self._request_count / self._batch_count if self._batch_count else 0.0,
+            "queue_size": self._queue.qsize()
+        }
@@ -0,0 +1,251 @@
+"""
+模型服务客户端
+RemoteIntentClassifier / RemoteAnswerGenerator 分别实现IntentClassifier、AnswerGenerator的调用接口，
+Orchestrator在model_server.enabled时使用它们，本进程不加载模型权重
+"""
+
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+import yaml
+
+from .protocol import intent_result_from_dict
+from ..intent_recognition.intent_config import IntentResult
+from ..inference.model_registry import get_model_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ModelServerClient:
+    """模型服务HTTP客户端"""
+
+    def __init__(self, server_config: Dict[str, Any]):
+        """
+        初始化客户端
+
+        Args:
+            server_config: config.yaml中的model_server配置
+        """
+        self.base_url = server_config.get('url', 'http://127.0.0.1:8100').rstrip('/')
+        self.timeout = server_config.get('timeout', 300)
+        self.ready_timeout = server_config.get('ready_timeout', 1800)
+        self.ready_check_interval = server_config.get('ready_check_interval', 5)
+        self.session = requests.Session()
+
+        self._ready = False
+        self._ready_checked_at = 0.0
+
+    def post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """发送POST请求并返回JSON响应"""
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        if response.status_code != 200:
+            # 代理返回的502/504或Flask错误页不是JSON，只在JSON响应中读取error
+            error = response.status_code
+            try:
+                error = response.json().get('error', error)
+            except ValueError:
+                pass
+            raise RuntimeError(f"模型服务调用失败 {path}: {error}")
+        return response.json()
+
+    def stream(self, path: str, payload: Dict[str, Any]) -> Iterator[str]:
+        """发送流式请求，逐段产出文本"""
+        with self.session.post(f"{self.base_url}{path}", json=payload,
+                               timeout=self.timeout, stream=True) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"模型服务调用失败 {path}: {response.status_code}")
+
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                message = json.loads(line)
+                if 'error' in message:
+                    raise RuntimeError(f"模型服务流式生成失败: {message['error']}")
+                if message.get('done'):
+                    return
+                yield message['text']
+
+    def is_ready(self) -> bool:
+        """
+        模型服务/ready是否返回200
+
+        结果缓存ready_check_interval秒，就绪检查与统计接口频繁调用时不逐次请求模型服务
+        """
+        now = time.time()
+        if now - self._ready_checked_at < self.ready_check_interval:
+            return self._ready
+
+        try:
+            ready = self.session.get(f"{self.base_url}/ready", timeout=5).status_code == 200
+        except requests.RequestException:
+            ready = False
+
+        self._ready, self._ready_checked_at = ready, now
+        return ready
+
+    def wait_until_ready(self):
+        """轮询模型服务/ready，直到就绪或超时"""
+        deadline = time.time() + self.ready_timeout
+
+        while True:
+            try:
+                response = self.session.get(f"{self.base_url}/ready", timeout=5)
+                if response.status_code == 200:
+                    return
+                components = response.json().get('components', {})
+                failed = [name for name, state in components.items() if state.get('status') == 'failed']
+                if failed:
+                    raise RuntimeError(f"模型服务组件加载失败: {failed}")
+            except requests.RequestException as e:
+                logger.debug(f"模型服务暂不可用: {str(e)}")
+
+            if time.time() > deadline:
+                raise TimeoutError(f"等待模型服务就绪超时: {self.base_url}")
+            time.sleep(2)
+
+
+class RemoteIntentClassifier:
+    """远程意图识别（接口同IntentClassifier）"""
+
+    def __init__(self, config_path: str = "config/config.yaml"):
+        """
+        初始化远程意图识别客户端
+
+        Args:
+            config_path: 配置文件路径
+        """
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = yaml.safe_load(f)
+
+        self.model_config = self.config['models']['intent_recognition']
+        self.client = ModelServerClient(self.config.get('model_server', {}) or {})
+
+        logger.info(f"初始化远程意图识别客户端: {self.client.base_url}")
+
+    @property
+    def is_loaded(self) -> bool:
+        """模型服务是否就绪"""
+        return self.client.is_ready()
+
+    def load_model(self):
+        """等待模型服务就绪"""
+        self.client.wait_until_ready()
+
+    def warmup(self, sample_query: str = ""):
+        self.load_model()
+
+    def predict(self, user_query: str) -> IntentResult:
+        """
+        预测用户查询的意图和实体
+
+        Args:
+            user_query: 用户查询
+
+        Returns:
+            IntentResult对象
+        """
+        data = self.client.post('/v1/intent', {"query": user_query})
+        return intent_result_from_dict(data['result'])
+
+    def batch_predict(self, user_queries: List[str]) -> List[IntentResult]:
+        """
+        批量预测意图（并发提交，由模型服务的微批处理器合并）
+        """
+        with ThreadPoolExecutor(max_workers=min(16, max(1, len(user_queries)))) as executor:
+            return list(executor.map(self.predict, user_queries))
+
+
+class RemoteAnswerGenerator:
+    """远程答案生成（接口同AnswerGenerator）"""
+
+    def __init__(self, config_path: str = "config/config.yaml"):
+        """
+        初始化远程答案生成客户端
+
+        Args:
+            config_path: 配置文件路径
+        """
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = yaml.safe_load(f)
+
+        self.model_config = self.config['models']['answer_generation']
+
+        # 加载Prompt配置（编排器从中读取答案模板）
+        with open('config/prompt_config.yaml', 'r', encoding='utf-8') as f:
+            self.prompt_config = yaml.safe_load(f)
+
+        self.client = ModelServerClient(self.config.get('model_server', {}) or {})
+        self.tokenizer = None
+
+        logger.info(f"初始化远程答案生成客户端: {self.client.base_url}")
+
+    @property
+    def is_loaded(self) -> bool:
+        """模型服务是否就绪"""
+        return self.client.is_ready()
+
+    def load_model(self):
+        """等待模型服务就绪"""
+        self.client.wait_until_ready()
+
+    def warmup(self, sample_query: str = ""):
+        self.load_model()
+
+    def count_tokens(self, text: str) -> int:
+        """
+        计算文本token数（本地仅加载分词器，用于上下文预算）
+        """
+        if self.tokenizer is None:
+            self.tokenizer = get_model_registry().get_tokenizer(
+                self.model_config.get('tokenizer_path', self.model_config['model_path'])
+            )
+        return len(self.tokenizer(text, add_special_tokens=False)['input_ids'])
+
+    def generate_answer(self,
+                        user_query: str,
+                        context: str,
+                        intent: str = "",
+                        max_length: Optional[int] = None,
+                        temperature: Optional[float] = None) -> Dict[str, Any]:
+        """生成答案"""
+        data = self.client.post('/v1/answer', {
+            "query": user_query,
+            "context": context,
+            "intent": intent,
+            "max_length": max_length,
+            "temperature": temperature
+        })
+        return data['result']
+
+    def generate_ood_response(self, user_query: str) -> Dict[str, Any]:
+        """生成OOD（域外）问题的回答"""
+        data = self.client.post('/v1/answer', {"query": user_query, "ood": True})
+        return data['result']
+
+    def stream_answer(self,
+                      user_query: str,
+                      context: str,
+                      intent: str = "",
+                      max_length: Optional[int] = None,
+                      temperature: Optional[float] = None) -> Iterator[str]:
+        """流式生成答案"""
+        yield from self.client.stream('/v1/answer/stream', {
+            "query": user_query,
+            "context": context,
+            "intent": intent,
+            "max_length": max_length,
+            "temperature": temperature
+        })
+
+    def stream_ood_response(self, user_query: str) -> Iterator[str]:
+        """流式生成OOD（域外）问题的回答"""
+        yield from self.client.stream('/v1/answer/stream', {"query": user_query, "ood": True})
+
+    def batch_generate(self, queries_with_context: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """批量生成答案"""
+        data = self.client.post('/v1/answer/batch', {"items": queries_with_context})
+        return data['results']
@@ -0,0 +1,34 @@
+"""
+模型服务协议模块
+意图识别结果在模型服务与客户端之间的JSON序列化
+"""
+
+from typing import Any, Dict
+
+from ..intent_recognition.intent_config import (
+    Entity, IntentResult, get_intent_by_name, get_entity_by_name
+)
+
+
+def intent_result_to_dict(intent_result: IntentResult) -> Dict[str, Any]:
+    """IntentResult -> JSON可序列化字典"""
+    return {
+        "intent": intent_result.intent.value,
+        "entities": [
+            {"type": e.type.value, "value": e.value}
+            for e in intent_result.entities
+        ],
+        "raw_output": intent_result.raw_output
+    }
+
+
+def intent_result_from_dict(data: Dict[str, Any]) -> IntentResult:
+    """JSON字典 -> IntentResult"""
+    return IntentResult(
+        intent=get_intent_by_name(data['intent']),
+        entities=[
+            Entity(type=get_entity_by_name(e['type']), value=e['value'])
+            for e in data.get('entities', [])
+        ],
+        raw_output=data.get('raw_output', "")
+    )
@@ -0,0 +1,329 @@
+"""
+模型服务进程
+独立托管意图识别（32B）和答案生成（14B）模型，通过HTTP对外提供推理接口，
+API worker只需运行轻量的编排逻辑，不再各自加载一份GPU权重
+
+用法：
+    python3 -m src.model_server.server --port 8100
+    python3 -m src.model_server.server --stub   # 测试桩模式，不加载模型
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+import yaml
+from flask import Flask, Response, request, jsonify, stream_with_context
+
+from .batcher import MicroBatcher
+from .protocol import intent_result_to_dict
+from .stub import StubIntentClassifier, StubAnswerGenerator
+from ..inference.model_registry import get_model_registry
+
+logger = logging.getLogger(__name__)
+
+
+def _answer_handler(answer_generator):
+    """
+    构建答案生成的批处理函数
+
+    使用默认生成参数的RAG请求合并为一次batch_generate，
+    带参数覆盖的请求和OOD请求逐条处理
+    """
+    def handle(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results: List[Any] = [None] * len(items)
+
+        batchable = [
+            idx for idx, item in enumerate(items)
+            if not item.get('ood') and item.get('max_length') is None and item.get('temperature') is None
+        ]
+        if batchable:
+            batch_results = answer_generator.batch_generate([
+                {
+                    "query": items[idx]['query'],
+                    "context": items[idx].get('context', ""),
+                    "intent": items[idx].get('intent', "")
+                }
+                for idx in batchable
+            ])
+            for idx, result in zip(batchable, batch_results):
+                results[idx] = result
+
+        for idx, item in enumerate(items):
+            if results[idx] is not None:
+                continue
+            if item.get('ood'):
+                results[idx] = answer_generator.generate_ood_response(item['query'])
+            else:
+                results[idx] = answer_generator.generate_answer(
+                    user_query=item['query'],
+                    context=item.get('context', ""),
+                    intent=item.get('intent', ""),
+                    max_length=item.get('max_length'),
+                    temperature=item.get('temperature')
+                )
+
+        return results
+
+    return handle
+
+
+def create_model_server(config_path: str = "config/config.yaml", stub: bool = False) -> Flask:
+    """
+    创建模型服务Flask应用
+
+    Args:
+        config_path: 配置文件路径
+        stub: 是否使用测试桩（返回固定输出，不加载模型）
+
+    Returns:
+        Flask应用实例
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+
+    server_config = config.get('model_server', {}) or {}
+    batching_config = server_config.get('batching', {}) or {}
+
+    if stub:
+        logger.info("模型服务以测试桩模式启动")
+        intent_classifier = StubIntentClassifier(server_config.get('stub'))
+        answer_generator = StubAnswerGenerator(server_config.get('stub'))
+    else:
+        from ..intent_recognition.intent_classifier import IntentClassifier
+        from ..answer_generation.answer_generator import AnswerGenerator
+
+        intent_classifier = IntentClassifier(config_path)
+        answer_generator = AnswerGenerator(config_path)
+
+    # 每个模型一个微批处理器：并发请求在窗口内合并，且模型只被单线程调用
+    # 预加载预热与答案模型的流式接口也会直接调用模型，与微批处理线程共用模型锁串行
+    intent_model_lock = threading.Lock()
+    answer_model_lock = threading.Lock()
+    intent_batcher = MicroBatcher(
+        intent_classifier.batch_predict,
+        max_batch_size=batching_config.get('max_batch_size', 8),
+        max_wait=batching_config.get('max_wait', 0.01),
+        name="intent",
+        lock=intent_model_lock
+    )
+    answer_batcher = MicroBatcher(
+        _answer_handler(answer_generator),
+        max_batch_size=batching_config.get('max_batch_size', 8),
+        max_wait=batching_config.get('max_wait', 0.01),
+        name="answer",
+        lock=answer_model_lock
+    )
+    intent_batcher.start()
+    answer_batcher.start()
+
+    # 后台预加载模型
+    readiness = {
+        "intent_model": {"status": "pending"},
+        "answer_model": {"status": "pending"}
+    }
+
+    def preload():
+        # 预热同样会调用模型，持有对应模型锁，与预加载期间到达的请求串行
+        for name, component, lock in [("intent_model", intent_classifier, intent_model_lock),
+                                      ("answer_model", answer_generator, answer_model_lock)]:
+            readiness[name] = {"status": "loading"}
+            load_start = time.time()
+            try:
+                with lock:
+                    component.warmup()
+                readiness[name] = {"status": "ready", "load_seconds": round(time.time() - load_start, 2)}
+                logger.info(f"模型服务组件 {name} 就绪 (耗时: {time.time() - load_start:.1f}s)")
+            except Exception as e:
+                logger.error(f"模型服务组件 {name} 加载失败: {str(e)}", exc_info=True)
+                readiness[name] = {"status": "failed", "error": str(e)}
+
+    threading.Thread(target=preload, name="model-server-preload", daemon=True).start()
+
+    request_timeout = server_config.get('timeout', 300)
+
+    app = Flask(__name__)
+
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        """存活检查"""
+        return jsonify({"status": "healthy", "service": "Model Server", "stub": stub}), 200
+
+    @app.route('/ready', methods=['GET'])
+    def readiness_check():
+        """就绪检查：全部模型加载完成前返回503"""
+        ready = all(state['status'] == 'ready' for state in readiness.values())
+        return jsonify({"ready": ready, "components": readiness}), 200 if ready else 503
+
+    @app.route('/v1/intent', methods=['POST'])
+    def intent():
+        """
+        意图识别
+
+        请求体: {"query": "用户查询"}
+        响应: {"result": {"intent": "31", "entities": [...], "raw_output": "..."}}
+        """
+        data = request.get_json(silent=True) or {}
+        if not data.get('query'):
+            return jsonify({"error": "缺少必需参数: query"}), 400
+
+        try:
+            result = intent_batcher.submit(data['query']).result(timeout=request_timeout)
+            return jsonify({"result": intent_result_to_dict(result)}), 200
+        except Exception as e:
+            logger.error(f"意图识别失败: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/v1/answer', methods=['POST'])
+    def answer():
+        """
+        答案生成
+
+        请求体: {"query": "...", "context": "...", "intent": "31",
+                 "max_length": 可选, "temperature": 可选, "ood": 是否OOD回复}
+        响应: {"result": generate_answer / generate_ood_response 的返回字典}
+        """
+        data = request.get_json(silent=True) or {}
+        if not data.get('query'):
+            return jsonify({"error": "缺少必需参数: query"}), 400
+
+        try:
+            result = answer_batcher.submit(data).result(timeout=request_timeout)
+            return jsonify({"result": result}), 200
+        except Exception as e:
+            logger.error(f"答案生成失败: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/v1/answer/batch', methods=['POST'])
+    def answer_batch():
+        """
+        批量答案生成
+
+        请求体: {"items": [{"query": "...", "context": "...", "intent": "31"}, ...]}
+        响应: {"results": [...]}（与输入顺序一致）
+        """
+        data = request.get_json(silent=True) or {}
+        items = data.get('items')
+        if not isinstance(items, list):
+            return jsonify({"error": "items必须是列表"}), 400
+
+        try:
+            futures = [answer_batcher.submit(item) for item in items]
+            return jsonify({"results": [f.result(timeout=request_timeout) for f in futures]}), 200
+        except Exception as e:
+            logger.error(f"批量答案生成失败: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/v1/answer/stream', methods=['POST'])
+    def answer_stream():
+        """
+        流式答案生成（逐行JSON: {"text": 片段}，结束行 {"done": true}，失败行 {"error": 信息}）
+
+        流式请求不经过微批处理器：开启连续批处理时由生成引擎负责并发，
+        否则持有answer_model_lock直到生成结束，与微批处理线程串行调用模型
+        """
+        data = request.get_json(silent=True) or {}
+        if not data.get('query'):
+            return jsonify({"error": "缺少必需参数: query"}), 400
+
+        def generate():
+            locked = getattr(answer_generator, 'engine', None) is None
+            if locked and not answer_model_lock.acquire(timeout=request_timeout):
+                yield json.dumps({"error": "等待答案模型超时"}, ensure_ascii=False) + "\n"
+                return
+
+            try:
+                if data.get('ood'):
+                    chunks = answer_generator.stream_ood_response(data['query'])
+                else:
+                    chunks = answer_generator.stream_answer(
+                        user_query=data['query'],
+                        context=data.get('context', ""),
+                        intent=data.get('intent', ""),
+                        max_length=data.get('max_length'),
+                        temperature=data.get('temperature')
+                    )
+                for chunk in chunks:
+                    yield json.dumps({"text": chunk}, ensure_ascii=False) + "\n"
+                yield json.dumps({"done": True}) + "\n"
+            except Exception as e:
+                logger.error(f"流式答案生成失败: {str(e)}")
+                yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+            finally:
+                if locked:
+                    answer_model_lock.release()
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    @app.route('/v1/stats', methods=['GET'])
+    def stats():
+        """模型服务统计"""
+        return jsonify({
+            "stub": stub,
+            "readiness": readiness,
+            "batchers": {
+                "intent": intent_batcher.get_stats(),
+                "answer": answer_batcher.get_stats()
+            },
+            "model_registry": get_model_registry().get_stats()
+        }), 200
+
+    return app
+
+
+def run_model_server(host: str = "0.0.0.0",
+                     port: int = 8100,
+                     config_path: str = "config/config.yaml",
+                     stub: bool = False):
+    """
+    运行模型服务
+
+    Args:
+        host: 主机地址
+        port: 端口号
+        config_path: 配置文件路径
+        stub: 是否使用测试桩
+    """
+    app = create_model_server(config_path, stub=stub)
+
+    logger.info(f"启动模型服务: http://{host}:{port}")
+    logger.info("接口列表:")
+    logger.info("  GET  /health            - 存活检查")
+    logger.info("  GET  /ready             - 就绪检查")
+    logger.info("  POST /v1/intent         - 意图识别")
+    logger.info("  POST /v1/answer         - 答案生成")
+    logger.info("  POST /v1/answer/batch   - 批量答案生成")
+    logger.info("  POST /v1/answer/stream  - 流式答案生成")
+    logger.info("  GET  /v1/stats          - 服务统计")
+
+    # 多线程接收请求，由微批处理器合并后串行调用模型
+    app.run(host=host, port=port, threaded=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="模型服务")
+    parser.add_argument("--config", type=str, default="config/config.yaml", help="配置文件路径")
+    parser.add_argument("--host", type=str, default=None, help="主机地址（默认取model_server.host）")
+    parser.add_argument("--port", type=int, default=None, help="端口号（默认取model_server.port）")
+    parser.add_argument("--stub", action="store_true", help="测试桩模式（返回固定输出，不加载模型）")
+
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        server_config = yaml.safe_load(f).get('model_server', {}) or {}
+
+    run_model_server(
+        host=args.host or server_config.get('host', '0.0.0.0'),
+        port=args.port or server_config.get('port', 8100),
+        config_path=args.config,
+        stub=args.stub
+    )
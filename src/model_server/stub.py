@@ -0,0 +1,98 @@
+"""
+模型服务测试桩
+不加载模型，返回配置中的固定输出，用于无GPU环境下联调API与模型服务
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+from .protocol import intent_result_from_dict
+from ..intent_recognition.intent_config import IntentResult
+
+logger = logging.getLogger(__name__)
+
+
+class StubIntentClassifier:
+    """固定输出的意图识别桩（接口同IntentClassifier）"""
+
+    def __init__(self, stub_config: Optional[Dict[str, Any]] = None):
+        stub_config = stub_config or {}
+        self.canned = {
+            "intent": str(stub_config.get('intent', '38')),
+            "entities": stub_config.get('entities', [])
+        }
+
+    is_loaded = True
+
+    def load_model(self):
+        pass
+
+    def warmup(self, sample_query: str = ""):
+        pass
+
+    def predict(self, user_query: str) -> IntentResult:
+        return intent_result_from_dict({
+            **self.canned,
+            "raw_output": json.dumps(self.canned, ensure_ascii=False)
+        })
+
+    def batch_predict(self, user_queries: List[str]) -> List[IntentResult]:
+        return [self.predict(query) for query in user_queries]
+
+
+class StubAnswerGenerator:
+    """固定输出的答案生成桩（接口同AnswerGenerator）"""
+
+    def __init__(self, stub_config: Optional[Dict[str, Any]] = None):
+        stub_config = stub_config or {}
+        self.answer = stub_config.get('answer', "这是测试桩返回的固定回答。")
+
+    is_loaded = True
+
+    def load_model(self):
+        pass
+
+    def warmup(self, sample_query: str = ""):
+        pass
+
+    def generate_answer(self,
+                        user_query: str,
+                        context: str,
+                        intent: str = "",
+                        max_length: Optional[int] = None,
+                        temperature: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "answer": self.answer,
+            "context_used": context,
+            "has_context": bool(context and context != "知识库中暂无相关信息。"),
+            "query": user_query
+        }
+
+    def generate_ood_response(self, user_query: str) -> Dict[str, Any]:
+        return {
+            "answer": self.answer,
+            "context_used": "",
+            "has_context": False,
+            "query": user_query,
+            "is_ood": True
+        }
+
+    def stream_answer(self,
+                      user_query: str,
+                      context: str,
+                      intent: str = "",
+                      max_length: Optional[int] = None,
+                      temperature: Optional[float] = None) -> Iterator[str]:
+        # 按字符分段推送，模拟流式输出
+        for i in range(0, len(self.answer), 4):
+            yield self.answer[i:i + 4]
+
+    def stream_ood_response(self, user_query: str) -> Iterator[str]:
+        yield from self.stream_answer(user_query, "")
+
+    def batch_generate(self, queries_with_context: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        return [
+            self.generate_answer(item['query'], item['context'], item.get('intent', ''))
+            for item in queries_with_context
+        ]
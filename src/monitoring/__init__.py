@@ -0,0 +1,8 @@
+"""
+监控模块
+分阶段延迟直方图、业务计数器与Prometheus指标导出
+"""
+
+from .metrics import Metrics, get_metrics, percentile_summary
+
+__all__ = ['Metrics', 'get_metrics', 'percentile_summary']
@@ -0,0 +1,278 @@
+"""
+指标采集模块
+进程内记录分阶段/分意图延迟和业务计数器：
+- 始终在内存中保留最近的延迟样本，供 /api/v1/stats 输出 p50/p95/p99
+- 安装prometheus_client且开启monitoring.prometheus_enabled时，同时导出Prometheus指标
+- 多进程部署（如uvicorn多worker）时设置环境变量PROMETHEUS_MULTIPROC_DIR（需在worker启动前设置），
+  各worker的指标写入该目录，导出时汇总全部worker
+
+依赖（可选）: pip install prometheus-client
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+METRIC_NAMESPACE = "knowledge_assistant"
+
+# prometheus_client多进程模式的数据目录环境变量
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# 延迟直方图分桶（秒），覆盖Neo4j毫秒级查询到长答案生成
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+# 生成速度分桶（tokens/s）
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300)
+
+# 计数器定义: 名称 -> (说明, 标签)
+COUNTERS = {
+    "requests": ("处理的查询数", ("intent", "status")),
+    "answers": ("按来源统计的答案数（llm / template / cache）", ("source",)),
+    "cache_hits": ("缓存命中数", ("cache",)),
+    "cache_misses": ("缓存未命中数", ("cache",)),
+    "intent_parse_fallbacks": ("意图输出解析回退次数", ("reason",)),
+    "ood_requests": ("路由到平台帮助/域外回复的请求数", ()),
+    "neo4j_errors": ("Neo4j查询错误数", ()),
+    "graph_results_truncated": ("超过上限被截断的图谱查询数", ("reason",)),
+    "tokens_in": ("模型输入token数", ("model",)),
+    "tokens_out": ("模型输出token数", ("model",))
+}
+
+# 分位数
+PERCENTILES = (50, 95, 99)
+
+
+class Metrics:
+    """进程级指标采集器（线程安全）"""
+
+    def __init__(self, window_size: int = 2048):
+        """
+        初始化指标采集器
+
+        Args:
+            window_size: 每个(阶段, 意图)保留的最近延迟样本数
+        """
+        self.window_size = window_size
+        self._lock = threading.Lock()
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+        self._tokens_per_second: Dict[str, Deque[float]] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+
+        self._prometheus: Optional[Dict[str, Any]] = None
+        self._prometheus_registry = None
+        self._http_server_started = False
+
+    # ========== Prometheus ==========
+
+    def enable_prometheus(self) -> bool:
+        """
+        创建Prometheus指标（prometheus_client未安装时仅保留进程内统计）
+
+        Returns:
+            是否启用成功
+        """
+        if self._prometheus is not None:
+            return True
+
+        try:
+            from prometheus_client import CollectorRegistry, Counter, Histogram
+        except ImportError:
+            logger.warning("未安装prometheus_client，Prometheus指标导出不可用: pip install prometheus-client")
+            return False
+
+        registry = CollectorRegistry()
+        prometheus = {
+            "stage_latency_seconds": Histogram(
+                "stage_latency_seconds", "各处理阶段耗时（秒）", ("stage", "intent"),
+                namespace=METRIC_NAMESPACE, buckets=LATENCY_BUCKETS, registry=registry
+            ),
+            "generation_tokens_per_second": Histogram(
+                "generation_tokens_per_second", "生成速度（tokens/s）", ("model",),
+                namespace=METRIC_NAMESPACE, buckets=TOKENS_PER_SECOND_BUCKETS, registry=registry
+            )
+        }
+        for name, (description, labels) in COUNTERS.items():
+            prometheus[name] = Counter(
+                name, description, labels, namespace=METRIC_NAMESPACE, registry=registry
+            )
+
+        self._prometheus_registry = registry
+        self._prometheus = prometheus
+        logger.info("Prometheus指标已启用")
+        return True
+
+    def _export_registry(self):
+        """导出用的registry：多进程模式下汇总全部进程写入的指标，否则为本进程registry"""
+        if not os.environ.get(MULTIPROC_DIR_ENV):
+            return self._prometheus_registry
+
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+
+    def start_http_server(self, port: int):
+        """在独立端口暴露Prometheus指标（每个进程只启动一次；多进程模式下只有一个进程能占用端口，导出全部进程的汇总）"""
+        if not self.enable_prometheus() or self._http_server_started:
+            return
+
+        from prometheus_client import start_http_server
+
+        try:
+            start_http_server(port, registry=self._export_registry())
+            self._http_server_started = True
+            logger.info(f"Prometheus指标端口: {port}")
+        except OSError as e:
+            # 多worker部署时端口已被其他进程占用
+            logger.warning(f"Prometheus指标端口 {port} 启动失败: {str(e)}")
+
+    def render_prometheus(self) -> Optional[Tuple[bytes, str]]:
+        """
+        生成Prometheus文本格式的指标
+
+        Returns:
+            (指标内容, Content-Type)，未启用时返回None
+        """
+        if self._prometheus is None:
+            return None
+
+        from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+        return generate_latest(self._export_registry()), CONTENT_TYPE_LATEST
+
+    # ========== 采集 ==========
+
+    def observe_stage(self, stage: str, seconds: float, intent: str = ""):
+        """
+        记录阶段耗时
+
+        Args:
+            stage: 阶段（intent_recognition / graph_query / answer_generation / time_to_first_token / total）
+            seconds: 耗时（秒）
+            intent: 意图编码（意图未知时为空）
+        """
+        if seconds is None:
+            return
+
+        with self._lock:
+            for key in ((stage, ""), (stage, intent)) if intent else ((stage, ""),):
+                if key not in self._latencies:
+                    self._latencies[key] = deque(maxlen=self.window_size)
+                self._latencies[key].append(seconds)
+
+        if self._prometheus is not None:
+            self._prometheus["stage_latency_seconds"].labels(stage=stage, intent=intent or "unknown").observe(seconds)
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        """
+        计数器累加
+
+        Args:
+            name: 计数器名称（见COUNTERS）
+            amount: 增量
+            **labels: 标签取值
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+        if self._prometheus is not None:
+            counter = self._prometheus[name]
+            (counter.labels(**labels) if labels else counter).inc(amount)
+
+    def observe_generation(self,
+                           model: str,
+                           prompt_tokens: int,
+                           completion_tokens: int,
+                           seconds: float):
+        """
+        记录一次生成的token用量与速度
+
+        Args:
+            model: 模型名称
+            prompt_tokens: 输入token数
+            completion_tokens: 输出token数
+            seconds: 生成耗时（秒）
+        """
+        self.increment("tokens_in", prompt_tokens, model=model)
+        self.increment("tokens_out", completion_tokens, model=model)
+
+        if seconds <= 0 or completion_tokens <= 0:
+            return
+
+        tokens_per_second = completion_tokens / seconds
+        with self._lock:
+            if model not in self._tokens_per_second:
+                self._tokens_per_second[model] = deque(maxlen=self.window_size)
+            self._tokens_per_second[model].append(tokens_per_second)
+
+        if self._prometheus is not None:
+            self._prometheus["generation_tokens_per_second"].labels(model=model).observe(tokens_per_second)
+
+    # ========== 汇总 ==========
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        进程内指标汇总（最近window_size个样本的分位数）
+
+        Returns:
+            {"latency": {阶段: 分位数}, "latency_by_intent": {意图: {阶段: 分位数}},
+             "tokens_per_second": {模型: 分位数}, "counters": {名称: 值}}
+        """
+        with self._lock:
+            latencies = {key: list(values) for key, values in self._latencies.items()}
+            tokens_per_second = {model: list(values) for model, values in self._tokens_per_second.items()}
+            counters = dict(self._counters)
+
+        latency = {}
+        latency_by_intent: Dict[str, Dict[str, Any]] = {}
+        for (stage, intent), values in latencies.items():
+            if intent:
+                latency_by_intent.setdefault(intent, {})[stage] = self._percentiles(values)
+            else:
+                latency[stage] = self._percentiles(values)
+
+        counter_summary = {}
+        for (name, labels), value in counters.items():
+            label_text = ",".join(f"{k}={v}" for k, v in labels)
+            counter_summary[f"{name}{{{label_text}}}" if label_text else name] = value
+
+        return {
+            "latency": latency,
+            "latency_by_intent": latency_by_intent,
+            "tokens_per_second": {
+                model: self._percentiles(values) for model, values in tokens_per_second.items()
+            },
+            "counters": counter_summary
+        }
+
+    @staticmethod
+    def _percentiles(values) -> Dict[str, float]:
+        return percentile_summary(values)
+
+
+def percentile_summary(values) -> Dict[str, float]:
+    """计算样本数、均值与分位数（最近邻法）"""
+    ordered = sorted(values)
+    summary = {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else 0.0
+    }
+    for p in PERCENTILES:
+        idx = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        summary[f"p{p}"] = ordered[idx] if ordered else 0.0
+    return summary
+
+
+# 进程级单例
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """获取进程级指标采集器"""
+    return _metrics
@@ -4,6 +4,7 @@
 """
 
 from .orchestrator import Orchestrator
+from .async_orchestrator import AsyncOrchestrator
 
-__all__ = ['Orchestrator']
+__all__ = ['Orchestrator', 'AsyncOrchestrator']
 
@@ -0,0 +1,335 @@
+"""
+异步编排服务
+基于asyncio的分阶段流水线：意图识别、图谱检索、答案生成各自拥有有界队列和独立的并发度，
+按各阶段的资源（GPU槽位 / Neo4j连接池）分别限流，慢查询只占用本阶段的容量
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .orchestrator import Orchestrator
+from ..intent_recognition.intent_config import IntentType
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimeoutError(TimeoutError):
+    """请求在某阶段排队或执行超过截止时间"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"阶段 {stage} 超过请求截止时间")
+        self.stage = stage
+
+
+class PipelineStage:
+    """
+    流水线阶段
+
+    有界队列提供背压：队列满时提交方等待（最长到请求截止时间）；
+    concurrency个worker从队列取任务，在本阶段专用线程池中执行阻塞调用
+    """
+
+    def __init__(self, name: str, concurrency: int = 1, queue_size: int = 64):
+        """
+        初始化流水线阶段
+
+        Args:
+            name: 阶段名称
+            concurrency: 并发执行数（worker数）
+            queue_size: 等待队列容量
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"stage-{name}")
+
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._timeouts = 0
+
+    async def start(self):
+        """在当前事件循环中启动worker"""
+        if self._workers:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"stage-{self.name}-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        """停止worker并关闭线程池"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._executor.shutdown(wait=False)
+
+    async def run(self, deadline: float, func: Callable, *args, **kwargs) -> Any:
+        """
+        提交任务并等待结果
+
+        Args:
+            deadline: 请求截止时间（事件循环时钟）
+            func: 阻塞调用
+            *args, **kwargs: 调用参数
+
+        Returns:
+            调用结果
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        try:
+            await asyncio.wait_for(
+                self._queue.put((func, args, kwargs, future, deadline)),
+                timeout=max(0.0, deadline - loop.time())
+            )
+            return await asyncio.wait_for(asyncio.shield(future), timeout=max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            # Python 3.11起asyncio.TimeoutError即内置TimeoutError：阶段函数自身抛出的超时
+            # （如生成请求等待超时、模型服务调用超时）原样抛出，只有截止时间到达才转换为阶段超时
+            if future.done() and not future.cancelled() and future.exception() is not None:
+                raise
+            self._timeouts += 1
+            future.cancel()
+            raise StageTimeoutError(self.name)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            func, args, kwargs, future, deadline = await self._queue.get()
+            try:
+                # 排队期间已超时或被取消的任务不再占用资源
+                if future.done() or loop.time() >= deadline:
+                    continue
+
+                self._running += 1
+                try:
+                    result = await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+                    if not future.done():
+                        future.set_result(result)
+                    self._completed += 1
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                    self._failed += 1
+                finally:
+                    self._running -= 1
+            finally:
+                self._queue.task_done()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """阶段运行状态"""
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+            "timeouts": self._timeouts
+        }
+
+
+class AsyncOrchestrator:
+    """
+    异步编排服务
+
+    复用同步Orchestrator的各模块与上下文/模板/指标逻辑，只替换调度方式：
+    每个请求依次经过 intent -> graph -> generation 三个阶段，
+    整个请求共享一个截止时间（api.timeout）
+    """
+
+    def __init__(self, orchestrator: Optional[Orchestrator] = None, config_path: str = "config/config.yaml"):
+        """
+        初始化异步编排器
+
+        Args:
+            orchestrator: 已创建的同步编排器（为空时按config_path创建）
+            config_path: 配置文件路径
+        """
+        self.orchestrator = orchestrator or Orchestrator(config_path)
+
+        api_config = self.orchestrator.intent_classifier.config.get('api', {}) or {}
+        pipeline_config = api_config.get('pipeline', {}) or {}
+        self.timeout = api_config.get('timeout', 120)
+
+        def stage(name: str, default_concurrency: int) -> PipelineStage:
+            stage_config = pipeline_config.get(name, {}) or {}
+            return PipelineStage(
+                name,
+                concurrency=stage_config.get('concurrency', default_concurrency),
+                queue_size=stage_config.get('queue_size', 64)
+            )
+
+        self.stages = {
+            "intent": stage("intent", 1),
+            "graph": stage("graph", 8),
+            "generation": stage("generation", 1)
+        }
+
+    async def start(self):
+        """启动各阶段worker（需在事件循环内调用）"""
+        for stage in self.stages.values():
+            await stage.start()
+        logger.info("异步编排流水线已启动: " + ", ".join(
+            f"{name}(并发{stage.concurrency})" for name, stage in self.stages.items()
+        ))
+
+    async def stop(self):
+        """停止各阶段worker"""
+        for stage in self.stages.values():
+            await stage.stop()
+
+    async def process_query(self, user_query: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        处理用户查询（响应结构与Orchestrator.process_query一致）
+
+        Args:
+            user_query: 用户查询
+            timeout: 请求超时（秒），默认取api.timeout
+
+        Returns:
+            包含答案和元信息的字典
+        """
+        orchestrator = self.orchestrator
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+
+        start_time = time.time()
+        request_id = orchestrator._next_request_id()
+        logger.info(f"异步处理查询 #{request_id}: {user_query}")
+
+        # 预取启动、模板渲染与缓存读写可能访问Neo4j（图谱版本检查、快照求值），放到线程池中执行，不阻塞事件循环
+        def offload(func: Callable, *args, **kwargs):
+            return loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+        prefetch = await offload(orchestrator._start_prefetch, user_query)
+
+        try:
+            # ========== 步骤1: 意图识别 ==========
+            intent_start = time.time()
+            intent_result, semantic_entry = await self.stages["intent"].run(
+                deadline, orchestrator._recognize_intent, user_query
+            )
+            intent_time = time.time() - intent_start
+
+            context = ""
+            graph_results = []
+            context_stats = {}
+            graph_time = 0
+
+            if intent_result.intent == IntentType.PLATFORM_HELP:
+                # ========== 平台帮助: 直接生成 ==========
+                generation_start = time.time()
+                answer_result = await self.stages["generation"].run(
+                    deadline, orchestrator.answer_generator.generate_ood_response, user_query
+                )
+                generation_time = time.time() - generation_start
+
+            else:
+                # ========== 步骤3: GraphRAG检索 ==========
+                graph_results, context, context_stats, graph_time = await self.stages["graph"].run(
+                    deadline, orchestrator._retrieve_context, intent_result, user_query, prefetch
+                )
+
+                # ========== 步骤4: 答案生成（模板或缓存命中时不占用生成阶段） ==========
+                generation_start = time.time()
+                answer_result = await offload(
+                    orchestrator._render_template_answer, intent_result, graph_results, context
+                )
+                if answer_result is None:
+                    cache_key = orchestrator._answer_cache_key(intent_result, context, user_query)
+                    answer_result = await offload(orchestrator._get_cached_answer, cache_key, context, semantic_entry)
+                    if answer_result is None:
+                        answer_result = await self.stages["generation"].run(
+                            deadline,
+                            orchestrator.answer_generator.generate_answer,
+                            user_query=user_query,
+                            context=context,
+                            intent=intent_result.intent.value
+                        )
+                        await offload(
+                            orchestrator._cache_answer, cache_key, answer_result, context, semantic_entry, context_stats
+                        )
+                generation_time = time.time() - generation_start
+
+            response = orchestrator._build_response(
+                user_query, intent_result, answer_result,
+                context=context,
+                context_stats=context_stats,
+                graph_results=graph_results,
+                timing={
+                    "intent_recognition": intent_time,
+                    "graph_query": graph_time,
+                    "answer_generation": generation_time,
+                    "total": time.time() - start_time
+                },
+                request_id=request_id
+            )
+
+        except StageTimeoutError as e:
+            logger.warning(f"查询 #{request_id} 超时: {str(e)}")
+            response = orchestrator._build_error_response(user_query, str(e), start_time, request_id)
+            response["timeout_stage"] = e.stage
+
+        except Exception as e:
+            logger.error(f"异步查询处理失败: {str(e)}", exc_info=True)
+            response = orchestrator._build_error_response(user_query, str(e), start_time, request_id)
+
+        finally:
+            if prefetch is not None:
+                prefetch.cancel()
+
+        orchestrator._record_metrics(response)
+        return response
+
+    async def process_batch(self, user_queries: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        批量处理用户查询（响应结构与Orchestrator.process_batch一致）
+
+        整批在线程池中执行，其中的意图识别、图谱检索与答案生成调用提交到对应阶段，
+        与单条请求共用各阶段的执行器与并发上限（不会并发调用同一模型），并受同一截止时间约束
+
+        Args:
+            user_queries: 用户查询列表
+            timeout: 整批超时（秒），默认取api.timeout
+
+        Returns:
+            与输入顺序一致的响应列表
+
+        Raises:
+            asyncio.TimeoutError: 整批超过截止时间
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+
+        def submit_stage(stage: str, func: Callable, *args, **kwargs) -> Future:
+            return asyncio.run_coroutine_threadsafe(
+                self.stages[stage].run(deadline, func, *args, **kwargs), loop
+            )
+
+        # 超时后线程中剩余的阶段调用会因截止时间已过立即失败，不再占用模型与Neo4j连接
+        return await asyncio.wait_for(
+            loop.run_in_executor(
+                None, functools.partial(self.orchestrator.process_batch, user_queries, submit_stage=submit_stage)
+            ),
+            timeout=max(0.0, deadline - loop.time())
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """服务统计（含各阶段队列状态）"""
+        stats = self.orchestrator.get_stats()
+        stats["pipeline"] = {name: stage.get_stats() for name, stage in self.stages.items()}
+        return stats
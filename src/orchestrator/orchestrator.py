@@ -5,14 +5,28 @@
 """
 
 import logging
+import threading
 import time
-from typing import Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
+import yaml
+
 from ..intent_recognition.intent_classifier import IntentClassifier
 from ..intent_recognition.intent_config import IntentType
-from ..graph_rag.graph_query import GraphQuery
+from ..graph_rag.graph_query import GRAPH_TRUNCATION_NOTE, GraphQuery
+from ..graph_rag.prefetch import GraphPrefetcher
+from ..graph_rag.hybrid_retriever import HybridRetriever
 from ..answer_generation.answer_generator import AnswerGenerator
+from ..answer_generation.context_budget import ContextBudget
+from ..answer_generation.answer_templates import TemplateAnswerer
+from ..answer_generation.answer_cache import AnswerCache
+from ..vector_search.embedder import Embedder
+from ..vector_search.semantic_cache import SemanticQueryCache
+from ..inference.model_registry import get_model_registry
+from ..model_server.client import RemoteIntentClassifier, RemoteAnswerGenerator
+from ..monitoring.metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -35,14 +49,96 @@ class Orchestrator:
         
         # 这里后续优化引入工厂模式，这里先简单实现
 
-        # 初始化各个模块
-        self.intent_classifier = IntentClassifier(config_path)
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        model_server_config = config.get('model_server', {}) or {}
+
+        # 指标采集（进程内分位数统计始终开启，Prometheus导出按配置开启）
+        self.metrics = get_metrics()
+        monitoring_config = config.get('monitoring', {}) or {}
+        if monitoring_config.get('enabled', False) and monitoring_config.get('prometheus_enabled', False):
+            self.metrics.enable_prometheus()
+
+        # 初始化各个模块（开启独立模型服务时，本进程不加载模型权重）
+        if model_server_config.get('enabled', False):
+            logger.info(f"使用独立模型服务: {model_server_config.get('url')}")
+            self.intent_classifier = RemoteIntentClassifier(config_path)
+            self.answer_generator = RemoteAnswerGenerator(config_path)
+        else:
+            self.intent_classifier = IntentClassifier(config_path)
+            self.answer_generator = AnswerGenerator(config_path)
         self.graph_query = GraphQuery(config_path)
-        self.answer_generator = AnswerGenerator(config_path)
+
+        # 图谱预取：意图识别期间按实体词典匹配结果提前执行最可能的Cypher
+        prefetch_config = self.graph_query.graph_config.get('prefetch', {}) or {}
+        self.prefetcher = None
+        if prefetch_config.get('enabled', False):
+            self.prefetcher = GraphPrefetcher(self.graph_query, prefetch_config)
+
+        # 上下文token预算（使用答案模型分词器度量）
+        budget_config = self.answer_generator.model_config.get('context_budget', {}) or {}
+        self.context_budget = None
+        if budget_config.get('enabled', False):
+            self.context_budget = ContextBudget(
+                token_counter=self.answer_generator.count_tokens,
+                max_context_tokens=budget_config.get('max_context_tokens', 1536)
+            )
+
+        # 结构化意图的模板答案（命中时跳过LLM）
+        self.template_answerer = TemplateAnswerer(
+            self.answer_generator.prompt_config.get('answer_templates', {})
+        )
+
+        # 答案缓存（意图、槽位、上下文与生成参数一致时跳过LLM）
+        answer_cache_config = (config.get('cache', {}) or {}).get('answer', {}) or {}
+        self.answer_cache = None
+        self.answer_cache_key_on_query = answer_cache_config.get('key_on_query', False)
+        if answer_cache_config.get('enabled', False):
+            self.answer_cache = AnswerCache(
+                max_entries=answer_cache_config.get('max_entries', 4096),
+                ttl=answer_cache_config.get('ttl', 3600)
+            )
+
+        # 向量模型（语义查询缓存与混合检索共用）
+        vector_config = config.get('vector_search', {}) or {}
+        query_cache_config = vector_config.get('query_cache', {}) or {}
+        self.embedder = None
+        if vector_config.get('enabled', False) or query_cache_config.get('enabled', False):
+            self.embedder = Embedder(vector_config)
+
+        # 语义查询缓存（相似问法复用意图识别结果与答案）
+        self.semantic_cache = None
+        if query_cache_config.get('enabled', False):
+            # 相似命中的槽位校验使用图谱预取的实体词典
+            self.semantic_cache = SemanticQueryCache(
+                self.embedder,
+                query_cache_config,
+                index_type=query_cache_config.get('index_type', 'HNSW'),
+                entity_lookup=self.prefetcher.lookup if self.prefetcher is not None else None
+            )
+            if self.prefetcher is None:
+                logger.warning("未开启图谱预取（实体词典不可用），语义查询缓存只复用文本完全相同的查询")
+
+        # 混合检索（Intent 36融合向量检索，其余意图在图谱无结果时向量兜底）
+        self.hybrid_retriever = None
+        if vector_config.get('enabled', False):
+            self.hybrid_retriever = HybridRetriever(self.graph_query, self.embedder, vector_config)
+
+        # 批量查询时图谱检索的并发数（与异步流水线graph阶段一致，不超过Neo4j连接池）
+        pipeline_config = (config.get('api', {}) or {}).get('pipeline', {}) or {}
+        self.batch_graph_workers = (pipeline_config.get('graph', {}) or {}).get('concurrency', 8)
+
+        # 模型预加载进度（就绪检查时与模型实际加载状态合并）
+        self._readiness = {
+            "intent_model": {"status": "pending"},
+            "answer_model": {"status": "pending"}
+        }
+        self._preload_thread = None
 
         # 统计信息
         self.request_count = 0
         self.start_time = datetime.now()
+        self._stats_lock = threading.Lock()
 
         logger.info("编排服务初始化完成")
 
@@ -63,18 +159,20 @@ class Orchestrator:
             包含答案和元信息的字典
         """
         start_time = time.time()
-        self.request_count += 1
+        request_id = self._next_request_id()
 
         logger.info(f"\n{'='*60}")
-        logger.info(f"处理查询 #{self.request_count}: {user_query}")
+        logger.info(f"处理查询 #{request_id}: {user_query}")
         logger.info(f"{'='*60}")
 
+        prefetch = self._start_prefetch(user_query)
+
         try:
             # ========== 步骤1: 意图识别 ==========
             logger.info("[步骤1] 意图识别中...")
             intent_start = time.time()
             
-            intent_result = self.intent_classifier.predict(user_query)
+            intent_result, semantic_entry = self._recognize_intent(user_query)
             
             intent_time = time.time() - intent_start
             logger.info(f"[步骤1] 意图识别完成 (耗时: {intent_time:.2f}s)")
@@ -88,6 +186,8 @@ class Orchestrator:
 
             context = ""
             graph_results = []
+            context_stats = {}
+            graph_time = 0
 
             # 判断是否为平台帮助（Intent 38）
             if intent_result.intent == IntentType.PLATFORM_HELP:
@@ -99,126 +199,851 @@ class Orchestrator:
                 answer_result = self.answer_generator.generate_ood_response(user_query)
                 generation_time = time.time() - generation_start
 
-                total_time = time.time() - start_time
-
-                return {
-                    "query": user_query,
-                    "answer": answer_result['answer'],
-                    "intent": intent_result.intent.value,
-                    "entities": [
-                        {"type": e.type.value, "value": e.value}
-                        for e in intent_result.entities
-                    ],
-                    "context": "",
-                    "graph_results": [],
-                    "has_context": False,
-                    "is_platform_help": True,
-                    "timing": {
-                        "intent_recognition": intent_time,
-                        "graph_query": 0,
-                        "answer_generation": generation_time,
-                        "total": total_time
-                    },
-                    "metadata": {
-                        "request_id": self.request_count,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                }
-
             else:
                 # 其他7个意图都需要GraphRAG查询
                 logger.info(f"  - 路由: {intent_result.intent.value} -> GraphRAG模块")
 
                 # ========== 步骤3: GraphRAG检索 ==========
-                logger.info("[步骤3] GraphRAG检索中...")
-                graph_start = time.time()
-
-                try:
-                    # 生成并执行Cypher查询
-                    graph_results = self.graph_query.query(intent_result)
-                    
-                    # 格式化为上下文
-                    context = self.graph_query.format_context(
-                        graph_results, 
-                        intent_result.intent
-                    )
-                    
-                    graph_time = time.time() - graph_start
-                    logger.info(f"[步骤3] GraphRAG检索完成 (耗时: {graph_time:.2f}s)")
-                    logger.info(f"  - 检索结果数: {len(graph_results)}")
-                    logger.info(f"  - 上下文长度: {len(context)} 字符")
-
-                except Exception as e:
-                    logger.error(f"GraphRAG检索失败: {str(e)}")
-                    graph_time = time.time() - graph_start
-                    context = "知识库中暂无相关信息。"
+                graph_results, context, context_stats, graph_time = self._retrieve_context(
+                    intent_result, user_query, prefetch
+                )
 
                 # ========== 步骤4: 答案生成 ==========
                 logger.info("[步骤4] 答案生成中...")
                 generation_start = time.time()
 
-                answer_result = self.answer_generator.generate_answer(
-                    user_query=user_query,
-                    context=context,
-                    intent=intent_result.intent.value
-                )
+                answer_result = self._render_template_answer(intent_result, graph_results, context)
+                if answer_result is None:
+                    cache_key = self._answer_cache_key(intent_result, context, user_query)
+                    answer_result = self._get_cached_answer(cache_key, context, semantic_entry)
+                    if answer_result is None:
+                        answer_result = self.answer_generator.generate_answer(
+                            user_query=user_query,
+                            context=context,
+                            intent=intent_result.intent.value
+                        )
+                        self._cache_answer(cache_key, answer_result, context, semantic_entry, context_stats)
 
                 generation_time = time.time() - generation_start
                 logger.info(f"[步骤4] 答案生成完成 (耗时: {generation_time:.2f}s)")
 
-                total_time = time.time() - start_time
-                logger.info(f"\n总耗时: {total_time:.2f}s")
+            total_time = time.time() - start_time
+            logger.info(f"\n总耗时: {total_time:.2f}s")
 
-                # 构建完整响应
-                response = {
-                    "query": user_query,
-                    "answer": answer_result['answer'],
-                    "intent": intent_result.intent.value,
-                    "intent_name": self._get_intent_name(intent_result.intent),
-                    "entities": [
-                        {"type": e.type.value, "value": e.value}
-                        for e in intent_result.entities
-                    ],
-                    "context": context,
-                    "graph_results": graph_results,
-                    "has_context": answer_result['has_context'],
-                    "is_platform_help": False,
-                    "timing": {
-                        "intent_recognition": intent_time,
-                        "graph_query": graph_time,
-                        "answer_generation": generation_time,
-                        "total": total_time
-                    },
-                    "metadata": {
-                        "request_id": self.request_count,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                }
+            # 构建完整响应
+            response = self._build_response(
+                user_query, intent_result, answer_result,
+                context=context,
+                context_stats=context_stats,
+                graph_results=graph_results,
+                timing={
+                    "intent_recognition": intent_time,
+                    "graph_query": graph_time,
+                    "answer_generation": generation_time,
+                    "total": total_time
+                },
+                request_id=request_id
+            )
+            self._record_metrics(response)
 
-                return response
+            return response
 
         except Exception as e:
             logger.error(f"查询处理失败: {str(e)}", exc_info=True)
             
             # 返回错误响应
+            response = self._build_error_response(user_query, str(e), start_time, request_id)
+            self._record_metrics(response)
+            return response
+
+        finally:
+            # 未被使用的预取（平台帮助、意图不匹配、异常）不再执行
+            if prefetch is not None:
+                prefetch.cancel()
+
+    def process_batch(self,
+                      user_queries: List[str],
+                      submit_stage: Optional[Callable[..., Future]] = None) -> List[Dict[str, Any]]:
+        """
+        批量处理用户查询
+
+        归一化后相同的查询只处理一次；意图识别合并为一次batch_predict，
+        图谱检索在线程池中并发执行，需要LLM的答案合并为一次batch_generate。
+        单条查询失败只影响该条结果，不影响整批
+
+        Args:
+            user_queries: 用户查询列表
+            submit_stage: 阶段提交函数 submit_stage(阶段名, func, *args, **kwargs) -> Future，
+                阶段名为intent / graph / generation；为空时模型直接调用、图谱检索在本地线程池并发
+                （AsyncOrchestrator借此让批量请求经过各阶段的执行器、并发上限与截止时间）
+
+        Returns:
+            与输入顺序一致的响应列表（单条结构同process_query）
+        """
+        if not user_queries:
+            return []
+
+        def call(stage: str, func: Callable[..., Any], *args, **kwargs):
+            if submit_stage is None:
+                return func(*args, **kwargs)
+            return submit_stage(stage, func, *args, **kwargs).result()
+
+        batch_start = time.time()
+        normalized = [" ".join(query.split()) for query in user_queries]
+        unique_queries = list(dict.fromkeys(normalized))
+        logger.info(f"批量处理 {len(user_queries)} 条查询（去重后 {len(unique_queries)} 条）")
+
+        request_ids = [self._next_request_id() for _ in unique_queries]
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(unique_queries)
+
+        def fail(idx: int, error: str):
+            logger.error(f"批量查询 #{request_ids[idx]} 处理失败: {error}")
+            responses[idx] = self._build_error_response(unique_queries[idx], error, batch_start, request_ids[idx])
+
+        # ========== 步骤1: 批量意图识别（语义缓存未命中的查询合并推理，整批失败时逐条重试） ==========
+        intent_start = time.time()
+        intent_results: List[Any] = [None] * len(unique_queries)
+        semantic_entries: List[Any] = [None] * len(unique_queries)
+        query_embeddings: List[Any] = [None] * len(unique_queries)
+        for idx, query in enumerate(unique_queries):
+            semantic_entries[idx], query_embeddings[idx] = self._semantic_lookup(query)
+            if semantic_entries[idx] is not None:
+                intent_results[idx] = semantic_entries[idx].intent_result
+
+        to_predict = [idx for idx in range(len(unique_queries)) if intent_results[idx] is None]
+        if to_predict:
+            try:
+                predicted = call("intent", self.intent_classifier.batch_predict,
+                                 [unique_queries[idx] for idx in to_predict])
+                for idx, intent_result in zip(to_predict, predicted):
+                    intent_results[idx] = intent_result
+            except Exception as e:
+                logger.warning(f"批量意图识别失败，改为逐条识别: {str(e)}")
+                for idx in to_predict:
+                    try:
+                        intent_results[idx] = call("intent", self.intent_classifier.predict, unique_queries[idx])
+                    except Exception as item_error:
+                        fail(idx, str(item_error))
+
+            for idx in to_predict:
+                if intent_results[idx] is not None:
+                    semantic_entries[idx] = self._semantic_store(
+                        unique_queries[idx], intent_results[idx], query_embeddings[idx]
+                    )
+        intent_time = time.time() - intent_start
+
+        pending = [idx for idx in range(len(unique_queries)) if responses[idx] is None]
+        help_items = [idx for idx in pending if intent_results[idx].intent == IntentType.PLATFORM_HELP]
+        knowledge_items = [idx for idx in pending if intent_results[idx].intent != IntentType.PLATFORM_HELP]
+
+        # ========== 步骤3: 并发GraphRAG检索 ==========
+        def collect(futures: Dict[int, Future]):
+            for idx, future in futures.items():
+                try:
+                    retrieved[idx] = future.result()
+                except Exception as e:
+                    fail(idx, str(e))
+
+        retrieved = {}
+        if knowledge_items and submit_stage is not None:
+            # 经graph阶段执行，并发受api.pipeline.graph.concurrency限制
+            collect({
+                idx: submit_stage("graph", self._retrieve_context, intent_results[idx], unique_queries[idx])
+                for idx in knowledge_items
+            })
+        elif knowledge_items:
+            with ThreadPoolExecutor(max_workers=min(self.batch_graph_workers, len(knowledge_items)),
+                                    thread_name_prefix="batch-graph") as executor:
+                collect({
+                    idx: executor.submit(self._retrieve_context, intent_results[idx], unique_queries[idx])
+                    for idx in knowledge_items
+                })
+
+        # ========== 步骤4: 答案生成（模板 -> 批量LLM -> 平台帮助） ==========
+        generation_start = time.time()
+        answers = {}
+        cache_keys = {}
+        llm_items = []
+        for idx in knowledge_items:
+            if idx not in retrieved:
+                continue
+            graph_results, context, _, _ = retrieved[idx]
+            answer_result = self._render_template_answer(intent_results[idx], graph_results, context)
+            if answer_result is None:
+                cache_keys[idx] = self._answer_cache_key(intent_results[idx], context, unique_queries[idx])
+                answer_result = self._get_cached_answer(cache_keys[idx], context, semantic_entries[idx])
+            if answer_result is None:
+                llm_items.append(idx)
+            else:
+                answers[idx] = answer_result
+
+        if llm_items:
+            try:
+                batch_answers = call("generation", self.answer_generator.batch_generate, [
+                    {
+                        "query": unique_queries[idx],
+                        "context": retrieved[idx][1],
+                        "intent": intent_results[idx].intent.value
+                    }
+                    for idx in llm_items
+                ])
+                answers.update(zip(llm_items, batch_answers))
+            except Exception as e:
+                logger.warning(f"批量答案生成失败，改为逐条生成: {str(e)}")
+                for idx in llm_items:
+                    try:
+                        answers[idx] = call(
+                            "generation",
+                            self.answer_generator.generate_answer,
+                            user_query=unique_queries[idx],
+                            context=retrieved[idx][1],
+                            intent=intent_results[idx].intent.value
+                        )
+                    except Exception as item_error:
+                        fail(idx, str(item_error))
+
+            for idx in llm_items:
+                if idx in answers:
+                    self._cache_answer(cache_keys[idx], answers[idx], retrieved[idx][1],
+                                       semantic_entries[idx], retrieved[idx][2])
+
+        for idx in help_items:
+            try:
+                answers[idx] = call("generation", self.answer_generator.generate_ood_response, unique_queries[idx])
+            except Exception as e:
+                fail(idx, str(e))
+
+        generation_time = time.time() - generation_start
+
+        # 意图识别与答案生成为整批共享的耗时，图谱检索为单条耗时
+        for idx, answer_result in answers.items():
+            graph_results, context, context_stats, graph_time = retrieved.get(idx, ([], "", {}, 0))
+            response = self._build_response(
+                unique_queries[idx], intent_results[idx], answer_result,
+                context=context,
+                context_stats=context_stats,
+                graph_results=graph_results,
+                timing={
+                    "intent_recognition": intent_time,
+                    "graph_query": graph_time,
+                    "answer_generation": generation_time,
+                    "total": time.time() - batch_start
+                },
+                request_id=request_ids[idx]
+            )
+            response["metadata"]["batch_size"] = len(unique_queries)
+            responses[idx] = response
+
+        for response in responses:
+            self._record_metrics(response)
+
+        logger.info(f"批量处理完成 (耗时: {time.time() - batch_start:.2f}s)")
+
+        # 按原始顺序展开，重复查询复用同一结果
+        position = {query: idx for idx, query in enumerate(unique_queries)}
+        results = []
+        emitted = set()
+        for query in normalized:
+            idx = position[query]
+            response = responses[idx]
+            if idx in emitted:
+                response = {**response, "metadata": {**response["metadata"], "deduplicated": True}}
+            emitted.add(idx)
+            results.append(response)
+
+        return results
+
+    def _next_request_id(self) -> int:
+        """分配请求编号（多线程/协程并发处理请求时保证计数准确）"""
+        with self._stats_lock:
+            self.request_count += 1
+            return self.request_count
+
+    def _build_response(self,
+                        user_query: str,
+                        intent_result,
+                        answer_result: Dict[str, Any],
+                        context: str,
+                        context_stats: Dict[str, int],
+                        graph_results: List[Dict[str, Any]],
+                        timing: Dict[str, float],
+                        request_id: int) -> Dict[str, Any]:
+        """
+        构建查询响应
+
+        Returns:
+            平台帮助意图与知识查询意图各自的响应字典
+        """
+        metadata = {
+            "request_id": request_id,
+            "timestamp": datetime.now().isoformat()
+        }
+
+        if intent_result.intent == IntentType.PLATFORM_HELP:
             return {
                 "query": user_query,
-                "answer": "抱歉，处理您的查询时遇到了错误。请稍后重试或联系管理员。",
-                "error": str(e),
-                "intent": "ERROR",
-                "entities": [],
+                "answer": answer_result['answer'],
+                "intent": intent_result.intent.value,
+                "entities": self._format_entities(intent_result),
                 "context": "",
                 "graph_results": [],
                 "has_context": False,
-                "is_ood": False,
+                "is_platform_help": True,
+                "timing": timing,
+                "metadata": metadata
+            }
+
+        return {
+            "query": user_query,
+            "answer": answer_result['answer'],
+            "intent": intent_result.intent.value,
+            "intent_name": self._get_intent_name(intent_result.intent),
+            "entities": self._format_entities(intent_result),
+            "context": context,
+            "context_stats": context_stats,
+            "graph_results": graph_results,
+            "has_context": answer_result['has_context'],
+            "answer_source": answer_result.get('answer_source', 'llm'),
+            "is_platform_help": False,
+            "timing": timing,
+            "metadata": metadata
+        }
+
+    def _build_error_response(self,
+                              user_query: str,
+                              error: str,
+                              start_time: float,
+                              request_id: int) -> Dict[str, Any]:
+        """构建错误响应"""
+        return {
+            "query": user_query,
+            "answer": "抱歉，处理您的查询时遇到了错误。请稍后重试或联系管理员。",
+            "error": error,
+            "intent": "ERROR",
+            "entities": [],
+            "context": "",
+            "graph_results": [],
+            "has_context": False,
+            "is_ood": False,
+            "timing": {
+                "total": time.time() - start_time
+            },
+            "metadata": {
+                "request_id": request_id,
+                "timestamp": datetime.now().isoformat()
+            }
+        }
+
+    def _start_prefetch(self, user_query: str):
+        """启动图谱预取，未开启或失败时返回None"""
+        if self.prefetcher is None:
+            return None
+
+        try:
+            return self.prefetcher.start(user_query)
+        except Exception as e:
+            logger.warning(f"图谱预取启动失败: {str(e)}")
+            return None
+
+    def _record_metrics(self, response: Dict[str, Any]):
+        """
+        按响应记录阶段耗时与请求计数
+
+        Args:
+            response: process_query / stream_query 的完整响应
+        """
+        intent = response.get('intent', '')
+        status = "error" if 'error' in response else "success"
+        intent_label = intent if status == "success" else ""
+
+        for stage, seconds in response.get('timing', {}).items():
+            self.metrics.observe_stage(stage, seconds, intent=intent_label)
+
+        self.metrics.increment("requests", intent=intent or "unknown", status=status)
+        if status == "success":
+            if response.get('is_platform_help'):
+                self.metrics.increment("ood_requests")
+            self.metrics.increment("answers", source=response.get('answer_source', 'llm'))
+
+    def _retrieve_context(self,
+                          intent_result,
+                          user_query: str = "",
+                          prefetch=None) -> Tuple[List[Dict[str, Any]], str, Dict[str, int], float]:
+        """
+        执行GraphRAG检索并格式化上下文
+
+        Args:
+            intent_result: 意图识别结果
+            user_query: 用户查询（用于上下文预算的相关性排序）
+            prefetch: 图谱预取句柄
+
+        Returns:
+            (图谱检索结果, 格式化上下文, 上下文统计, 检索耗时)；检索失败时上下文统计含graph_error
+        """
+        logger.info("[步骤3] GraphRAG检索中...")
+        graph_start = time.time()
+        graph_results = []
+        context_stats = {}
+
+        try:
+            # 生成并执行Cypher查询（开启向量检索时融合向量近邻结果）
+            if self.hybrid_retriever is not None:
+                graph_results = self.hybrid_retriever.retrieve(intent_result, user_query, prefetch=prefetch)
+            else:
+                graph_results = self.graph_query.query(intent_result, prefetch=prefetch)
+
+            # 格式化为上下文（超出token预算时保留价值最高的记录）
+            context, context_stats = self._build_context(graph_results, intent_result, user_query)
+
+            # 查询失败时结果为空，标记后答案不写入缓存
+            graph_error = getattr(graph_results, 'error', None)
+            if graph_error:
+                context_stats = {**context_stats, "graph_error": graph_error}
+
+            graph_time = time.time() - graph_start
+            logger.info(f"[步骤3] GraphRAG检索完成 (耗时: {graph_time:.2f}s)")
+            logger.info(f"  - 检索结果数: {len(graph_results)}")
+            logger.info(f"  - 上下文长度: {len(context)} 字符")
+
+        except Exception as e:
+            logger.error(f"GraphRAG检索失败: {str(e)}")
+            graph_time = time.time() - graph_start
+            context = "知识库中暂无相关信息。"
+            context_stats = {"graph_error": str(e)}
+
+        return graph_results, context, context_stats, graph_time
+
+    def _build_context(self,
+                       graph_results: List[Dict[str, Any]],
+                       intent_result,
+                       user_query: str) -> Tuple[str, Dict[str, int]]:
+        """
+        格式化上下文，开启预算时按token上限裁剪记录；图谱结果超过查询上限被截断时在上下文中注明
+
+        Returns:
+            (上下文文本, 上下文统计)
+        """
+        def formatter(records):
+            return self.graph_query.format_context(records, intent_result.intent)
+
+        context_stats = {}
+        if self.context_budget is None or not graph_results:
+            context = formatter(graph_results)
+        else:
+            try:
+                context, context_stats = self.context_budget.fit(graph_results, user_query, formatter)
+            except Exception as e:
+                # 分词器不可用时不影响主流程
+                logger.warning(f"上下文预算计算失败，使用完整上下文: {str(e)}")
+                context = formatter(graph_results)
+
+        truncated = getattr(graph_results, 'truncated', None)
+        if truncated:
+            context = f"{context}\n\n{GRAPH_TRUNCATION_NOTE.format(rows=len(graph_results))}"
+            context_stats = {**context_stats, "graph_truncated": truncated, "graph_rows": len(graph_results)}
+
+        return context, context_stats
+
+    def _render_template_answer(self,
+                                intent_result,
+                                graph_results: List[Dict[str, Any]],
+                                context: str) -> Optional[Dict[str, Any]]:
+        """
+        尝试用确定性模板回答结构化意图
+
+        Returns:
+            与generate_answer结构一致的结果字典，未命中模板时返回None
+        """
+        rendered = self.template_answerer.render(
+            intent_result.intent.value, graph_results, self._slot_values(intent_result)
+        )
+        if rendered is None:
+            return None
+
+        return {
+            "answer": rendered['answer'],
+            "context_used": context,
+            "has_context": True,
+            "answer_source": "template",
+            "template": rendered['template']
+        }
+
+    def _answer_cache_key(self, intent_result, context: str, user_query: str) -> Optional[str]:
+        """
+        计算答案缓存键
+
+        Returns:
+            缓存键，未开启答案缓存时返回None
+        """
+        if self.answer_cache is None:
+            return None
+
+        model_config = self.answer_generator.model_config
+        return AnswerCache.make_key(
+            intent_result.intent.value,
+            self._slot_values(intent_result),
+            context,
+            {
+                "model": model_config.get('model_name'),
+                "max_length": model_config.get('max_length'),
+                "temperature": model_config.get('temperature'),
+                "top_p": model_config.get('top_p'),
+                "repetition_penalty": model_config.get('repetition_penalty', 1.1)
+            },
+            query=user_query if self.answer_cache_key_on_query else ""
+        )
+
+    def _get_cached_answer(self,
+                           cache_key: Optional[str],
+                           context: str = "",
+                           semantic_entry=None) -> Optional[Dict[str, Any]]:
+        """
+        查找缓存答案：先查语义缓存条目上的答案（上下文哈希一致时），再查答案缓存（按当前图谱版本校验）
+
+        Returns:
+            answer_source为cache的结果字典，未命中时返回None
+        """
+        if semantic_entry is not None and semantic_entry.similarity is not None:
+            cached = self.semantic_cache.get_answer(semantic_entry, context)
+            if cached is not None:
+                self.metrics.increment("cache_hits", cache="semantic_answer")
+                cached["answer_source"] = "cache"
+                return cached
+
+        if cache_key is None:
+            return None
+
+        cached = self.answer_cache.get(cache_key, self.graph_query.get_graph_version())
+        if cached is None:
+            self.metrics.increment("cache_misses", cache="answer")
+            return None
+
+        self.metrics.increment("cache_hits", cache="answer")
+        cached["answer_source"] = "cache"
+        return cached
+
+    def _cache_answer(self,
+                      cache_key: Optional[str],
+                      answer_result: Dict[str, Any],
+                      context: str = "",
+                      semantic_entry=None,
+                      context_stats: Optional[Dict[str, Any]] = None):
+        """
+        缓存LLM生成的答案
+
+        空答案、图谱检索失败或上下文为空时不缓存，避免Neo4j短暂故障期间的"暂无信息"答案被长期复用
+        """
+        if not answer_result.get('answer'):
+            return
+        if (context_stats or {}).get('graph_error'):
+            logger.info("图谱检索失败，答案不写入缓存")
+            return
+        if not context or context == "知识库中暂无相关信息。":
+            return
+        if semantic_entry is not None:
+            self.semantic_cache.attach_answer(semantic_entry, context, answer_result)
+        if cache_key is not None:
+            self.answer_cache.put(cache_key, answer_result, self.graph_query.get_graph_version())
+
+    def _recognize_intent(self, user_query: str):
+        """
+        意图识别（语义缓存命中时复用历史查询的识别结果）
+
+        Returns:
+            (IntentResult, 语义缓存条目或None)
+        """
+        semantic_entry, embedding = self._semantic_lookup(user_query)
+        if semantic_entry is not None:
+            return semantic_entry.intent_result, semantic_entry
+
+        intent_result = self.intent_classifier.predict(user_query)
+        return intent_result, self._semantic_store(user_query, intent_result, embedding)
+
+    def _semantic_lookup(self, user_query: str):
+        """
+        查询语义缓存（未开启或向量模型不可用时视为未命中）
+
+        Returns:
+            (命中的条目或None, 查询向量或None)
+        """
+        if self.semantic_cache is None:
+            return None, None
+
+        try:
+            entry, embedding = self.semantic_cache.lookup(user_query)
+        except Exception as e:
+            logger.warning(f"语义缓存查询失败: {str(e)}")
+            return None, None
+
+        self.metrics.increment("cache_hits" if entry is not None else "cache_misses", cache="semantic_query")
+        return entry, embedding
+
+    def _semantic_store(self, user_query: str, intent_result, embedding=None):
+        """写入语义缓存，返回条目（未开启或失败时返回None）"""
+        if self.semantic_cache is None:
+            return None
+
+        try:
+            return self.semantic_cache.store(user_query, intent_result, embedding)
+        except Exception as e:
+            logger.warning(f"语义缓存写入失败: {str(e)}")
+            return None
+
+    @staticmethod
+    def _slot_values(intent_result) -> Dict[str, List[str]]:
+        """槽位字典 {槽位类型: [值列表]}"""
+        slots = {}
+        for entity in intent_result.entities:
+            slots.setdefault(entity.type.value, []).append(entity.value)
+        return slots
+
+    def _format_entities(self, intent_result) -> List[Dict[str, str]]:
+        """将槽位列表转换为响应格式"""
+        return [
+            {"type": e.type.value, "value": e.value}
+            for e in intent_result.entities
+        ]
+
+    def stream_query(self, user_query: str) -> Iterator[Dict[str, Any]]:
+        """
+        流式处理用户查询
+
+        先推送意图识别与图谱检索结果，再逐段推送答案token，
+        最后推送与process_query结构一致的完整响应
+
+        事件类型：
+        - intent: 意图与槽位
+        - graph: 图谱检索结果与上下文
+        - token: 增量答案文本
+        - done: 完整响应
+        - error: 错误信息
+
+        Args:
+            user_query: 用户查询
+
+        Yields:
+            {"event": 事件类型, "data": 事件数据}
+        """
+        start_time = time.time()
+        request_id = self._next_request_id()
+
+        logger.info(f"流式处理查询 #{request_id}: {user_query}")
+
+        prefetch = self._start_prefetch(user_query)
+
+        try:
+            # ========== 步骤1: 意图识别 ==========
+            intent_start = time.time()
+            intent_result, semantic_entry = self._recognize_intent(user_query)
+            intent_time = time.time() - intent_start
+
+            is_platform_help = intent_result.intent == IntentType.PLATFORM_HELP
+
+            yield {
+                "event": "intent",
+                "data": {
+                    "intent": intent_result.intent.value,
+                    "intent_name": self._get_intent_name(intent_result.intent),
+                    "entities": self._format_entities(intent_result),
+                    "intent_recognition": intent_time
+                }
+            }
+
+            # ========== 步骤2/3: 路由与GraphRAG检索 ==========
+            context = ""
+            graph_results = []
+            graph_time = 0
+
+            context_stats = {}
+
+            if not is_platform_help:
+                graph_results, context, context_stats, graph_time = self._retrieve_context(
+                    intent_result, user_query, prefetch
+                )
+
+                yield {
+                    "event": "graph",
+                    "data": {
+                        "graph_results": graph_results,
+                        "context": context,
+                        "context_stats": context_stats,
+                        "graph_query": graph_time
+                    }
+                }
+
+            # ========== 步骤4: 流式答案生成 ==========
+            generation_start = time.time()
+            first_token_time = None
+            answer_chunks = []
+
+            template_result = None
+            cached_result = None
+            cache_key = None
+            if not is_platform_help:
+                template_result = self._render_template_answer(intent_result, graph_results, context)
+                if template_result is None:
+                    cache_key = self._answer_cache_key(intent_result, context, user_query)
+                    cached_result = self._get_cached_answer(cache_key, context, semantic_entry)
+
+            if is_platform_help:
+                token_stream = self.answer_generator.stream_ood_response(user_query)
+            elif template_result is not None:
+                # 模板答案一次性推送
+                token_stream = iter([template_result['answer']])
+            elif cached_result is not None:
+                # 缓存答案一次性推送
+                token_stream = iter([cached_result['answer']])
+            else:
+                token_stream = self.answer_generator.stream_answer(
+                    user_query=user_query,
+                    context=context,
+                    intent=intent_result.intent.value
+                )
+
+            for chunk in token_stream:
+                if first_token_time is None:
+                    first_token_time = time.time() - start_time
+                answer_chunks.append(chunk)
+                yield {"event": "token", "data": {"text": chunk}}
+
+            has_context = bool(context and context != "知识库中暂无相关信息。")
+            if not is_platform_help and template_result is None and cached_result is None:
+                self._cache_answer(cache_key, {
+                    "answer": "".join(answer_chunks).strip(),
+                    "context_used": context,
+                    "has_context": has_context
+                }, context, semantic_entry, context_stats)
+
+            generation_time = time.time() - generation_start
+            total_time = time.time() - start_time
+            logger.info(f"流式查询 #{request_id} 完成 (首token: {first_token_time or 0:.2f}s, 总耗时: {total_time:.2f}s)")
+
+            done_data = {
+                "query": user_query,
+                "answer": "".join(answer_chunks).strip(),
+                "intent": intent_result.intent.value,
+                "intent_name": self._get_intent_name(intent_result.intent),
+                "entities": self._format_entities(intent_result),
+                "context": context,
+                "context_stats": context_stats,
+                "graph_results": graph_results,
+                "has_context": has_context,
+                "answer_source": "template" if template_result else ("cache" if cached_result else "llm"),
+                "is_platform_help": is_platform_help,
+                "timing": {
+                    "intent_recognition": intent_time,
+                    "graph_query": graph_time,
+                    "answer_generation": generation_time,
+                    "time_to_first_token": first_token_time,
+                    "total": total_time
+                },
+                "metadata": {
+                    "request_id": request_id,
+                    "timestamp": datetime.now().isoformat()
+                }
+            }
+            self._record_metrics(done_data)
+            yield {"event": "done", "data": done_data}
+
+        except Exception as e:
+            logger.error(f"流式查询处理失败: {str(e)}", exc_info=True)
+            error_data = {
+                "query": user_query,
+                "answer": "抱歉，处理您的查询时遇到了错误。请稍后重试或联系管理员。",
+                "error": str(e),
                 "timing": {
                     "total": time.time() - start_time
                 },
                 "metadata": {
-                    "request_id": self.request_count,
+                    "request_id": request_id,
                     "timestamp": datetime.now().isoformat()
                 }
             }
+            self._record_metrics(error_data)
+            yield {"event": "error", "data": error_data}
+
+        finally:
+            if prefetch is not None:
+                prefetch.cancel()
+
+    def start_preload(self, warmup: bool = True):
+        """
+        在后台线程中预加载模型并预热（不阻塞服务启动）
+
+        Args:
+            warmup: 加载后是否执行一次预热生成
+        """
+        if self._preload_thread is not None:
+            return
+
+        self._preload_thread = threading.Thread(
+            target=self.preload,
+            kwargs={"warmup": warmup},
+            name="model-preload",
+            daemon=True
+        )
+        self._preload_thread.start()
+
+    def preload(self, warmup: bool = True):
+        """
+        预加载意图识别和答案生成模型
+
+        Args:
+            warmup: 加载后是否执行一次预热生成
+        """
+        components = [
+            ("intent_model", self.intent_classifier),
+            ("answer_model", self.answer_generator)
+        ]
+
+        for name, component in components:
+            self._readiness[name] = {"status": "loading"}
+            load_start = time.time()
+
+            try:
+                if warmup:
+                    component.warmup()
+                else:
+                    component.load_model()
+
+                self._readiness[name] = {
+                    "status": "ready",
+                    "load_seconds": round(time.time() - load_start, 2)
+                }
+                logger.info(f"组件 {name} 就绪 (耗时: {time.time() - load_start:.1f}s)")
+
+            except Exception as e:
+                logger.error(f"组件 {name} 预加载失败: {str(e)}", exc_info=True)
+                self._readiness[name] = {"status": "failed", "error": str(e)}
+
+    def get_readiness(self) -> Dict[str, Any]:
+        """
+        获取各组件就绪状态
+
+        模型状态以组件实际加载状态为准：已加载为ready；预加载进行中或失败时沿用预加载状态；
+        未开启预加载（api.preload_models: false）时为lazy，模型在首个请求时加载，不阻塞就绪
+
+        Returns:
+            {"ready": 是否全部就绪, "components": {组件: 状态}}
+        """
+        components = {}
+        for name, component in [("intent_model", self.intent_classifier), ("answer_model", self.answer_generator)]:
+            state = dict(self._readiness[name])
+            if state["status"] in ("loading", "failed"):
+                components[name] = state
+            elif component.is_loaded:
+                components[name] = {**state, "status": "ready"}
+            else:
+                components[name] = {"status": "lazy" if self._preload_thread is None else "pending"}
+
+        components["neo4j"] = {
+            "status": "ready" if self.graph_query.check_connectivity() else "failed"
+        }
+
+        return {
+            "ready": all(state["status"] in ("ready", "lazy") for state in components.values()),
+            "components": components
+        }
 
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -229,13 +1054,26 @@ class Orchestrator:
         """
         uptime = (datetime.now() - self.start_time).total_seconds()
         
-        return {
+        stats = {
             "request_count": self.request_count,
             "uptime_seconds": uptime,
             "uptime_formatted": self._format_uptime(uptime),
             "start_time": self.start_time.isoformat(),
-            "avg_requests_per_minute": (self.request_count / uptime * 60) if uptime > 0 else 0
+            "avg_requests_per_minute": (self.request_count / uptime * 60) if uptime > 0 else 0,
+            "model_registry": get_model_registry().get_stats(),
+            "metrics": self.metrics.get_summary()
         }
+        if self.answer_cache is not None:
+            stats["answer_cache"] = self.answer_cache.get_stats()
+        if self.semantic_cache is not None:
+            stats["semantic_query_cache"] = self.semantic_cache.get_stats()
+        if self.hybrid_retriever is not None:
+            stats["vector_index"] = self.hybrid_retriever.get_stats()
+        if self.graph_query.snapshot_enabled:
+            stats["graph_snapshot"] = self.graph_query.get_snapshot_stats()
+        if self.graph_query.query_stats is not None:
+            stats["graph_queries"] = self.graph_query.get_query_stats()
+        return stats
 
     def _format_uptime(self, seconds: float) -> str:
         """格式化运行时间"""
@@ -0,0 +1,18 @@
+"""
+向量检索模块
+查询/节点描述的向量化与近邻检索
+"""
+
+from .embedder import Embedder
+from .semantic_cache import SemanticQueryCache, SemanticCacheEntry
+from .embedding_store import EmbeddingStore
+from .vector_index import VectorIndex, fetch_node_texts
+
+__all__ = [
+    'Embedder',
+    'SemanticQueryCache',
+    'SemanticCacheEntry',
+    'EmbeddingStore',
+    'VectorIndex',
+    'fetch_node_texts'
+]
@@ -0,0 +1,123 @@
+"""
+文本向量化模块
+使用bge系列模型（CLS池化 + L2归一化）将查询与节点描述编码为稠密向量，内积即余弦相似度
+"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..inference.model_registry import get_model_registry
+
+logger = logging.getLogger(__name__)
+
+
+# bge中文模型的检索指令：短查询检索长文本时加在查询前，查询与查询比较时不加
+BGE_QUERY_INSTRUCTION = "为这个句子生成表示以用于检索相关文章："
+
+
+class Embedder:
+    """文本向量化器（首次调用时加载模型）"""
+
+    def __init__(self, vector_config: Dict[str, Any]):
+        """
+        初始化向量化器
+
+        Args:
+            vector_config: config.yaml中的vector_search配置
+        """
+        self.model_name = vector_config.get('embedding_model', "BAAI/bge-large-zh-v1.5")
+        self.model_path = vector_config.get('embedding_path') or self.model_name
+        self.dimension = vector_config.get('dimension', 1024)
+        self.device = vector_config.get('device', 'cuda')
+        self.batch_size = vector_config.get('batch_size', 32)
+        self.max_length = vector_config.get('max_length', 512)
+        self.query_instruction = vector_config.get('query_instruction', BGE_QUERY_INSTRUCTION)
+
+        self.tokenizer = None
+        self.model = None
+        self._load_lock = threading.Lock()
+
+    def load_model(self):
+        """加载向量模型（经模型注册表，多实例共享权重）"""
+        if self.model is not None:
+            return
+
+        with self._load_lock:
+            if self.model is not None:
+                return
+
+            import torch
+            from transformers import AutoModel
+
+            if self.device == 'cuda' and not torch.cuda.is_available():
+                logger.warning("CUDA不可用，向量模型改用CPU")
+                self.device = 'cpu'
+
+            registry = get_model_registry()
+            self.tokenizer = registry.get_tokenizer(self.model_path)
+            self.model = registry.get_model(
+                self.model_path,
+                dtype=torch.float16 if self.device == 'cuda' else torch.float32,
+                device=self.device,
+                mmap_safetensors=False,
+                loader=AutoModel.from_pretrained
+            )
+            logger.info(f"向量模型加载完成: {self.model_name} (维度: {self.dimension})")
+
+    def encode(self, texts: List[str], instruction: Optional[str] = None) -> np.ndarray:
+        """
+        批量编码文本
+
+        Args:
+            texts: 文本列表
+            instruction: 加在每条文本前的指令（为空时不加）
+
+        Returns:
+            float32矩阵 (len(texts), dimension)，每行已L2归一化
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        self.load_model()
+
+        import torch
+
+        if instruction:
+            texts = [instruction + text for text in texts]
+
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            inputs = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="pt"
+            ).to(self.model.device)
+
+            with torch.no_grad():
+                # bge使用[CLS]向量作为句向量
+                embeddings = self.model(**inputs).last_hidden_state[:, 0]
+                embeddings = torch.nn.functional.normalize(embeddings.float(), p=2, dim=1)
+
+            vectors.append(embeddings.cpu().numpy())
+
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    def encode_query(self, query: str, for_retrieval: bool = False) -> np.ndarray:
+        """
+        编码单条查询
+
+        Args:
+            query: 查询文本
+            for_retrieval: 是否用于检索文档（加检索指令）；查询间相似度比较时为False
+
+        Returns:
+            float32向量 (dimension,)
+        """
+        instruction = self.query_instruction if for_retrieval else None
+        return self.encode([query], instruction=instruction)[0]
@@ -0,0 +1,169 @@
+"""
+增量向量存储模块
+节点向量存放在可内存映射的.npy文件中，节点表记录每行对应的节点与文本内容哈希；
+图谱刷新后只对新增或文本变化的节点重新编码，删除的节点原地置为空行并复用
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+VECTORS_FILE = "vectors.npy"
+NODES_FILE = "nodes.json"
+
+
+def content_hash(text: str) -> str:
+    """节点文本的内容哈希"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    增量向量存储
+
+    - vectors.npy: float32矩阵 (capacity, dimension)，前len(nodes)行有效
+    - nodes.json: 与向量行一一对应的节点表 [{"label", "node_id", "name", "hash"} 或 null(空行)]
+
+    向量文件预留容量原地写入（np.load(mmap_mode='r+')），容量不足时按growth_factor扩容后整体替换
+    """
+
+    def __init__(self, index_dir: str, dimension: int, growth_factor: float = 1.25):
+        """
+        初始化向量存储
+
+        Args:
+            index_dir: 存储目录
+            dimension: 向量维度
+            growth_factor: 扩容倍数
+        """
+        self.index_dir = index_dir
+        self.dimension = dimension
+        self.growth_factor = growth_factor
+
+        self.vectors_path = os.path.join(index_dir, VECTORS_FILE)
+        self.nodes_path = os.path.join(index_dir, NODES_FILE)
+
+    def load_nodes(self) -> List[Optional[Dict[str, Any]]]:
+        """读取节点表（不存在时为空）"""
+        if not os.path.exists(self.nodes_path):
+            return []
+        with open(self.nodes_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def reset(self):
+        """清空存储（向量模型或维度变化时全量重建）"""
+        for path in (self.vectors_path, self.nodes_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def sync(self,
+             nodes: List[Dict[str, Any]],
+             embedder,
+             chunk_size: int = 1024) -> Tuple[List[Optional[Dict[str, Any]]], Dict[str, int]]:
+        """
+        按节点文本的内容哈希增量同步向量
+
+        Args:
+            nodes: 当前图谱中的节点 [{"label", "node_id", "name", "text"}]
+            embedder: Embedder实例
+            chunk_size: 每次编码并写入的节点数（编码内部再按embedder.batch_size分批）
+
+        Returns:
+            (新的节点表, 统计 {added, updated, deleted, unchanged})
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        sync_start = time.time()
+
+        table = self.load_nodes()
+        rows = {
+            (entry['label'], entry['node_id']): row
+            for row, entry in enumerate(table) if entry is not None
+        }
+        free_rows = [row for row, entry in enumerate(table) if entry is None]
+
+        stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        pending: List[Tuple[int, str]] = []
+        current_keys = set()
+
+        for node in nodes:
+            key = (node['label'], node['node_id'])
+            if key in current_keys:
+                continue
+            current_keys.add(key)
+
+            text_hash = content_hash(node['text'])
+            row = rows.get(key)
+
+            if row is not None and table[row]['hash'] == text_hash:
+                # 文本未变化，无需重新编码
+                stats["unchanged"] += 1
+                continue
+
+            if row is None:
+                row = free_rows.pop() if free_rows else len(table)
+                if row == len(table):
+                    table.append(None)
+                stats["added"] += 1
+            else:
+                stats["updated"] += 1
+
+            table[row] = {"label": node['label'], "node_id": node['node_id'], "name": node['name'], "hash": text_hash}
+            pending.append((row, node['text']))
+
+        deleted_rows = [row for key, row in rows.items() if key not in current_keys]
+        for row in deleted_rows:
+            table[row] = None
+        stats["deleted"] = len(deleted_rows)
+
+        vectors = self._open_vectors(len(table))
+        if deleted_rows:
+            vectors[deleted_rows] = 0.0
+
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            vectors[[row for row, _ in chunk]] = embedder.encode([text for _, text in chunk])
+            logger.info(f"向量编码进度: {min(start + chunk_size, len(pending))}/{len(pending)}")
+
+        vectors.flush()
+        del vectors
+
+        tmp_path = self.nodes_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(table, f, ensure_ascii=False)
+        os.replace(tmp_path, self.nodes_path)
+
+        logger.info(f"向量存储同步完成 (耗时: {time.time() - sync_start:.1f}s): "
+                    f"新增 {stats['added']}，更新 {stats['updated']}，删除 {stats['deleted']}，"
+                    f"未变化 {stats['unchanged']}")
+        return table, stats
+
+    def _open_vectors(self, rows: int) -> np.ndarray:
+        """以可写mmap打开向量文件，行数不足时扩容（新文件写完后替换旧文件，已打开的读取方不受影响）"""
+        if os.path.exists(self.vectors_path):
+            vectors = np.load(self.vectors_path, mmap_mode='r+')
+            if vectors.shape[1] == self.dimension and vectors.shape[0] >= rows:
+                return vectors
+            existing = vectors
+        else:
+            existing = None
+
+        capacity = max(rows, int(rows * self.growth_factor), 1)
+        tmp_path = self.vectors_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(capacity, self.dimension))
+        if existing is not None and existing.shape[1] == self.dimension:
+            copied = min(existing.shape[0], capacity)
+            grown[:copied] = existing[:copied]
+        grown.flush()
+        del grown, existing
+        os.replace(tmp_path, self.vectors_path)
+
+        logger.info(f"向量文件扩容至 {capacity} 行")
+        return np.load(self.vectors_path, mmap_mode='r+')
@@ -0,0 +1,318 @@
+"""
+内存映射IVF索引模块
+倒排文件（IVF）索引的全部结构都是.npy数组：聚类中心、倒排表偏移、按倒排表连续存放的
+float16/int8向量编码以及节点id表。查询进程以mmap只读方式打开，多个worker共享同一份页缓存，
+启动时不需要反序列化索引
+
+用法（由已有的增量向量存储离线重建IVF结构）：
+    python3 -m src.vector_search.mmap_ivf --index-dir ./data/vector_index --dtype int8
+"""
+
+import json
+import logging
+import math
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+IVF_MANIFEST_FILE = "ivf.json"
+IVF_ARRAYS = ["centroids", "offsets", "codes", "scales", "rows", "node_ids", "labels"]
+
+
+def _spherical_kmeans(sample: np.ndarray, nlist: int, iterations: int, seed: int) -> np.ndarray:
+    """归一化向量上的k-means（按内积分配，中心重新归一化）"""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].astype(np.float32)
+
+    for _ in range(iterations):
+        assign = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=nlist)
+
+        # 空簇用随机样本重新初始化
+        empty = np.where(counts == 0)[0]
+        if len(empty):
+            sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+            counts[empty] = 1
+
+        centroids = sums / counts[:, None]
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+    return centroids.astype(np.float32)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """分块计算每个向量最近（内积最大）的聚类中心"""
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        block = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+        assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+class MmapIVFIndex:
+    """
+    内存映射IVF索引（只读）
+
+    目录中的数组：
+    - centroids.npy: float32 (nlist, dim)
+    - offsets.npy: int64 (nlist + 1)，第i个倒排表为codes[offsets[i]:offsets[i+1]]
+    - codes.npy: float16 或 int8 (N, dim)，按倒排表连续存放
+    - scales.npy: float32 (dim)，int8按维度对称量化的缩放系数（float16时全为1）
+    - rows.npy: int64 (N)，对应增量向量存储中的行号
+    - node_ids.npy / labels.npy: 节点id与标签编号
+    """
+
+    def __init__(self, index_path: str, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.index_path = index_path
+        self.manifest = manifest
+        self.centroids = arrays['centroids']
+        self.offsets = arrays['offsets']
+        self.codes = arrays['codes']
+        self.scales = arrays['scales']
+        self.rows = arrays['rows']
+        self.node_ids = arrays['node_ids']
+        self.labels = arrays['labels']
+
+        self.label_names: List[str] = manifest['labels']
+        self.nprobe = manifest.get('nprobe', 16)
+        self._id_converter = int if manifest.get('node_id_type') == 'int' else str
+
+    @property
+    def size(self) -> int:
+        return int(self.manifest.get('count', 0))
+
+    @classmethod
+    def build(cls,
+              index_path: str,
+              vectors: np.ndarray,
+              table: List[Optional[Dict[str, Any]]],
+              ivf_config: Optional[Dict[str, Any]] = None) -> "MmapIVFIndex":
+        """
+        由增量向量存储构建IVF索引
+
+        Args:
+            index_path: 输出目录（应为新目录，构建完成前读取方不会引用）
+            vectors: 存储中的float32向量（可为mmap）
+            table: 存储的节点表（空行为已删除节点）
+            ivf_config: vector_search.ivf配置（nlist / nprobe / dtype / train_size / iterations）
+
+        Returns:
+            构建完成的索引
+        """
+        ivf_config = ivf_config or {}
+        build_start = time.time()
+
+        live_rows = np.array([row for row, entry in enumerate(table) if entry is not None], dtype=np.int64)
+        if len(live_rows) == 0:
+            raise ValueError("向量存储为空，无法构建IVF索引")
+
+        dimension = vectors.shape[1]
+        dtype = ivf_config.get('dtype', 'float16')
+        nlist = ivf_config.get('nlist') or max(1, int(4 * math.sqrt(len(live_rows))))
+        nlist = min(nlist, len(live_rows))
+
+        # 1. 在采样上训练聚类中心
+        rng = np.random.default_rng(ivf_config.get('seed', 0))
+        train_size = min(len(live_rows), ivf_config.get('train_size', 100000))
+        train_rows = np.sort(rng.choice(live_rows, train_size, replace=False))
+        centroids = _spherical_kmeans(
+            np.asarray(vectors[train_rows], dtype=np.float32),
+            nlist,
+            ivf_config.get('iterations', 10),
+            ivf_config.get('seed', 0)
+        )
+
+        # 2. 分配倒排表，按倒排表编号排序使同一表的向量连续存放
+        assign = _assign(vectors[live_rows], centroids)
+        order = np.argsort(assign, kind='stable')
+        sorted_rows = live_rows[order]
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assign, minlength=nlist))
+
+        # 3. 节点id表
+        label_names = sorted({table[row]['label'] for row in sorted_rows})
+        label_codes = {label: code for code, label in enumerate(label_names)}
+        node_ids = [table[row]['node_id'] for row in sorted_rows]
+        node_id_type = 'int' if all(isinstance(node_id, int) for node_id in node_ids) else 'str'
+
+        os.makedirs(index_path, exist_ok=True)
+
+        def save(name: str, array: np.ndarray):
+            np.save(os.path.join(index_path, f"{name}.npy"), array)
+
+        save("centroids", centroids)
+        save("offsets", offsets)
+        save("rows", sorted_rows)
+        save("labels", np.array([label_codes[table[row]['label']] for row in sorted_rows], dtype=np.uint8))
+        save("node_ids", np.array(node_ids, dtype=np.int64 if node_id_type == 'int' else np.str_))
+
+        # 4. 向量编码（分块写入，不在内存中保留整份float32副本）
+        codes_dtype = np.int8 if dtype == 'int8' else np.float16
+        if dtype == 'int8':
+            max_abs = np.zeros(dimension, dtype=np.float32)
+            for start in range(0, len(sorted_rows), 65536):
+                block = np.asarray(vectors[sorted_rows[start:start + 65536]], dtype=np.float32)
+                max_abs = np.maximum(max_abs, np.abs(block).max(axis=0))
+            scales = np.maximum(max_abs, 1e-12) / 127.0
+        else:
+            scales = np.ones(dimension, dtype=np.float32)
+        save("scales", scales.astype(np.float32))
+
+        codes = np.lib.format.open_memmap(
+            os.path.join(index_path, "codes.npy"), mode='w+', dtype=codes_dtype, shape=(len(sorted_rows), dimension)
+        )
+        for start in range(0, len(sorted_rows), 65536):
+            block = np.asarray(vectors[sorted_rows[start:start + 65536]], dtype=np.float32)
+            if dtype == 'int8':
+                codes[start:start + len(block)] = np.clip(np.rint(block / scales), -127, 127).astype(np.int8)
+            else:
+                codes[start:start + len(block)] = block.astype(np.float16)
+        codes.flush()
+        del codes
+
+        manifest = {
+            "count": int(len(sorted_rows)),
+            "dimension": int(dimension),
+            "nlist": int(nlist),
+            "nprobe": int(ivf_config.get('nprobe', 16)),
+            "dtype": dtype,
+            "labels": label_names,
+            "node_id_type": node_id_type,
+            "built_at": time.time()
+        }
+        with open(os.path.join(index_path, IVF_MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        logger.info(f"IVF索引构建完成: {len(sorted_rows)} 个向量，{nlist} 个倒排表，{dtype}，"
+                    f"耗时 {time.time() - build_start:.1f}s")
+        return cls.open(index_path)
+
+    @classmethod
+    def open(cls, index_path: str) -> "MmapIVFIndex":
+        """
+        以mmap只读方式打开索引
+
+        Args:
+            index_path: 索引目录
+
+        Returns:
+            索引实例
+        """
+        with open(os.path.join(index_path, IVF_MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        arrays = {
+            name: np.load(os.path.join(index_path, f"{name}.npy"), mmap_mode='r')
+            for name in IVF_ARRAYS
+        }
+        return cls(index_path, manifest, arrays)
+
+    def search(self,
+               query_vector: np.ndarray,
+               top_k: int = 20,
+               labels: Optional[List[str]] = None,
+               nprobe: Optional[int] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        近邻检索：只扫描与查询最接近的nprobe个倒排表
+
+        Args:
+            query_vector: 已归一化的查询向量
+            top_k: 返回条数
+            labels: 只返回这些标签的节点（为空时不过滤）
+            nprobe: 扫描的倒排表数（默认取构建时的配置）
+
+        Returns:
+            [({"label", "node_id"}, 相似度)]，按相似度降序
+        """
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        nlist = len(self.centroids)
+        nprobe = min(nprobe or self.nprobe, nlist)
+
+        centroid_scores = self.centroids @ query_vector
+        probe_lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        # int8: Σ q_d * scale_d * code_d = (q * scale) · code
+        scaled_query = query_vector * self.scales
+
+        label_filter = None
+        if labels:
+            label_filter = np.array(
+                [code for code, name in enumerate(self.label_names) if name in labels], dtype=np.uint8
+            )
+            if len(label_filter) == 0:
+                return []
+
+        positions = []
+        scores = []
+        for list_id in probe_lists:
+            start, end = int(self.offsets[list_id]), int(self.offsets[list_id + 1])
+            if start == end:
+                continue
+
+            block_positions = np.arange(start, end)
+            if label_filter is not None:
+                block_positions = block_positions[np.isin(self.labels[start:end], label_filter)]
+                if len(block_positions) == 0:
+                    continue
+                block = self.codes[block_positions]
+            else:
+                block = self.codes[start:end]
+
+            positions.append(block_positions)
+            scores.append(block.astype(np.float32) @ scaled_query)
+
+        if not positions:
+            return []
+
+        positions = np.concatenate(positions)
+        scores = np.concatenate(scores)
+        count = min(top_k, len(scores))
+        best = np.argpartition(-scores, count - 1)[:count]
+        best = best[np.argsort(-scores[best])]
+
+        return [
+            (
+                {
+                    "label": self.label_names[int(self.labels[positions[i]])],
+                    "node_id": self._id_converter(self.node_ids[positions[i]])
+                },
+                float(scores[i])
+            )
+            for i in best
+        ]
+
+
+def remove_stale_indexes(index_dir: str, prefix: str, keep: List[str]):
+    """删除不再被manifest引用的旧IVF目录（已打开旧目录的进程持有的映射不受影响）"""
+    for name in os.listdir(index_dir):
+        if name.startswith(prefix) and name not in keep:
+            shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    import argparse
+
+    from .vector_index import VectorIndex
+
+    parser = argparse.ArgumentParser(description="由增量向量存储离线重建mmap IVF索引")
+    parser.add_argument("--index-dir", type=str, default="./data/vector_index", help="向量索引目录")
+    parser.add_argument("--nlist", type=int, default=None, help="倒排表数（默认4*sqrt(N)）")
+    parser.add_argument("--nprobe", type=int, default=16, help="查询时扫描的倒排表数")
+    parser.add_argument("--dtype", type=str, default="float16", choices=["float16", "int8"], help="向量编码类型")
+
+    args = parser.parse_args()
+
+    VectorIndex.rebuild_ivf(args.index_dir, {"nlist": args.nlist, "nprobe": args.nprobe, "dtype": args.dtype})
@@ -0,0 +1,339 @@
+"""
+语义查询缓存模块
+对历史查询做向量化，新查询与历史查询的余弦相似度超过阈值时复用其意图识别结果，
+上下文未变化时一并复用答案，使"平台上有哪些五星资产"与"五星资产都有哪些"共享同一次推理
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from ..intent_recognition.intent_config import IntentResult
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(query: str) -> str:
+    return " ".join(query.split())
+
+
+def _context_hash(context: str) -> str:
+    return hashlib.sha256(context.encode('utf-8')).hexdigest()
+
+
+def _compact(text: str) -> str:
+    return "".join(text.split()).lower()
+
+
+def _slots_match(intent_result: IntentResult, cached_query: str, query: str, entity_lookup) -> bool:
+    """
+    历史查询与新查询的槽位是否一致（只差实体的查询向量相似度同样很高）
+
+    双向校验：历史查询识别出的槽位值都出现在新查询中，且实体词典在两条查询中匹配到的名称相同
+    （新查询多出的筛选条件，如"有哪些资产"与"有哪些报表资产"，同样视为不一致）
+    """
+    compact_query = _compact(query)
+    if not all(_compact(entity.value) in compact_query for entity in intent_result.entities):
+        return False
+
+    def names(text: str):
+        return {value for values in entity_lookup.match(text).values() for value in values}
+
+    return names(query) == names(cached_query)
+
+
+@dataclass
+class SemanticCacheEntry:
+    """缓存条目（lookup命中或store写入时返回）"""
+    slot: int
+    query: str
+    intent_result: IntentResult
+    similarity: Optional[float] = None  # 命中时的相似度，新写入的条目为None
+
+
+class SemanticQueryCache:
+    """
+    语义查询缓存
+
+    向量存放在预分配的float32矩阵中（每个槽位一条），按LRU淘汰；
+    index_type为HNSW且安装了faiss时用HNSW近邻检索，否则对全部槽位做矩阵内积。
+    HNSW不支持删除，被淘汰的向量留在索引中并在检索时过滤，失效条目过多时重建。
+    相似命中需经实体词典双向校验槽位，词典不可用时只复用文本完全相同的查询
+    """
+
+    def __init__(self,
+                 embedder,
+                 cache_config: Dict[str, Any],
+                 index_type: str = "HNSW",
+                 entity_lookup=None):
+        """
+        初始化语义查询缓存
+
+        Args:
+            embedder: Embedder实例
+            cache_config: vector_search.query_cache配置
+            index_type: 近邻索引类型（HNSW / Flat）
+            entity_lookup: 实体词典（EntityLookup，与图谱预取共用），用于校验相似命中的槽位
+        """
+        self.embedder = embedder
+        self.entity_lookup = entity_lookup
+        self.dimension = embedder.dimension
+        self.similarity_threshold = cache_config.get('similarity_threshold', 0.92)
+        self.max_entries = cache_config.get('max_entries', 10000)
+        self.ttl = cache_config.get('ttl')
+        self.hnsw_m = cache_config.get('hnsw_m', 32)
+        self.ef_search = cache_config.get('ef_search', 64)
+
+        self._vectors = np.zeros((self.max_entries, self.dimension), dtype=np.float32)
+        self._live = np.zeros(self.max_entries, dtype=bool)
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._exact: Dict[str, int] = {}
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+
+        # HNSW索引中的向量以自增id标识（槽位复用后旧id失效）
+        self._index = None
+        self._next_id = 0
+        self._id_to_slot: Dict[int, int] = {}
+        self._slot_to_id: Dict[int, int] = {}
+        if index_type.upper() == "HNSW":
+            self._index = self._create_hnsw_index()
+
+        self._hits = 0
+        self._exact_hits = 0
+        self._misses = 0
+        self._slot_mismatches = 0
+        self._answer_hits = 0
+        self._evictions = 0
+
+    def _create_hnsw_index(self):
+        try:
+            import faiss
+        except ImportError:
+            logger.warning("未安装faiss，语义查询缓存使用矩阵内积检索")
+            return None
+
+        index = faiss.IndexIDMap(faiss.IndexHNSWFlat(self.dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT))
+        faiss.downcast_index(index.index).hnsw.efSearch = self.ef_search
+        return index
+
+    def lookup(self, query: str) -> Tuple[Optional[SemanticCacheEntry], Optional[np.ndarray]]:
+        """
+        查找语义相近的历史查询
+
+        Args:
+            query: 用户查询
+
+        Returns:
+            (命中的条目或None, 查询向量)；文本完全相同时直接命中，不计算向量（向量为None）；
+            相似度达到阈值但槽位不一致（双向校验）或实体词典不可用时视为未命中
+        """
+        normalized = _normalize(query)
+
+        with self._lock:
+            slot = self._exact.get(normalized)
+            if slot is not None and not self._expired(slot):
+                self._hits += 1
+                self._exact_hits += 1
+                return self._touch(slot, 1.0), None
+
+        embedding = self.embedder.encode_query(normalized)
+
+        with self._lock:
+            slot, similarity = self._search(embedding)
+            if slot is None or similarity < self.similarity_threshold or self._expired(slot):
+                self._misses += 1
+                return None, embedding
+
+            # 槽位值不一致（或词典未加载无法校验）时复用意图结果会查询错误的实体，按未命中处理
+            stored = self._entries[slot]
+            if (self.entity_lookup is None or self.entity_lookup.loaded_at is None
+                    or not _slots_match(stored['intent_result'], stored['query'], normalized, self.entity_lookup)):
+                self._misses += 1
+                self._slot_mismatches += 1
+                return None, embedding
+
+            self._hits += 1
+            logger.info(f"语义缓存命中: '{normalized}' ~ '{self._entries[slot]['query']}' (相似度 {similarity:.3f})")
+            return self._touch(slot, similarity), embedding
+
+    def store(self,
+              query: str,
+              intent_result: IntentResult,
+              embedding: Optional[np.ndarray] = None) -> SemanticCacheEntry:
+        """
+        写入查询及其意图识别结果
+
+        Args:
+            query: 用户查询
+            intent_result: 意图识别结果
+            embedding: lookup返回的查询向量（为空时重新计算）
+
+        Returns:
+            写入的条目
+        """
+        normalized = _normalize(query)
+        if embedding is None:
+            embedding = self.embedder.encode_query(normalized)
+
+        with self._lock:
+            slot = self._exact.get(normalized)
+            if slot is None:
+                slot = self._allocate()
+                self._vectors[slot] = embedding
+                self._live[slot] = True
+                self._exact[normalized] = slot
+                self._add_to_index(slot)
+
+            self._entries[slot] = {
+                "query": normalized,
+                "intent_result": intent_result,
+                "answer": None,
+                "created_at": time.time()
+            }
+            self._lru[slot] = None
+            self._lru.move_to_end(slot)
+
+            return SemanticCacheEntry(slot=slot, query=normalized, intent_result=intent_result)
+
+    def get_answer(self, entry: SemanticCacheEntry, context: str) -> Optional[Dict[str, Any]]:
+        """
+        取条目上缓存的答案（仅当上下文与生成答案时一致）
+
+        Args:
+            entry: lookup命中的条目
+            context: 本次检索得到的上下文
+
+        Returns:
+            答案结果字典（副本），不可复用时返回None
+        """
+        with self._lock:
+            stored = self._entries.get(entry.slot)
+            if stored is None or stored['query'] != entry.query or stored['answer'] is None:
+                return None
+
+            context_hash, answer_result = stored['answer']
+            if context_hash != _context_hash(context):
+                return None
+
+            self._answer_hits += 1
+            return dict(answer_result)
+
+    def attach_answer(self, entry: SemanticCacheEntry, context: str, answer_result: Dict[str, Any]):
+        """
+        在条目上记录答案及其上下文哈希
+
+        Args:
+            entry: lookup或store返回的条目
+            context: 生成答案使用的上下文
+            answer_result: 答案结果字典
+        """
+        with self._lock:
+            stored = self._entries.get(entry.slot)
+            # 条目已被淘汰且槽位被复用时不写入
+            if stored is None or stored['query'] != entry.query:
+                return
+            stored['answer'] = (_context_hash(context), dict(answer_result))
+
+    def _search(self, embedding: np.ndarray) -> Tuple[Optional[int], float]:
+        """返回最相似的存活槽位及相似度（调用方持有锁）"""
+        if not self._entries:
+            return None, 0.0
+
+        if self._index is not None:
+            scores, ids = self._index.search(embedding.reshape(1, -1), 8)
+            for score, vector_id in zip(scores[0], ids[0]):
+                slot = self._id_to_slot.get(int(vector_id))
+                if slot is not None:
+                    return slot, float(score)
+            return None, 0.0
+
+        scores = self._vectors @ embedding
+        scores[~self._live] = -1.0
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+    def _touch(self, slot: int, similarity: float) -> SemanticCacheEntry:
+        self._lru.move_to_end(slot)
+        stored = self._entries[slot]
+        return SemanticCacheEntry(
+            slot=slot,
+            query=stored['query'],
+            intent_result=stored['intent_result'],
+            similarity=similarity
+        )
+
+    def _expired(self, slot: int) -> bool:
+        return self.ttl is not None and time.time() - self._entries[slot]['created_at'] > self.ttl
+
+    def _allocate(self) -> int:
+        """分配槽位，缓存已满时淘汰最久未使用的条目"""
+        if self._free:
+            return self._free.pop()
+
+        slot, _ = self._lru.popitem(last=False)
+        stored = self._entries.pop(slot)
+        self._exact.pop(stored['query'], None)
+        self._live[slot] = False
+        self._evictions += 1
+
+        vector_id = self._slot_to_id.pop(slot, None)
+        if vector_id is not None:
+            self._id_to_slot.pop(vector_id, None)
+        return slot
+
+    def _add_to_index(self, slot: int):
+        if self._index is None:
+            return
+
+        # 失效向量超过存活向量时重建，避免检索被失效近邻占满
+        if self._index.ntotal - len(self._id_to_slot) > self.max_entries:
+            self._rebuild_index()
+
+        vector_id = self._next_id
+        self._next_id += 1
+        self._index.add_with_ids(self._vectors[slot:slot + 1], np.array([vector_id], dtype=np.int64))
+        self._id_to_slot[vector_id] = slot
+        self._slot_to_id[slot] = vector_id
+
+    def _rebuild_index(self):
+        """用存活槽位重建HNSW索引（调用方持有锁）"""
+        self._index = self._create_hnsw_index()
+        self._id_to_slot = {}
+        self._slot_to_id = {}
+
+        slots = [slot for slot in self._lru if self._live[slot]]
+        if slots:
+            ids = np.arange(self._next_id, self._next_id + len(slots), dtype=np.int64)
+            self._next_id += len(slots)
+            self._index.add_with_ids(self._vectors[slots], ids)
+            for vector_id, slot in zip(ids.tolist(), slots):
+                self._id_to_slot[vector_id] = slot
+                self._slot_to_id[slot] = vector_id
+
+        logger.info(f"语义缓存HNSW索引已重建: {len(slots)} 条")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+                "index": "hnsw" if self._index is not None else "flat",
+                "hits": self._hits,
+                "exact_hits": self._exact_hits,
+                "misses": self._misses,
+                "slot_mismatches": self._slot_mismatches,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "answer_hits": self._answer_hits,
+                "evictions": self._evictions
+            }
@@ -0,0 +1,340 @@
+"""
+节点向量索引模块
+对Asset/Concept/Scenario的名称与描述文本建立向量索引，由GraphBuilder在图谱加载后离线构建，
+查询进程只读加载（向量以mmap方式打开）
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .embedding_store import EmbeddingStore, NODES_FILE, VECTORS_FILE
+from .mmap_ivf import MmapIVFIndex, remove_stale_indexes
+
+logger = logging.getLogger(__name__)
+
+
+# 各标签的节点文本来源：返回 node_id / name / text
+NODE_TEXT_QUERIES = {
+    "Asset": """
+        MATCH (a:Asset)
+        RETURN a.asset_id AS node_id, a.name AS name,
+               a.name + "：" + coalesce(a.description, "") + " " + coalesce(a.business_purpose, "") AS text
+    """,
+    "Concept": """
+        MATCH (c:Concept)
+        RETURN c.concept_id AS node_id, c.name AS name,
+               c.name + "：" + coalesce(c.definition, "") + " " + coalesce(c.description, "") AS text
+    """,
+    "Scenario": """
+        MATCH (s:Scenario)
+        RETURN s.scenario_id AS node_id, s.name AS name,
+               s.name + "：" + coalesce(s.description, "") AS text
+    """
+}
+
+FAISS_FILE = "hnsw.faiss"
+MANIFEST_FILE = "manifest.json"
+IVF_DIR_PREFIX = "ivf_"
+
+
+def fetch_node_texts(run_query: Callable[[str], List[Dict[str, Any]]],
+                     labels: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    从图谱读取待索引的节点文本
+
+    Args:
+        run_query: 执行Cypher并返回记录字典列表的函数
+        labels: 需要索引的节点标签（默认全部）
+
+    Returns:
+        [{"label", "node_id", "name", "text"}]
+    """
+    nodes = []
+    for label in labels or list(NODE_TEXT_QUERIES):
+        for record in run_query(NODE_TEXT_QUERIES[label]):
+            if record.get('node_id') is None or not (record.get('text') or "").strip():
+                continue
+            nodes.append({
+                "label": label,
+                "node_id": record['node_id'],
+                "name": record.get('name'),
+                "text": record['text'].strip()
+            })
+    return nodes
+
+
+class VectorIndex:
+    """
+    节点向量索引（只读）
+
+    目录结构：
+    - vectors.npy / nodes.json: 增量向量存储（见EmbeddingStore），节点表中的空行为已删除节点
+    - ivf_<构建时间>/: index_type为IVF时的mmap倒排索引（见MmapIVFIndex），每次构建写入新目录
+    - hnsw.faiss: index_type为HNSW时的faiss索引，向量id为行号（未安装faiss时检索做矩阵内积）
+    - manifest.json: 模型、维度、节点数、图谱版本与构建时间，最后写入，作为更新完成的标志
+
+    IVF索引加载时只打开mmap数组，不读取节点表与float32向量
+    """
+
+    def __init__(self,
+                 vectors: Optional[np.ndarray],
+                 nodes: Optional[List[Optional[Dict[str, Any]]]],
+                 manifest: Dict[str, Any],
+                 faiss_index=None,
+                 ivf_index: Optional[MmapIVFIndex] = None):
+        self.vectors = vectors
+        self.nodes = nodes
+        self.manifest = manifest
+        self.faiss_index = faiss_index
+        self.ivf_index = ivf_index
+
+    @property
+    def size(self) -> int:
+        return self.manifest.get('count', 0)
+
+    @classmethod
+    def build(cls,
+              index_dir: str,
+              nodes: List[Dict[str, Any]],
+              embedder,
+              index_type: str = "HNSW",
+              graph_version: Optional[str] = None,
+              hnsw_m: int = 32,
+              full_rebuild: bool = False,
+              ivf_config: Optional[Dict[str, Any]] = None) -> "VectorIndex":
+        """
+        增量更新索引：只编码新增或文本变化的节点，近邻结构由存储中的向量重建（不重新编码）
+
+        Args:
+            index_dir: 索引目录
+            nodes: fetch_node_texts的返回值
+            embedder: Embedder实例
+            index_type: HNSW / Flat
+            graph_version: 构建时的图谱版本
+            hnsw_m: HNSW每个节点的连接数
+            full_rebuild: 是否丢弃已有向量全量重建
+            ivf_config: index_type为IVF时的vector_search.ivf配置
+
+        Returns:
+            构建完成的索引
+        """
+        build_start = time.time()
+        store = EmbeddingStore(index_dir, embedder.dimension)
+
+        # 向量模型或维度变化时已有向量不可复用
+        previous = cls._read_manifest(index_dir)
+        if full_rebuild or (previous is not None and (
+                previous.get('embedding_model') != embedder.model_name
+                or previous.get('dimension') != embedder.dimension)):
+            logger.info("向量索引全量重建")
+            store.reset()
+
+        table, sync_stats = store.sync(nodes, embedder)
+        vectors = np.load(store.vectors_path, mmap_mode='r')
+        live_rows = np.array([row for row, entry in enumerate(table) if entry is not None], dtype=np.int64)
+
+        if index_type.upper() == "IVF" and len(live_rows) > 0:
+            manifest = {
+                "embedding_model": embedder.model_name,
+                "dimension": embedder.dimension,
+                "graph_version": graph_version,
+                "last_sync": sync_stats
+            }
+            index = cls._write_ivf(index_dir, vectors, table, manifest, ivf_config, previous)
+            logger.info(f"向量索引构建完成: {index.size} 个节点，耗时 {time.time() - build_start:.1f}s")
+            return index
+
+        faiss_index = None
+        if index_type.upper() == "HNSW" and len(live_rows) > 0:
+            try:
+                import faiss
+
+                faiss_index = faiss.IndexIDMap(
+                    faiss.IndexHNSWFlat(embedder.dimension, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+                )
+                faiss_index.add_with_ids(np.ascontiguousarray(vectors[live_rows]), live_rows)
+            except ImportError:
+                logger.warning("未安装faiss，向量索引只保存向量矩阵（检索时做矩阵内积）")
+
+        manifest = {
+            "embedding_model": embedder.model_name,
+            "dimension": embedder.dimension,
+            "count": int(len(live_rows)),
+            "rows": len(table),
+            "labels": sorted({entry['label'] for entry in table if entry is not None}),
+            "index_type": "hnsw" if faiss_index is not None else "flat",
+            "graph_version": graph_version,
+            "last_sync": sync_stats,
+            "built_at": time.time()
+        }
+
+        faiss_path = os.path.join(index_dir, FAISS_FILE)
+        if faiss_index is not None:
+            import faiss
+            faiss.write_index(faiss_index, faiss_path + ".tmp")
+            os.replace(faiss_path + ".tmp", faiss_path)
+        elif os.path.exists(faiss_path):
+            os.remove(faiss_path)
+
+        cls._write_manifest(index_dir, manifest)
+        remove_stale_indexes(index_dir, IVF_DIR_PREFIX, keep=[])
+
+        logger.info(f"向量索引构建完成: {len(live_rows)} 个节点，耗时 {time.time() - build_start:.1f}s")
+        return cls(vectors, table, manifest, faiss_index)
+
+    @classmethod
+    def rebuild_ivf(cls, index_dir: str, ivf_config: Optional[Dict[str, Any]] = None) -> "VectorIndex":
+        """
+        由已有的向量存储重建IVF结构（不重新编码，用于调整nlist / dtype等参数）
+
+        Args:
+            index_dir: 索引目录
+            ivf_config: vector_search.ivf配置
+
+        Returns:
+            重建后的索引
+        """
+        previous = cls._read_manifest(index_dir)
+        if previous is None:
+            raise FileNotFoundError(f"向量索引不存在: {index_dir}")
+
+        store = EmbeddingStore(index_dir, previous['dimension'])
+        vectors = np.load(store.vectors_path, mmap_mode='r')
+        manifest = {
+            key: previous.get(key)
+            for key in ("embedding_model", "dimension", "graph_version", "last_sync")
+        }
+        return cls._write_ivf(index_dir, vectors, store.load_nodes(), manifest, ivf_config, previous)
+
+    @classmethod
+    def _write_ivf(cls,
+                   index_dir: str,
+                   vectors: np.ndarray,
+                   table: List[Optional[Dict[str, Any]]],
+                   manifest: Dict[str, Any],
+                   ivf_config: Optional[Dict[str, Any]],
+                   previous: Optional[Dict[str, Any]]) -> "VectorIndex":
+        """在新目录中构建IVF索引，切换manifest后清理旧目录（保留上一版本供尚未重新加载的进程使用）"""
+        ivf_dir = f"{IVF_DIR_PREFIX}{int(time.time() * 1000)}"
+        ivf_index = MmapIVFIndex.build(os.path.join(index_dir, ivf_dir), vectors, table, ivf_config)
+
+        manifest = {
+            **manifest,
+            "count": ivf_index.size,
+            "rows": len(table),
+            "labels": ivf_index.label_names,
+            "index_type": "ivf",
+            "ivf_dir": ivf_dir,
+            "built_at": time.time()
+        }
+        cls._write_manifest(index_dir, manifest)
+
+        keep = [ivf_dir]
+        if previous is not None and previous.get('ivf_dir'):
+            keep.append(previous['ivf_dir'])
+        remove_stale_indexes(index_dir, IVF_DIR_PREFIX, keep)
+
+        return cls(None, None, manifest, ivf_index=ivf_index)
+
+    @staticmethod
+    def _write_manifest(index_dir: str, manifest: Dict[str, Any]):
+        manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+        with open(manifest_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    @staticmethod
+    def _read_manifest(index_dir: str) -> Optional[Dict[str, Any]]:
+        manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def load(cls, index_dir: str) -> "VectorIndex":
+        """
+        加载索引（向量矩阵以mmap只读方式打开，各worker进程共享页缓存）
+
+        Args:
+            index_dir: 索引目录
+
+        Returns:
+            索引实例
+        """
+        manifest = cls._read_manifest(index_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"向量索引不存在: {index_dir}")
+
+        if manifest.get('index_type') == 'ivf':
+            ivf_index = MmapIVFIndex.open(os.path.join(index_dir, manifest['ivf_dir']))
+            logger.info(f"加载向量索引: {manifest.get('count')} 个节点 (ivf, {ivf_index.manifest.get('dtype')})")
+            return cls(None, None, manifest, ivf_index=ivf_index)
+
+        with open(os.path.join(index_dir, NODES_FILE), 'r', encoding='utf-8') as f:
+            nodes = json.load(f)
+
+        vectors = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode='r')
+
+        faiss_index = None
+        faiss_path = os.path.join(index_dir, FAISS_FILE)
+        if manifest.get('index_type') == 'hnsw' and os.path.exists(faiss_path):
+            try:
+                import faiss
+                faiss_index = faiss.read_index(faiss_path)
+            except ImportError:
+                logger.warning("未安装faiss，向量索引改用矩阵内积检索")
+
+        logger.info(f"加载向量索引: {manifest.get('count')} 个节点 ({manifest.get('index_type')})")
+        return cls(vectors, nodes, manifest, faiss_index)
+
+    def search(self,
+               query_vector: np.ndarray,
+               top_k: int = 20,
+               labels: Optional[List[str]] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        近邻检索
+
+        Args:
+            query_vector: 已归一化的查询向量
+            top_k: 返回条数
+            labels: 只返回这些标签的节点（为空时不过滤）
+
+        Returns:
+            [(节点, 相似度)]，按相似度降序
+        """
+        if self.size == 0:
+            return []
+
+        if self.ivf_index is not None:
+            return self.ivf_index.search(query_vector, top_k, labels)
+
+        rows = len(self.nodes)
+
+        # 按标签过滤时多取一些候选
+        candidates = min(rows, top_k if not labels else top_k * 4)
+
+        if self.faiss_index is not None:
+            scores, ids = self.faiss_index.search(query_vector.reshape(1, -1).astype(np.float32), candidates)
+            ranked = [(int(row), float(score)) for row, score in zip(ids[0], scores[0]) if 0 <= row < rows]
+        else:
+            # 已删除节点的向量为零向量，相似度为0，排序后由节点表过滤
+            scores = np.asarray(self.vectors[:rows] @ query_vector)
+            top_rows = np.argpartition(-scores, candidates - 1)[:candidates]
+            top_rows = top_rows[np.argsort(-scores[top_rows])]
+            ranked = [(int(row), float(scores[row])) for row in top_rows]
+
+        hits = []
+        for row, score in ranked:
+            node = self.nodes[row]
+            if node is None or (labels and node['label'] not in labels):
+                continue
+            hits.append((node, score))
+            if len(hits) >= top_k:
+                break
+        return hits